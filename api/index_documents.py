@@ -3,16 +3,21 @@ import os
 from typing import List
 from app.scraper import scrape_text_from_url
 from app.chunker import chunk_text
-from app.embedder import get_embedding_local
+from app.embedder import get_embedding_local, get_sentence_embeddings
+from app.snippets import sentence_offsets
+from app import config
 from app.vector_store import get_vector_store
+from app.dedup import get_dedup_index
 
 # Optional: set the project root for imports if running standalone
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 def index_urls(urls: List[str]) -> dict:
     vector_db = get_vector_store()
+    dedup = get_dedup_index()
     indexed = []
     failed = []
+    checked = duplicates = 0
 
     for url in urls:
         try:
@@ -29,20 +34,47 @@ def index_urls(urls: List[str]) -> dict:
 
             embeddings = []
             metadata = []
+            sentence_vectors = []
+            signatures = []
+            skipped = 0
 
             for chunk in chunks:
+                signature = None
+                if dedup is not None:
+                    checked += 1
+                    is_dup, signature = dedup.check(chunk, signatures)
+                    if is_dup:
+                        skipped += 1
+                        continue
                 emb = get_embedding_local(chunk)
                 if emb is not None:
+                    offsets = sentence_offsets(chunk)
                     embeddings.append(emb)
-                    metadata.append({"url": url, "text": chunk})
+                    metadata.append({"url": url, "text": chunk, "sentences": offsets})
+                    if config.SENTENCE_EMBEDDINGS_ENABLED:
+                        sentence_vectors.append(get_sentence_embeddings(chunk, offsets))
+                    if signature is not None:
+                        signatures.append(signature)
                 else:
                     print(f"⚠️ Failed to get embedding for chunk: {chunk[:50]}...")
 
+            duplicates += skipped
+            if skipped:
+                print(f"🪞 Skipped {skipped} near-duplicate chunks for URL: {url}")
+
             if embeddings:
-                vector_db.add(embeddings, metadata)
+                vector_db.add(embeddings, metadata, sentence_embeddings=sentence_vectors or None)
+                # Registered only once the chunks are stored, so a failed add can be retried
+                if dedup is not None:
+                    for signature in signatures:
+                        dedup.add(signature)
+                    dedup.save()
                 print(f"✅ Added {len(embeddings)} embeddings for URL: {url}")
                 print(f"📌 Total vectors in index: {vector_db.index.ntotal}")
                 indexed.append(url)
+            elif skipped:
+                print(f"🪞 All chunks for URL were near-duplicates: {url}")
+                indexed.append(url)
             else:
                 print(f"⚠️ No embeddings generated for URL: {url}")
                 failed.append({"url": url, "reason": "No embeddings generated"})
@@ -51,7 +83,10 @@ def index_urls(urls: List[str]) -> dict:
             print(f"❌ Exception processing URL {url}: {e}")
             failed.append({"url": url, "reason": str(e)})
 
-    return {"status": "success", "indexed_urls": indexed, "failed": failed}
+    result = {"status": "success", "indexed_urls": indexed, "failed": failed}
+    if dedup is not None:
+        result["dedup"] = dedup.report(vector_db.dim, checked, duplicates)
+    return result
 
 if __name__ == "__main__":
     # Example URLs to index (replace or extend this list)
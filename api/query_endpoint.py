@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Request
 from app.vector_store import get_vector_store
 from app.embedder import get_embedding_local
-import uuid
-import os
-import re
-import difflib
+from app.snippets import doc_sentences, highlight_snippets
+from app.executor import run_blocking
+from app.export import save_results
+from app import config
 
 router = APIRouter()
 
@@ -18,7 +18,7 @@ def extract_summary(docs, max_chars=600):
         text = doc.get("text", "").strip()
         if not text:
             continue
-        sentences = re.split(r'(?<=[.!?]) +', text)
+        sentences = doc_sentences(doc)
         snippet = sentences[0] if sentences else text[:200]
         if len(snippet) < 100 and len(sentences) > 1:
             snippet += " " + sentences[1]
@@ -30,32 +30,6 @@ def extract_summary(docs, max_chars=600):
             total_len += len(snippet)
     return " ".join(summary_parts)
 
-def highlight_snippet(doc_text, query, max_len=180):
-    """
-    Find the most relevant snippet in the document using fuzzy matching.
-    If best snippet is very short, append next sentence for better context.
-    """
-    sentences = re.split(r'(?<=[.!?]) +', doc_text.strip())
-    if not sentences:
-        return ""
-
-    best_match = max(
-        sentences,
-        key=lambda s: difflib.SequenceMatcher(None, s.lower(), query.lower()).ratio(),
-        default=""
-    )
-    snippet = best_match
-
-    # Append next sentence if snippet is too short
-    try:
-        idx = sentences.index(best_match)
-        if len(best_match) < 50 and idx + 1 < len(sentences):
-            snippet += " " + sentences[idx + 1]
-    except ValueError:
-        pass
-
-    return snippet[:max_len].strip()
-
 def clean_text_fragment(text):
     """
     Clean trailing incomplete fragments from text by truncating
@@ -86,7 +60,7 @@ async def query_endpoint(request: Request):
             return {"error": "❌ `min_score` must be a number."}
 
     # Generate embedding
-    emb = get_embedding_local(query)
+    emb = await run_blocking(get_embedding_local, query)
     if emb is None or len(emb) == 0:
         return {"error": "❌ Failed to generate embedding."}
 
@@ -95,27 +69,25 @@ async def query_endpoint(request: Request):
 
     vector_store = get_vector_store()
 
+    # Range search only materializes hits at or above the threshold
+    score_threshold = config.QUERY_SCORE_THRESHOLD
+    if min_score is not None:
+        score_threshold = max(score_threshold, min_score)
+
     try:
-        results = vector_store.search(emb, top_k=top_k, min_score=min_score)
+        results = await run_blocking(vector_store.range_search, emb, score_threshold, max_results=top_k)
     except TypeError:
         return {
             "error": "❌ Your vector store does not support `min_score`. Please update `vector_store.py`."
         }
 
     if not results:
-        return {"answer": "📝 No relevant documents found.", "citations": []}
-
-    # Sort results by score descending
-    sorted_results = sorted(results, key=lambda x: x.get("score", 0), reverse=True)
-
-    # Filter out low similarity scores (threshold increased to 0.6)
-    score_threshold = 0.6
-    filtered_results = [doc for doc in sorted_results if doc.get("score", 0) >= score_threshold]
-
-    if not filtered_results:
+        if vector_store.index.ntotal == 0:
+            return {"answer": "📝 No relevant documents found.", "citations": []}
         return {"answer": "📝 No relevant documents found with sufficient relevance.", "citations": []}
 
-    sorted_results = filtered_results
+    # Range search returns hits best first
+    sorted_results = results
 
     # Extract summary and clean it
     summary = extract_summary(sorted_results[:top_k])
@@ -124,22 +96,23 @@ async def query_endpoint(request: Request):
         summary = "Found documents but could not extract a meaningful summary."
 
     # Build citations with snippet and clean them
-    citations = []
-    for doc in sorted_results[:top_k]:
-        snippet = highlight_snippet(doc.get("text", ""), query)
-        snippet = clean_text_fragment(snippet)
-        citations.append({
-            "text": snippet,
+    top_docs = sorted_results[:top_k]
+    snippets = highlight_snippets(
+        top_docs, query,
+        query_embedding=emb,
+        sentence_embeddings=vector_store.sentence_embeddings
+    )
+    citations = [
+        {
+            "text": clean_text_fragment(snippet),
             "url": doc.get("url", "")
-        })
+        } for doc, snippet in zip(top_docs, snippets)
+    ]
 
     # Optionally save to CSV
     csv_path = None
     if save_to_csv:
-        os.makedirs("outputs", exist_ok=True)
-        filename = f"query_results_{uuid.uuid4().hex[:6]}.csv"
-        csv_path = os.path.join("outputs", filename)
-        vector_store.search_to_csv(emb, csv_path, top_k=top_k)
+        csv_path = await run_blocking(save_results, top_docs, "csv")
 
     return {
         "query": query,
@@ -0,0 +1,57 @@
+# api/routes_admin.py
+import os
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
+from app.profiling import list_profiles, profile_dir
+from app.admission import admission_stats
+from app.auth import get_verification_cache
+from app.store_registry import CollectionError, get_collection_registry
+from app.export import EXPORT_FORMATS, ExportError, check_format, index_columns, iter_export, iter_index_rows
+from .routes_auth import verify_admin_token
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(verify_admin_token)])
+
+@router.get("/profiles")
+def get_profiles():
+    """List saved request profiles, newest first."""
+    return {"profiles": list_profiles()}
+
+@router.get("/profiles/{name}")
+def download_profile(name: str):
+    """Download one profile (collapsed stacks or speedscope JSON)."""
+    if os.path.basename(name) != name:
+        raise HTTPException(status_code=400, detail="❌ Invalid profile name.")
+    path = os.path.join(profile_dir(), name)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="❌ Profile not found.")
+    media_type = "application/json" if name.endswith(".json") else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=name)
+
+@router.get("/collections")
+def get_collections():
+    """Collections on disk, and which named ones are loaded (most recently used first)."""
+    return get_collection_registry().stats()
+
+@router.get("/admission")
+def get_admission():
+    """Slots in use and queued requests per pool, and the credential cache hit rate."""
+    cache = get_verification_cache()
+    return {
+        "pools": admission_stats(),
+        "auth_cache": {"enabled": False} if cache is None else {"enabled": True, **cache.stats()},
+    }
+
+@router.get("/export/index")
+def export_index(format: str = "jsonl", vectors: bool = False, collection: str = None):
+    """Stream every chunk's metadata (and optionally its vector) for offline analytics."""
+    try:
+        check_format(format)
+        store = get_collection_registry().get(collection).store
+    except (ExportError, CollectionError) as e:
+        raise HTTPException(status_code=400, detail=f"❌ {e}")
+    columns = None if format == "jsonl" else index_columns(store, vectors)
+    return StreamingResponse(
+        iter_export(iter_index_rows(store, include_vectors=vectors), format, columns=columns),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="index.{format}"'}
+    )
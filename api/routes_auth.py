@@ -1,23 +1,40 @@
 # api/routes_auth.py
 
 from fastapi import Header, HTTPException
+from typing import Optional
+import hmac
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+from app import config
+from app.logger import get_logger
+
+log = get_logger(__name__)
 # api/routes_auth.py
 # Import necessary libraries
 # ✅ Load .env explicitly from project root
 dotenv_path = Path(__file__).resolve().parent.parent / ".env"
-print(f"🔍 Loading .env from: {dotenv_path}")
+log.info("🔍 Loading .env", extra={"path": str(dotenv_path)})
 load_dotenv(dotenv_path=dotenv_path)
 
 API_KEY = os.getenv("SECRET_KEY")
 
-def verify_api_key(x_api_key: str = Header(...)):
-    print(f"🔐 Provided API key: {x_api_key}")
-    print(f"🔑 Expected API key: {API_KEY}")
-    if not API_KEY or x_api_key != API_KEY:
+def verify_api_key(x_api_key: Optional[str] = Header(None)):
+    # A missing header is rejected like a wrong one (403), not as a validation error;
+    # the comparison is constant-time so response timing does not leak the key. It is done on
+    # bytes: compare_digest rejects non-ASCII str, and header values may hold any latin-1 byte
+    if not API_KEY or x_api_key is None or not hmac.compare_digest(x_api_key.encode(), API_KEY.encode()):
+        log.warning("🔐 Rejected request with invalid API key")
         raise HTTPException(
             status_code=403,
             detail="❌ Invalid or missing API key."
         )
+
+def verify_admin_token(x_admin_token: Optional[str] = Header(None)):
+    # Same rules as verify_api_key: a missing token is a 403, not a 422
+    if not config.ADMIN_TOKEN or x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), config.ADMIN_TOKEN.encode()):
+        log.warning("🔐 Rejected request with invalid admin token")
+        raise HTTPException(
+            status_code=403,
+            detail="❌ Invalid or missing admin token."
+        )
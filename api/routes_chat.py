@@ -1,13 +1,26 @@
 # routes_chat.py
 
 from fastapi import APIRouter, Depends
-from app.vector_store import get_vector_store
+from fastapi.responses import StreamingResponse
 from app.embedder import get_embedding_local
+from app.snippets import doc_sentences
+from app.query_cache import get_query_cache
+from app.semantic_cache import get_semantic_cache
+from app.intent_router import get_intent_router
+from app.conversations import get_conversation_store
+from app.store_registry import CollectionError, resolve_collection
+from app.executor import run_blocking
+from app.generator import get_generator
+from app.log_sink import traced
+from app.utils import sse_stream
+from app import config
+import time
+from app.logger import get_logger
+from app.metrics import timed
 from .routes_auth import verify_api_key  # import auth dependency
-import traceback
-import re
 
 router = APIRouter()
+log = get_logger(__name__)
 
 def extract_summary(docs, max_chars=600):
     summary_parts = []
@@ -16,7 +29,7 @@ def extract_summary(docs, max_chars=600):
         text = doc.get("text", "").strip()
         if not text:
             continue
-        sentences = re.split(r'(?<=[.!?]) +', text)
+        sentences = doc_sentences(doc)
         snippet = sentences[0] if sentences else text[:200]
         if len(snippet) < 100 and len(sentences) > 1:
             snippet += " " + sentences[1]
@@ -28,77 +41,215 @@ def extract_summary(docs, max_chars=600):
             total_len += len(snippet)
     return " ".join(summary_parts)
 
-@router.post("/api/v1/chat", dependencies=[Depends(verify_api_key)])
-def chat_endpoint(payload: dict):
+def chat_message(content, citations):
+    return {
+        "response": {
+            "answer": {"content": content, "role": "assistant"},
+            "citations": citations
+        }
+    }
+
+def chat_question(payload):
+    """Last message content, as recorded in the request trace."""
+    messages = payload.get("messages")
+    if not messages or not isinstance(messages, list) or not isinstance(messages[-1], dict):
+        return ""
+    return str(messages[-1].get("content", ""))
+
+def intent_message(routed):
+    response = chat_message(routed["answer"], [])
+    response["intent"] = {"name": routed["intent"], "score": routed["score"]}
+    return response
+
+async def chat_pipeline(payload, trace: dict = None):
+    """
+    Run the chat pipeline as (event, data) stages: "citations" once the
+    search returns, then "answer", and finally "result" with the full body.
+
+    With LLM_ENABLED the answer is generated from the retrieved chunks and
+    each generated piece is also yielded as a "token" stage; otherwise it is
+    an extractive summary.
+
+    A `conversation_id` makes retrieval conversation-scoped: earlier turns
+    shape the query and their candidates are reused. Such answers depend on
+    the conversation, so they bypass the query caches.
+
+    A `collection` name answers from that named collection instead of the
+    default store; like conversations, those skip the semantic cache.
+
+    A `trace` dict, when given, is filled with how the question was
+    answered and the hit ids and scores, for the request trace.
+    """
+    trace = {} if trace is None else trace
     try:
         messages = payload.get("messages", [])
         if not messages or not isinstance(messages, list):
-            return {
-                "response": {
-                    "answer": {"content": "No question provided.", "role": "assistant"},
-                    "citations": []
-                }
-            }
+            yield "result", chat_message("No question provided.", [])
+            return
 
         question = messages[-1].get("content", "").strip()
         if not question:
-            return {
-                "response": {
-                    "answer": {"content": "Empty question received.", "role": "assistant"},
-                    "citations": []
-                }
-            }
-
-        print(f"🔍 Getting embedding for: {question}...")
-        vector_store = get_vector_store()
-        emb = get_embedding_local(question)
-        print(f"✅ Got embedding of length {len(emb)}")
-
-        print("🔍 Searching FAISS index...")
-        results = vector_store.search(emb)
-        print(f"📌 Retrieved {len(results)} results.")
+            yield "result", chat_message("Empty question received.", [])
+            return
 
-        if not results:
-            return {
-                "response": {
-                    "answer": {"content": "No relevant documents found.", "role": "assistant"},
-                    "citations": []
-                }
-            }
+        intent_router = get_intent_router()
+        routed = intent_router.match_text(question) if intent_router is not None else None
+        if routed is not None:
+            trace["intent"] = routed["intent"]
+            yield "result", intent_message(routed)
+            return
 
-        sorted_results = sorted(results, key=lambda x: x.get("score", 0), reverse=True)
+        min_score = payload.get("min_score")
+        if min_score is not None:
+            try:
+                min_score = float(min_score)
+            except (ValueError, TypeError):
+                yield "result", chat_message("❌ `min_score` must be a number.", [])
+                return
+
+        try:
+            collection = await resolve_collection(payload.get("collection"))
+        except CollectionError as e:
+            yield "result", chat_message(f"❌ {e}", [])
+            return
+        vector_store = collection.store
+        if not collection.is_default:
+            trace["collection"] = collection.name
+        conversations = get_conversation_store()
+        conversation_id = payload.get("conversation_id")
+        session = None
+        if conversations and conversation_id:
+            session = conversations.session(collection.scoped_id(str(conversation_id)))
+
+        cache = get_query_cache() if session is None else None
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.make_key(
+                "/api/v1/chat", question, vector_store.version, top_k=5, min_score=min_score,
+                llm=config.LLM_MODEL if config.LLM_ENABLED else None, collection=collection.name
+            )
+            cached = cache.get(cache_key)
+            if cached is not None:
+                trace["cache"] = "exact"
+                yield "citations", cached["response"]["citations"]
+                yield "answer", cached["response"]["answer"]
+                yield "result", cached
+                return
+
+        emb = await run_blocking(get_embedding_local, question)
 
-        summary = extract_summary(sorted_results[:3])
-        if not summary:
-            summary = "I found documents but couldn't extract a meaningful summary."
+        routed = intent_router.route(emb) if intent_router is not None else None
+        if routed is not None:
+            trace["intent"] = routed["intent"]
+            yield "result", intent_message(routed)
+            return
 
-        answer_text = f"Based on the information found in the documents, here is a summary:\n\n{summary}"
+        # Paraphrases of a recent question reuse its answer (and skip any LLM call)
+        semantic = get_semantic_cache() if session is None and collection.is_default else None
+        if semantic is not None:
+            semantic_scope = semantic.scope(
+                "/api/v1/chat", top_k=5, min_score=min_score,
+                llm=config.LLM_MODEL if config.LLM_ENABLED else None
+            )
+            cached = semantic.get(emb, vector_store.version, semantic_scope)
+            if cached is not None:
+                trace["cache"] = "semantic"
+                yield "citations", cached["response"]["citations"]
+                yield "answer", cached["response"]["answer"]
+                yield "result", cached
+                return
+        pipeline_start = time.perf_counter()
+
+        def remember(response):
+            if cache_key is not None:
+                cache.set(cache_key, response)
+            if semantic is not None:
+                elapsed_ms = (time.perf_counter() - pipeline_start) * 1000
+                semantic.set(emb, vector_store.version, semantic_scope, question, response, elapsed_ms)
+
+        conversation = None
+        if session is not None:
+            results, conversation = await run_blocking(
+                conversations.retrieve, session, vector_store, emb, top_k=5, min_score=min_score
+            )
+            conversation["id"] = str(conversation_id)
+        elif min_score is not None:
+            results = await run_blocking(vector_store.range_search, emb, min_score, max_results=5)
+        else:
+            results = await run_blocking(vector_store.search, emb)
+
+        trace["hits"] = [{"id": doc.get("id"), "score": doc.get("score")} for doc in results]
+        if not results:
+            response = chat_message("No relevant documents found.", [])
+            if conversation is not None:
+                response["conversation"] = conversation
+            remember(response)
+            yield "result", response
+            return
+
+        sorted_results = sorted(results, key=lambda x: x.get("score", 0), reverse=True)
+        # The generator numbers the same passages that are cited, so its [n] markers match the citations
+        top_docs = sorted_results[:3]
 
         citations = [
             {
                 "text": doc.get("text", "")[:150].strip(),
                 "url": doc.get("url", "")
-            } for doc in sorted_results[:3]
+            } for doc in top_docs
         ]
+        yield "citations", citations
 
-        return {
-            "response": {
-                "answer": {
-                    "content": answer_text,
-                    "role": "assistant"
-                },
-                "citations": citations
-            }
-        }
+        generation = None
+        answer_text = ""
+        if config.LLM_ENABLED:
+            tokens = []
+            async for event, data in get_generator().stream(question, top_docs):
+                if event == "token":
+                    tokens.append(data)
+                    yield "token", data
+                else:
+                    generation = data
+            answer_text = "".join(tokens).strip()
+
+        if not answer_text:
+            with timed("summarize"):
+                summary = extract_summary(top_docs)
+            if not summary:
+                summary = "I found documents but couldn't extract a meaningful summary."
+            answer_text = f"Based on the information found in the documents, here is a summary:\n\n{summary}"
+
+        response = chat_message(answer_text, citations)
+        yield "answer", response["response"]["answer"]
+
+        if generation is not None:
+            response["generation"] = generation
+        if conversation is not None:
+            response["conversation"] = conversation
+        # Timed-out or failed generations are returned but not cached
+        if not (generation and generation["partial"]):
+            remember(response)
+        yield "result", response
 
     except Exception:
-        print("❌ Error in chat_endpoint:\n", traceback.format_exc())
-        return {
-            "response": {
-                "answer": {
-                    "content": "Something went wrong. Please try again later.",
-                    "role": "assistant"
-                },
-                "citations": []
-            }
-        }
+        log.error("❌ Error in chat_endpoint", exc_info=True)
+        yield "result", chat_message("Something went wrong. Please try again later.", [])
+
+@router.post("/api/v1/chat", dependencies=[Depends(verify_api_key)])
+async def chat_endpoint(payload: dict):
+    response = None
+    trace = {}
+    async for event, data in traced("/api/v1/chat", chat_question(payload), chat_pipeline(payload, trace), trace):
+        if event == "result":
+            response = data
+    return response
+
+@router.post("/api/v1/chat/stream", dependencies=[Depends(verify_api_key)])
+async def chat_stream_endpoint(payload: dict):
+    """Server-sent events: `citations`, `token`s when generating, then `answer`, then `result` with the full body."""
+    trace = {}
+    stages = traced("/api/v1/chat/stream", chat_question(payload), chat_pipeline(payload, trace), trace)
+    return StreamingResponse(
+        sse_stream(stages),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
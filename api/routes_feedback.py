@@ -1,12 +1,12 @@
 # api/routes_feedback.py
 from fastapi import APIRouter, Request
-import json
+from app.log_sink import get_feedback_sink
 
 router = APIRouter()
 
 @router.post("/api/feedback")
 async def submit_feedback(request: Request):
     data = await request.json()
-    with open("feedback_log.jsonl", "a") as f:
-        f.write(json.dumps(data) + "\n")
+    # Buffered; a background thread appends it to the feedback log
+    get_feedback_sink().write(data)
     return {"message": "Feedback submitted successfully"}
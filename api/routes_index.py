@@ -1,54 +1,123 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from app.scraper import scrape_text_from_url
 from app.chunker import chunk_text
-from app.embedder import get_embedding_local
-from app.vector_store import get_vector_store
+from app.embedder import get_embedding_local, get_sentence_embeddings
+from app.snippets import sentence_offsets
+from app import config
+from app.store_registry import DEFAULT_COLLECTION, CollectionError, get_collection_registry
 from app.auth import get_current_user
+from app.logger import get_logger
+from app.metrics import INGEST_CHUNKS, INGEST_URLS
 
 router = APIRouter()
+log = get_logger(__name__)
+
+@router.get("/api/v1/index/version")
+def index_version(collection: str = None):
+    """Version of the index snapshot this worker is serving; the same in every worker once reloaded."""
+    try:
+        store = get_collection_registry().get(collection).store
+    except CollectionError as e:
+        raise HTTPException(status_code=400, detail=f"❌ {e}")
+    return {
+        "collection": collection or DEFAULT_COLLECTION,
+        "version": store.version,
+        "epoch": store.epoch,
+        "vectors": store.index.ntotal,
+        "reloads": store.reloads,
+    }
 
 @router.post("/api/v1/index")
 def index_url(data: dict, user: str = Depends(get_current_user)):
     urls = data.get("url", [])
-    vector_db = get_vector_store()
+    # A named collection is created on first ingest
+    registry = get_collection_registry()
+    try:
+        collection = registry.get(data.get("collection"), create=True)
+    except CollectionError as e:
+        raise HTTPException(status_code=400, detail=f"❌ {e}")
+    vector_db = collection.store
+    dedup = collection.dedup
     indexed = []
     failed = []
+    checked = duplicates = 0
 
     for url in urls:
         try:
-            print(f"📥 Starting scrape for URL: {url}")
+            log.info("📥 Starting scrape", extra={"url": url, "collection": collection.name})
             content = scrape_text_from_url(url)
 
             if not content:
-                print(f"⚠️ Empty content for URL: {url}")
+                log.warning("⚠️ Empty content", extra={"url": url})
                 failed.append({"url": url, "reason": "Empty content"})
+                INGEST_URLS.inc(outcome="failed")
                 continue
 
             chunks = chunk_text(content)
-            print(f"🧩 Split content into {len(chunks)} chunks")
+            log.info("🧩 Split content into chunks", extra={"url": url, "chunks": len(chunks)})
 
             embeddings = []
             metadata = []
+            sentence_vectors = []
+            signatures = []
+            skipped = 0
 
             for chunk in chunks:
+                signature = None
+                if dedup is not None:
+                    checked += 1
+                    is_dup, signature = dedup.check(chunk, signatures)
+                    if is_dup:
+                        skipped += 1
+                        continue
                 emb = get_embedding_local(chunk)
                 if emb is not None:
+                    offsets = sentence_offsets(chunk)
                     embeddings.append(emb)
-                    metadata.append({"url": url, "text": chunk})
+                    metadata.append({"url": url, "text": chunk, "sentences": offsets})
+                    if config.SENTENCE_EMBEDDINGS_ENABLED:
+                        sentence_vectors.append(get_sentence_embeddings(chunk, offsets))
+                    if signature is not None:
+                        signatures.append(signature)
                 else:
-                    print(f"⚠️ Failed to get embedding for chunk: {chunk[:50]}...")
+                    log.warning("⚠️ Failed to get embedding for chunk", extra={"url": url, "chunk": chunk[:50]})
+                    INGEST_CHUNKS.inc(outcome="failed")
+
+            duplicates += skipped
+            if skipped:
+                log.info("🪞 Skipped near-duplicate chunks", extra={"url": url, "skipped": skipped})
+                INGEST_CHUNKS.inc(skipped, outcome="duplicate")
 
             if embeddings:
-                vector_db.add(embeddings, metadata)
-                print(f"✅ Added {len(embeddings)} embeddings for URL: {url}")
-                print(f"📌 Total vectors in index: {vector_db.index.ntotal}")
+                vector_db.add(embeddings, metadata, sentence_embeddings=sentence_vectors or None)
+                # Registered only once the chunks are stored, so a failed add can be retried
+                if dedup is not None:
+                    for signature in signatures:
+                        dedup.add(signature)
+                    dedup.save()
+                log.info("✅ Added embeddings",
+                         extra={"url": url, "added": len(embeddings), "total": vector_db.index.ntotal})
+                INGEST_CHUNKS.inc(len(embeddings), outcome="indexed")
+                INGEST_URLS.inc(outcome="indexed")
+                indexed.append(url)
+            elif skipped:
+                log.info("🪞 All chunks were near-duplicates", extra={"url": url})
+                INGEST_URLS.inc(outcome="indexed")
                 indexed.append(url)
             else:
-                print(f"⚠️ No embeddings generated for URL: {url}")
+                log.warning("⚠️ No embeddings generated", extra={"url": url})
+                INGEST_URLS.inc(outcome="failed")
                 failed.append({"url": url, "reason": "No embeddings generated"})
 
         except Exception as e:
-            print(f"❌ Exception processing URL {url}: {e}")
+            log.error("❌ Exception processing URL", extra={"url": url}, exc_info=True)
+            INGEST_URLS.inc(outcome="failed")
             failed.append({"url": url, "reason": str(e)})
 
-    return {"status": "success", "indexed_url": indexed, "failed": failed}
+    registry.refresh(collection)
+    result = {"status": "success", "indexed_url": indexed, "failed": failed}
+    if not collection.is_default:
+        result["collection"] = collection.name
+    if dedup is not None:
+        result["dedup"] = dedup.report(vector_db.dim, checked, duplicates)
+    return result
@@ -0,0 +1,11 @@
+# api/routes_metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.metrics import render_metrics
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of stage latencies, index size, cache and ingest counters."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,19 +1,24 @@
 from fastapi import APIRouter, Request
-from app.vector_store import get_vector_store
+from fastapi.responses import JSONResponse, StreamingResponse
 from app.embedder import get_embedding_local
-import uuid
-import os
-import re
-import difflib
+from app.snippets import doc_sentences, highlight_snippets
+from app.query_cache import get_query_cache
+from app.semantic_cache import get_semantic_cache
+from app.intent_router import get_intent_router
+from app.lexical_index import reciprocal_rank_fusion
+from app.executor import run_blocking
+from app.utils import sse_stream
+from app.metrics import timed
+from app.store_registry import CollectionError, resolve_collection
+from app.deadline import Deadline
+from app.log_sink import traced
+from app.export import EXPORT_FORMATS, ExportError, check_format, iter_export, save_results
+from app import config
+import asyncio
+import time
 
 router = APIRouter()
 
-GENERIC_FALLBACK = (
-    "🤖 I'm here to assist with queries related to the indexed topics. "
-    "It seems your question doesn't match the available content. "
-    "Please rephrase or try asking about GenAI platforms, ColBERT, hallucinations, embedding search, vector databases, or similar AI topics."
-)
-
 def extract_summary(docs, max_chars=600):
     summary_parts = []
     total_len = 0
@@ -21,7 +26,7 @@ def extract_summary(docs, max_chars=600):
         text = doc.get("text", "").strip()
         if not text:
             continue
-        sentences = re.split(r'(?<=[.!?]) +', text)
+        sentences = doc_sentences(doc)
         snippet = sentences[0] if sentences else text[:200]
         if len(snippet) < 100 and len(sentences) > 1:
             snippet += " " + sentences[1]
@@ -33,24 +38,6 @@ def extract_summary(docs, max_chars=600):
             total_len += len(snippet)
     return " ".join(summary_parts)
 
-def highlight_snippet(doc_text, query, max_len=180):
-    sentences = re.split(r'(?<=[.!?]) +', doc_text.strip())
-    if not sentences:
-        return ""
-    best_match = max(
-        sentences,
-        key=lambda s: difflib.SequenceMatcher(None, s.lower(), query.lower()).ratio(),
-        default=""
-    )
-    snippet = best_match
-    try:
-        idx = sentences.index(best_match)
-        if len(best_match) < 50 and idx + 1 < len(sentences):
-            snippet += " " + sentences[idx + 1]
-    except ValueError:
-        pass
-    return snippet[:max_len].strip()
-
 def clean_text_fragment(text):
     text = text.strip()
     if text and text[-1] not in ".!?":
@@ -59,88 +46,388 @@ def clean_text_fragment(text):
             return text[:last_punc + 1]
     return text
 
-def is_stupid_query(query):
+def cache_response(cache, cache_key, response):
+    if cache is not None and cache_key is not None:
+        cache.set(cache_key, response)
+    return response
+
+def with_deadline(response, deadline):
+    """Attach the deadline report after caching, so cached bodies never carry stale timings."""
+    if deadline is not None:
+        response["deadline"] = deadline.report()
+    return response
+
+def intent_response(routed):
+    """Canned answer for small talk and off-topic queries routed before retrieval."""
+    return {
+        "answer": routed["answer"],
+        "citations": [],
+        "intent": {"name": routed["intent"], "score": routed["score"]}
+    }
+
+def leading_snippet(doc, max_len=300):
+    """Citation text without query-aware scoring: the chunk's opening sentences."""
+    snippet = ""
+    for sentence in doc_sentences(doc):
+        if snippet and len(snippet) + len(sentence) + 1 > max_len:
+            break
+        snippet = f"{snippet} {sentence}".strip()
+    return snippet[:max_len] or doc.get("text", "")[:max_len]
+
+SEARCH_MODES = ("dense", "lexical", "hybrid")
+
+def hybrid_search(vector_store, emb, query, top_k, score_threshold):
     """
-    Heuristic check for invalid or nonsense queries.
+    Reciprocal-rank fusion of dense and BM25 candidates. A chunk is kept
+    when it matched the query's keywords or its cosine score clears the
+    threshold; fused hits carry "rrf_score" and, where known, "lexical_score".
     """
-    lowered = query.lower()
-    offensive_words = ["stupid", "nonsense", "idiot", "dumb", "what is this", "nonsense answer"]
-    return any(bad in lowered for bad in offensive_words) or len(query.split()) <= 2
+    pool = max(top_k * 4, 20)
+    dense = vector_store.search(emb, top_k=pool)
+    lexical = vector_store.lexical_search(query, top_k=pool)
+    docs = {doc["id"]: doc for doc in dense}
+    for doc in lexical:
+        docs.setdefault(doc["id"], {**doc, "score": None})["lexical_score"] = doc["score"]
 
-@router.post("/api/query")
-async def query_endpoint(request: Request):
-    payload = await request.json()
+    results = []
+    for doc_id, fused in reciprocal_rank_fusion([[d["id"] for d in dense], [d["id"] for d in lexical]]):
+        doc = docs[doc_id]
+        if "lexical_score" in doc or (doc["score"] or 0) >= score_threshold:
+            doc["rrf_score"] = fused
+            results.append(doc)
+        if len(results) == top_k:
+            break
+    return results
+
+def rank_key(doc):
+    """Order by cross-encoder score, then fused rank, then similarity."""
+    for key in ("rerank_score", "rrf_score", "score"):
+        if doc.get(key) is not None:
+            return doc[key]
+    return 0
+
+def rank_results(results):
+    """
+    Results best first. When the deadline stopped the cross-encoder part way,
+    only the head has a "rerank_score" and the retriever already put the hits
+    in order; its logits and the tail's similarities are not comparable, so
+    that order is kept.
+    """
+    reranked = sum(doc.get("rerank_score") is not None for doc in results)
+    if 0 < reranked < len(results):
+        return list(results)
+    return sorted(results, key=rank_key, reverse=True)
+
+def trace_hits(docs):
+    """Chunk ids and scores of the retrieved hits, for the request trace."""
+    return [{"id": doc.get("id"), "score": doc.get("score")} for doc in docs]
+
+def request_deadline(request: Request, payload) -> Deadline:
+    return Deadline.from_request(
+        request.headers.get("x-deadline-ms"), payload.get("deadline_ms"), config.DEADLINE_DEFAULT_MS
+    )
+
+async def query_pipeline(payload, deadline: Deadline = None, trace: dict = None):
+    """
+    Run the query pipeline as a sequence of (event, data) stages so the
+    buffered and streaming endpoints share one implementation.
+
+    Yields "citations" as soon as the search returns, then "answer", and
+    always finishes with "result" carrying the full response body.
+
+    With a deadline, optional work is cut as the budget runs out (fewer
+    candidates, no query-aware highlighting, no CSV export) and the result
+    lists the degradations applied.
+
+    With `"export": true` the retrieved documents are also yielded as an
+    "export" stage (before "result") for the download endpoint; like CSV
+    export, such requests skip the caches.
+
+    A `"collection"` name searches that named collection instead of the
+    default store. Named collections skip the semantic cache, which tracks
+    a single index version.
+
+    A `trace` dict, when given, is filled with what the request trace
+    records: the search mode, how it was answered, and the hit ids and scores.
+    """
+    trace = {} if trace is None else trace
     query = payload.get("query", "").strip()
     save_to_csv = payload.get("save_to_csv", False)
     top_k = payload.get("top_k", 5)
     min_score = payload.get("min_score", None)
+    two_stage = bool(payload.get("two_stage", config.TWO_STAGE_ENABLED))
+    candidates = payload.get("candidates")
+    budget_ms = payload.get("budget_ms")
+    rerank = bool(payload.get("rerank", False))
+    report_recall = bool(payload.get("report_recall", False))
+    mode = payload.get("mode", "dense")
+    export = bool(payload.get("export", False))
+    trace["mode"] = mode
 
     if not query:
-        return {"error": "❌ Query is empty."}
+        yield "result", {"error": "❌ Query is empty."}
+        return
 
-    if is_stupid_query(query):
-        return {"answer": GENERIC_FALLBACK, "citations": []}
+    if mode not in SEARCH_MODES:
+        yield "result", {"error": f"❌ `mode` must be one of {', '.join(SEARCH_MODES)}."}
+        return
+    # Two-stage retrieval only replaces the dense search
+    two_stage = two_stage and mode == "dense"
+
+    intent_router = get_intent_router()
+    routed = intent_router.match_text(query) if intent_router is not None else None
+    if routed is not None:
+        trace["intent"] = routed["intent"]
+        yield "result", intent_response(routed)
+        return
 
     if min_score is not None:
         try:
             min_score = float(min_score)
         except (ValueError, TypeError):
-            return {"error": "❌ `min_score` must be a number."}
+            yield "result", {"error": "❌ `min_score` must be a number."}
+            return
+
+    try:
+        collection = await resolve_collection(payload.get("collection"))
+    except CollectionError as e:
+        yield "result", {"error": f"❌ {e}"}
+        return
+    vector_store = collection.store
+    if not collection.is_default:
+        trace["collection"] = collection.name
+
+    # Exports need the retrieved documents, so those requests always run the full pipeline
+    cache = get_query_cache()
+    cache_key = None
+    if cache is not None and not (save_to_csv or export or report_recall):
+        cache_key = cache.make_key(
+            "/api/query", query, vector_store.version, top_k=top_k, min_score=min_score,
+            two_stage=two_stage, candidates=candidates, rerank=rerank, mode=mode, collection=collection.name
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            trace["cache"] = "exact"
+            yield "citations", cached.get("citations", [])
+            yield "answer", cached.get("answer", "")
+            yield "result", with_deadline(cached, deadline)
+            return
+
+    # Only hits at or above the threshold are ever materialized
+    score_threshold = config.QUERY_SCORE_THRESHOLD
+    if min_score is not None:
+        score_threshold = max(score_threshold, min_score)
 
-    emb = get_embedding_local(query)
-    if emb is None or len(emb) == 0:
-        return {"error": "❌ Failed to generate embedding."}
+    # Lexical mode never touches the embedder
+    emb = None
+    semantic = semantic_scope = None
+    if mode != "lexical":
+        try:
+            timeout = deadline.remaining_seconds() if deadline else None
+            emb = await asyncio.wait_for(run_blocking(get_embedding_local, query), timeout)
+        except asyncio.TimeoutError:
+            deadline.degrade("embedding_timeout")
+            yield "result", {"error": "⏱️ Deadline exceeded while embedding the query.", "deadline": deadline.report()}
+            return
+        if emb is None or len(emb) == 0:
+            yield "result", {"error": "❌ Failed to generate embedding."}
+            return
+
+        if len(emb.shape) == 1:
+            emb = emb.reshape(1, -1)
 
-    if len(emb.shape) == 1:
-        emb = emb.reshape(1, -1)
+        # Greetings and off-topic chatter get a canned answer before any search
+        routed = intent_router.route(emb) if intent_router is not None else None
+        if routed is not None:
+            trace["intent"] = routed["intent"]
+            yield "result", intent_response(routed)
+            return
 
-    vector_store = get_vector_store()
+        # Paraphrases of a recent query reuse its answer; skipped for the same reasons as the exact cache
+        if collection.is_default and not (save_to_csv or export or report_recall):
+            semantic = get_semantic_cache()
+        if semantic is not None:
+            semantic_scope = semantic.scope(
+                "/api/query", top_k=top_k, min_score=min_score,
+                two_stage=two_stage, candidates=candidates, rerank=rerank, mode=mode
+            )
+            cached = semantic.get(emb, vector_store.version, semantic_scope)
+            if cached is not None:
+                trace["cache"] = "semantic"
+                yield "citations", cached.get("citations", [])
+                yield "answer", cached.get("answer", "")
+                yield "result", with_deadline(cached, deadline)
+                return
+    pipeline_start = time.perf_counter()
 
+    def remember(response):
+        response = cache_response(cache, cache_key, response)
+        if semantic_scope is not None:
+            elapsed_ms = (time.perf_counter() - pipeline_start) * 1000
+            semantic.set(emb, vector_store.version, semantic_scope, query, response, elapsed_ms)
+        return response
+
+    retrieval = None
+    nprobe = None
+    if deadline is not None and two_stage:
+        if deadline.short(config.DEADLINE_FULL_SEARCH_MS):
+            candidates = max(top_k, (candidates or config.TWO_STAGE_CANDIDATES) // 4)
+            nprobe = 1
+            deadline.degrade("reduced_candidates")
+        budget_ms = min(budget_ms or deadline.remaining_ms(), deadline.remaining_ms())
     try:
-        results = vector_store.search(emb, top_k=top_k, min_score=min_score)
+        if mode == "lexical":
+            results = await run_blocking(vector_store.lexical_search, query, top_k=top_k)
+        elif mode == "hybrid":
+            results = await run_blocking(hybrid_search, vector_store, emb, query, top_k, score_threshold)
+        elif two_stage:
+            results, retrieval = await run_blocking(
+                collection.retriever().search, emb, top_k=top_k, min_score=min_score,
+                candidates=candidates, budget_ms=budget_ms, query_text=query,
+                rerank=rerank, report_recall=report_recall, nprobe=nprobe
+            )
+            results = [doc for doc in results if doc.get("score", 0) >= score_threshold]
+        else:
+            results = await run_blocking(vector_store.range_search, emb, score_threshold, max_results=top_k)
     except TypeError:
-        return {
+        yield "result", {
             "error": "❌ Your vector store does not support `min_score`. Please update `vector_store.py`."
         }
+        return
 
+    trace["hits"] = trace_hits(results)
     if not results:
-        return {"answer": "📝 No relevant documents found.", "citations": []}
-
-    sorted_results = sorted(results, key=lambda x: x.get("score", 0), reverse=True)
-    score_threshold = 0.6
-    filtered_results = [doc for doc in sorted_results if doc.get("score", 0) >= score_threshold]
+        if export:
+            yield "export", []
+        answer = "📝 No relevant documents found."
+        if vector_store.index.ntotal > 0:
+            answer = "📝 No relevant documents found with sufficient relevance."
+        response = remember({"answer": answer, "citations": []})
+        yield "result", with_deadline(response, deadline)
+        return
 
-    if not filtered_results:
-        return {"answer": "📝 No relevant documents found with sufficient relevance.", "citations": []}
+    # Cross-encoder reranked hits keep their exact "score" but are ordered by "rerank_score"
+    sorted_results = rank_results(results)
 
-    sorted_results = filtered_results
+    top_docs = sorted_results[:top_k]
+    if export:
+        yield "export", top_docs
+    if deadline is not None and deadline.short(config.DEADLINE_HIGHLIGHT_MS):
+        deadline.degrade("skipped_highlight")
+        snippets = [leading_snippet(doc) for doc in top_docs]
+    else:
+        with timed("highlight"):
+            snippets = highlight_snippets(
+                top_docs, query,
+                query_embedding=emb,
+                sentence_embeddings=vector_store.sentence_embeddings
+            )
+    citations = [
+        {
+            "text": clean_text_fragment(snippet),
+            "url": doc.get("url", "")
+        } for doc, snippet in zip(top_docs, snippets)
+    ]
+    yield "citations", citations
 
-    summary = extract_summary(sorted_results[:top_k])
-    summary = clean_text_fragment(summary)
+    with timed("summarize"):
+        summary = extract_summary(sorted_results[:top_k])
+        summary = clean_text_fragment(summary)
     if not summary:
         summary = "Found documents but could not extract a meaningful summary."
-
-    citations = []
-    for doc in sorted_results[:top_k]:
-        snippet = highlight_snippet(doc.get("text", ""), query)
-        snippet = clean_text_fragment(snippet)
-        citations.append({
-            "text": snippet,
-            "url": doc.get("url", "")
-        })
+    yield "answer", summary
 
     csv_path = None
+    if save_to_csv and deadline is not None and deadline.short(config.DEADLINE_CSV_MS):
+        deadline.degrade("dropped_csv_export")
+        save_to_csv = False
     if save_to_csv:
-        os.makedirs("outputs", exist_ok=True)
-        filename = f"query_results_{uuid.uuid4().hex[:6]}.csv"
-        csv_path = os.path.join("outputs", filename)
-        vector_store.search_to_csv(emb, csv_path, top_k=top_k)
+        # Writes the hits already retrieved; no second search
+        csv_path = await run_blocking(save_results, top_docs, "csv")
 
-    return {
+    response = {
         "query": query,
         "top_k": top_k,
         "min_score": min_score,
         "answer": summary,
         "citations": citations,
-        "csv_path": csv_path if save_to_csv else None
+        "csv_path": csv_path if save_to_csv else None,
+        "mode": mode
     }
+    if retrieval is not None:
+        response["retrieval"] = retrieval
+    if deadline is not None and deadline.degradations:
+        # Degraded answers are not cached, so a later request with more time gets the full result
+        cache_key = semantic_scope = None
+    yield "result", with_deadline(remember(response), deadline)
+
+@router.post("/api/query")
+async def query_endpoint(request: Request):
+    payload = await request.json()
+    try:
+        deadline = request_deadline(request, payload)
+    except ValueError:
+        return {"error": "❌ `deadline_ms` must be a number."}
+    response = None
+    trace = {}
+    stages = traced("/api/query", payload.get("query", ""), query_pipeline(payload, deadline, trace), trace)
+    async for event, data in stages:
+        if event == "result":
+            response = data
+    return response
+
+@router.post("/api/query/stream")
+async def query_stream_endpoint(request: Request):
+    """Server-sent events: `citations`, then `answer`, then `result` with the full body."""
+    payload = await request.json()
+    try:
+        deadline = request_deadline(request, payload)
+    except ValueError:
+        return {"error": "❌ `deadline_ms` must be a number."}
+    trace = {}
+    stages = traced("/api/query/stream", payload.get("query", ""), query_pipeline(payload, deadline, trace), trace)
+    return StreamingResponse(
+        sse_stream(stages),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/api/query/export")
+async def query_export_endpoint(request: Request, format: str = "csv"):
+    """
+    Run a query and stream its retrieved documents as a download
+    (csv, jsonl or parquet), with ids, scores and all chunk metadata.
+    """
+    payload = await request.json()
+    try:
+        check_format(format)
+        deadline = request_deadline(request, payload)
+    except ExportError as e:
+        return JSONResponse({"error": f"❌ {e}"}, status_code=400)
+    except ValueError:
+        return {"error": "❌ `deadline_ms` must be a number."}
+
+    docs, response = [], None
+    trace = {}
+    stages = traced("/api/query/export", payload.get("query", ""),
+                    query_pipeline({**payload, "export": True, "save_to_csv": False}, deadline, trace), trace)
+    async for event, data in stages:
+        if event == "export":
+            docs = data
+        elif event == "result":
+            response = data
+    if "error" in response:
+        return response
+    return StreamingResponse(
+        iter_export(docs, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="query_results.{format}"'}
+    )
+
+@router.get("/api/cache/stats")
+def cache_stats():
+    cache = get_query_cache()
+    semantic = get_semantic_cache()
+    stats = {"enabled": False} if cache is None else {"enabled": True, **cache.stats()}
+    stats["semantic"] = {"enabled": False} if semantic is None else {"enabled": True, **semantic.stats()}
+    return stats
@@ -0,0 +1,242 @@
+# app/admission.py
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+from app import config
+from app.logger import get_logger
+from app.metrics import REGISTRY
+
+log = get_logger(__name__)
+
+ADMISSION_DECISIONS = REGISTRY.counter("rag_admission_total", "Admission decisions by pool and outcome.")
+ADMISSION_IN_FLIGHT = REGISTRY.gauge("rag_admission_in_flight", "Requests holding an admission slot, by pool.")
+
+# (method, path prefix) -> pool; anything else is not admission-controlled
+ADMISSION_ROUTES = (
+    ("POST", "/api/query", "search"),
+    ("POST", "/api/v1/chat", "search"),
+    ("POST", "/api/v1/index", "index"),
+)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """Take one token; returns 0 when admitted, else seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: float, max_keys: int = 10_000):
+        """
+        Per-client token buckets. The least recently seen clients are
+        forgotten beyond `max_keys`, which only ever resets them to a full bucket.
+
+        Args:
+            rate (float): Sustained requests per second per client.
+            burst (float): Bucket size: requests a client may send at once.
+            max_keys (int): Clients tracked at most.
+        """
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> float:
+        """0 when the request may proceed, else the seconds to wait (for Retry-After)."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(time.monotonic())
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    def __init__(self, name: str, limit: int, max_queue: int, timeout: float):
+        """
+        Concurrency limit for one pool of work with a bounded FIFO wait
+        queue. A request that finds the queue full is shed at once, and one
+        that waits longer than `timeout` is shed too, so queueing delay (and
+        p99) stays bounded under overload instead of growing without limit.
+
+        Args:
+            name (str): Pool name, for metrics and logs.
+            limit (int): Requests allowed to run at once.
+            max_queue (int): Requests allowed to wait for a slot.
+            timeout (float): Longest wait for a slot, in seconds.
+        """
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self):
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            ADMISSION_IN_FLIGHT.set(self.in_flight, pool=self.name)
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise Overloaded("queue_full", self.timeout)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot straight to the waiter, so in_flight is unchanged
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                return  # the slot arrived as the wait timed out; keep it
+            raise Overloaded("queue_timeout", self.timeout)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # the client went away after being handed a slot; pass it on
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.set(self.in_flight, pool=self.name)
+
+    def stats(self) -> Dict:
+        return {"in_flight": self.in_flight, "waiting": len(self._waiters), "limit": self.limit,
+                "max_queue": self.max_queue}
+
+
+def client_key(scope, headers: Dict[bytes, bytes]) -> str:
+    """Rate-limit identity: a hash of the API key or bearer token, else the client address."""
+    credential = headers.get(b"x-api-key")
+    authorization = headers.get(b"authorization", b"")
+    if not credential and authorization[:7].lower() == b"bearer ":
+        credential = authorization[7:].strip()
+    if credential:
+        return "cred:" + hashlib.sha256(credential).hexdigest()[:16]
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def route_pool(method: str, path: str) -> Optional[str]:
+    for route_method, prefix, pool in ADMISSION_ROUTES:
+        if method == route_method and (path == prefix or path.startswith(prefix + "/")):
+            return pool
+    return None
+
+
+# Singleton instances
+_rate_limiter: Optional[RateLimiter] = None
+_gates: Dict[str, AdmissionGate] = {}
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """
+    Returns the singleton per-client RateLimiter, or None when RATE_LIMIT_RPS is 0.
+    """
+    global _rate_limiter
+    if config.RATE_LIMIT_RPS <= 0:
+        return None
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter(config.RATE_LIMIT_RPS, config.RATE_LIMIT_BURST)
+    return _rate_limiter
+
+def get_admission_gate(pool: str) -> AdmissionGate:
+    """
+    Returns the singleton AdmissionGate for "search" (embed/search) or "index" work.
+    """
+    gate = _gates.get(pool)
+    if gate is None:
+        limit, max_queue = {
+            "search": (config.SEARCH_MAX_CONCURRENCY, config.SEARCH_MAX_QUEUE),
+            "index": (config.INDEX_MAX_CONCURRENCY, config.INDEX_MAX_QUEUE),
+        }[pool]
+        gate = _gates[pool] = AdmissionGate(pool, limit, max_queue, config.ADMISSION_QUEUE_TIMEOUT)
+    return gate
+
+def admission_stats() -> Dict:
+    return {pool: gate.stats() for pool, gate in _gates.items()}
+
+
+async def _reject(send, status: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode("utf-8")
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"retry-after", str(max(1, round(retry_after))).encode()),
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        """
+        ASGI middleware that admits query, chat and index requests before
+        any work is done: a client over its token bucket gets 429, and when
+        the pool's concurrency limit and wait queue are both full (or the
+        wait times out) the request is shed with 503. Both carry Retry-After.
+        The slot is held until the response, including a stream, is finished.
+        """
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        pool = route_pool(scope.get("method", ""), scope.get("path", "")) if scope["type"] == "http" else None
+        if pool is None or not config.ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = get_rate_limiter()
+        if limiter is not None:
+            wait = limiter.acquire(client_key(scope, dict(scope.get("headers") or [])))
+            if wait:
+                ADMISSION_DECISIONS.inc(pool=pool, outcome="rate_limited")
+                await _reject(send, 429, "❌ Rate limit exceeded. Slow down.", wait)
+                return
+
+        gate = get_admission_gate(pool)
+        try:
+            await gate.acquire()
+        except Overloaded as e:
+            ADMISSION_DECISIONS.inc(pool=pool, outcome="shed")
+            log.warning("🚦 Shed request", extra={"pool": pool, "reason": e.reason, "path": scope["path"]})
+            await _reject(send, 503, "❌ Server is overloaded. Retry shortly.", e.retry_after)
+            return
+        ADMISSION_DECISIONS.inc(pool=pool, outcome="admitted")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
@@ -3,7 +3,14 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from dotenv import load_dotenv
 from datetime import datetime, timedelta, timezone
+from collections import OrderedDict
+from typing import Optional
+import hashlib
 import os
+import threading
+import time
+
+from app import config
 
 # Load environment variables from .env
 load_dotenv()
@@ -27,20 +34,105 @@ def create_token(username: str):
     return encoded_jwt
 
 
+class VerificationCache:
+    def __init__(self, ttl: float, max_entries: int):
+        """
+        Usernames of tokens that already passed verification, keyed by a
+        hash of the token so raw credentials are never kept. An entry lives
+        until the token's own expiry or `ttl`, whichever comes first, so a
+        cached token is never accepted after it would have failed to decode.
+
+        Args:
+            ttl (float): Longest time an entry is trusted, in seconds.
+            max_entries (int): Entries kept; the oldest are dropped first.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[str]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, username: str, expires_at: Optional[float]):
+        expiry = time.time() + self.ttl
+        if expires_at is not None:
+            expiry = min(expiry, expires_at)
+        with self._lock:
+            self._entries[self._key(token)] = (username, expiry)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Singleton instance
+_verification_cache: Optional[VerificationCache] = None
+_verification_cache_lock = threading.Lock()
+
+def get_verification_cache() -> Optional[VerificationCache]:
+    """
+    Returns the singleton VerificationCache, or None when AUTH_CACHE_TTL is 0.
+    """
+    global _verification_cache
+    if config.AUTH_CACHE_TTL <= 0:
+        return None
+    if _verification_cache is None:
+        with _verification_cache_lock:
+            if _verification_cache is None:
+                _verification_cache = VerificationCache(config.AUTH_CACHE_TTL, config.AUTH_CACHE_MAX_ENTRIES)
+    return _verification_cache
+
+
+def verify_token(token: str) -> str:
+    """
+    Return the username of a valid token, decoding it only on a cache miss.
+    Raises JWTError for an invalid or expired token and ValueError when it has no username.
+    """
+    cache = get_verification_cache()
+    if cache is not None:
+        username = cache.get(token)
+        if username is not None:
+            return username
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    username = payload.get("sub")
+    if username is None:
+        raise ValueError("Token has no username")
+    if cache is not None:
+        exp = payload.get("exp")
+        cache.put(token, username, float(exp) if isinstance(exp, (int, float)) else None)
+    return username
+
+
 # Function to extract current user from the token
 def get_current_user(token: str = Depends(oauth2_scheme)):
     """
     Extract and return the current user based on the provided token.
     """
     try:
-        # Decode the token and extract user information
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Token has no username")
-        return username
+        # Verified tokens are cached, so repeat calls skip the decode
+        return verify_token(token)
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=str(e))
     except Exception as e:
         # It's good to avoid catching generic Exception unless necessary
         raise HTTPException(status_code=401, detail=f"Error extracting user: {str(e)}")
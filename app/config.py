@@ -0,0 +1,147 @@
+# app/config.py
+import os
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Near-duplicate chunk detection (MinHash + LSH) at ingest time
+DEDUP_ENABLED = _env_bool("DEDUP_ENABLED", True)
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "3"))
+
+# Query-result cache for /api/query and /api/v1/chat ("memory" or "sqlite")
+QUERY_CACHE_ENABLED = _env_bool("QUERY_CACHE_ENABLED", True)
+QUERY_CACHE_BACKEND = os.getenv("QUERY_CACHE_BACKEND", "memory")
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "600"))
+QUERY_CACHE_PATH = os.path.join(PROJECT_ROOT, os.getenv("QUERY_CACHE_PATH", "outputs/query_cache.sqlite3"))
+
+# Semantic answer cache: reuse answers for paraphrased queries above a cosine threshold
+SEMANTIC_CACHE_ENABLED = _env_bool("SEMANTIC_CACHE_ENABLED", False)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2048"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "600"))
+
+# Store per-sentence embeddings at ingest so citations can be scored by cosine similarity
+SENTENCE_EMBEDDINGS_ENABLED = _env_bool("SENTENCE_EMBEDDINGS_ENABLED", False)
+
+# Executor for blocking embed/search work awaited from async handlers
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# 0 = derive from cpu_count // COMPUTE_WORKERS
+COMPUTE_THREADS_PER_WORKER = int(os.getenv("COMPUTE_THREADS_PER_WORKER", "0"))
+
+# Structured logging (JSON lines on stdout)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_RATE_LIMIT_BURST = int(os.getenv("LOG_RATE_LIMIT_BURST", "20"))
+LOG_RATE_LIMIT_INTERVAL = float(os.getenv("LOG_RATE_LIMIT_INTERVAL", "10"))
+
+# Admin token for operator endpoints and the X-Profile request header
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# On-demand request profiling (middleware is not installed unless enabled)
+PROFILING_ENABLED = _env_bool("PROFILING_ENABLED", False)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = os.path.join(PROJECT_ROOT, os.getenv("PROFILE_DIR", "outputs/profiles"))
+PROFILE_TTL = float(os.getenv("PROFILE_TTL", "604800"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "500"))
+
+# Two-stage retrieval: compressed/ANN candidates, exact rescoring, optional cross-encoder
+TWO_STAGE_ENABLED = _env_bool("TWO_STAGE_ENABLED", False)
+TWO_STAGE_INDEX = os.getenv("TWO_STAGE_INDEX", "SQ8")
+TWO_STAGE_CANDIDATES = int(os.getenv("TWO_STAGE_CANDIDATES", "100"))
+TWO_STAGE_RERANK_DEPTH = int(os.getenv("TWO_STAGE_RERANK_DEPTH", "20"))
+TWO_STAGE_NPROBE = int(os.getenv("TWO_STAGE_NPROBE", "8"))
+CROSS_ENCODER_MODEL = os.getenv("CROSS_ENCODER_MODEL", "")
+
+# Minimum cosine similarity for a chunk to be cited by /api/query
+QUERY_SCORE_THRESHOLD = float(os.getenv("QUERY_SCORE_THRESHOLD", "0.6"))
+
+# Per-request deadlines (X-Deadline-Ms header or "deadline_ms" in the payload; 0 = none).
+# Optional stages are degraded when less than their threshold is left.
+DEADLINE_DEFAULT_MS = float(os.getenv("DEADLINE_DEFAULT_MS", "0"))
+DEADLINE_FULL_SEARCH_MS = float(os.getenv("DEADLINE_FULL_SEARCH_MS", "100"))
+DEADLINE_HIGHLIGHT_MS = float(os.getenv("DEADLINE_HIGHLIGHT_MS", "50"))
+DEADLINE_CSV_MS = float(os.getenv("DEADLINE_CSV_MS", "100"))
+
+# LLM answer generation for /api/v1/chat via any OpenAI-compatible API (extractive summary when disabled)
+LLM_ENABLED = _env_bool("LLM_ENABLED", False)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "")
+LLM_API_KEY = os.getenv("LLM_API_KEY", os.getenv("OPENAI_API_KEY", ""))
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "3000"))
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "512"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+
+# Embedding-based intent router: canned answers for small talk before retrieval
+INTENT_ROUTER_ENABLED = _env_bool("INTENT_ROUTER_ENABLED", True)
+INTENT_THRESHOLD = float(os.getenv("INTENT_THRESHOLD", "0.8"))
+
+# Conversation-scoped retrieval for /api/v1/chat requests that carry a conversation_id
+CONVERSATIONS_ENABLED = _env_bool("CONVERSATIONS_ENABLED", True)
+CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "1000"))
+CONVERSATION_TTL = float(os.getenv("CONVERSATION_TTL", "1800"))
+CONVERSATION_MAX_TURNS = int(os.getenv("CONVERSATION_MAX_TURNS", "5"))
+CONVERSATION_SEARCH_CANDIDATES = int(os.getenv("CONVERSATION_SEARCH_CANDIDATES", "30"))
+CONVERSATION_MAX_CANDIDATES = int(os.getenv("CONVERSATION_MAX_CANDIDATES", "100"))
+CONVERSATION_REUSE_MIN_SCORE = float(os.getenv("CONVERSATION_REUSE_MIN_SCORE", "0.5"))
+CONVERSATION_CONTEXT_WEIGHT = float(os.getenv("CONVERSATION_CONTEXT_WEIGHT", "0.5"))
+
+# Buffered JSONL sinks for feedback and per-query traces. Paths are anchored at
+# the project root (not the working directory); segments rotate at LOG_SINK_MAX_BYTES.
+FEEDBACK_LOG_PATH = os.path.join(PROJECT_ROOT, os.getenv("FEEDBACK_LOG_PATH", "feedback_log.jsonl"))
+REQUEST_TRACE_ENABLED = _env_bool("REQUEST_TRACE_ENABLED", True)
+REQUEST_TRACE_PATH = os.path.join(PROJECT_ROOT, os.getenv("REQUEST_TRACE_PATH", "outputs/logs/requests.jsonl"))
+LOG_SINK_MAX_BYTES = int(os.getenv("LOG_SINK_MAX_BYTES", str(50 * 1024 * 1024)))
+LOG_SINK_BACKUP_COUNT = int(os.getenv("LOG_SINK_BACKUP_COUNT", "10"))
+LOG_SINK_FLUSH_RECORDS = int(os.getenv("LOG_SINK_FLUSH_RECORDS", "100"))
+LOG_SINK_FLUSH_INTERVAL = float(os.getenv("LOG_SINK_FLUSH_INTERVAL", "1.0"))
+
+# Query result exports (save_to_csv files); old files are removed as new ones are written
+EXPORT_DIR = os.path.join(PROJECT_ROOT, os.getenv("EXPORT_DIR", "outputs/exports"))
+EXPORT_TTL = float(os.getenv("EXPORT_TTL", "86400"))
+EXPORT_MAX_FILES = int(os.getenv("EXPORT_MAX_FILES", "200"))
+
+# Default vector store directory, anchored at the project root like the log sinks
+VECTOR_STORE_DIR = os.path.join(PROJECT_ROOT, os.getenv("VECTOR_STORE_DIR", "outputs"))
+# The default store's near-duplicate signatures live beside its files, as each collection's do
+DEDUP_INDEX_PATH = os.path.join(VECTOR_STORE_DIR, os.getenv("DEDUP_INDEX_PATH", "minhash_signatures.npy"))
+
+# Sharded vector store: >1 partitions vectors across shards searched in parallel ("hash" or "url" routing)
+VECTOR_SHARDS = int(os.getenv("VECTOR_SHARDS", "1"))
+VECTOR_SHARD_BY = os.getenv("VECTOR_SHARD_BY", "hash")
+VECTOR_SHARD_DIR = os.path.join(PROJECT_ROOT, os.getenv("VECTOR_SHARD_DIR", "outputs/shards"))
+
+# Named collections (a "collection" request parameter), one directory each, loaded on first
+# use and evicted least-recently-used beyond the memory budget or count (0 = no limit)
+COLLECTIONS_DIR = os.path.join(PROJECT_ROOT, os.getenv("COLLECTIONS_DIR", "outputs/collections"))
+COLLECTION_MEMORY_MB = float(os.getenv("COLLECTION_MEMORY_MB", "1024"))
+COLLECTION_MAX_LOADED = int(os.getenv("COLLECTION_MAX_LOADED", "8"))
+
+# Seconds between checks of the index manifests for writes by other worker processes (0 = never reload)
+INDEX_RELOAD_INTERVAL = float(os.getenv("INDEX_RELOAD_INTERVAL", "2"))
+
+# Verified JWTs are cached (by token hash) until they expire or for this many seconds (0 = no cache)
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+# Admission control for query/chat ("search") and index requests: a per-client token bucket
+# (429 when empty, RATE_LIMIT_RPS=0 disables) and a concurrency limit per pool with a bounded
+# wait queue; requests beyond the queue, or waiting longer than the timeout, are shed with 503
+ADMISSION_ENABLED = _env_bool("ADMISSION_ENABLED", True)
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "10"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "20"))
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", str(COMPUTE_WORKERS * 4)))
+SEARCH_MAX_QUEUE = int(os.getenv("SEARCH_MAX_QUEUE", "64"))
+INDEX_MAX_CONCURRENCY = int(os.getenv("INDEX_MAX_CONCURRENCY", "2"))
+INDEX_MAX_QUEUE = int(os.getenv("INDEX_MAX_QUEUE", "4"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
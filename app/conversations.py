@@ -0,0 +1,166 @@
+# app/conversations.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app import config
+from app.metrics import REGISTRY
+from app.vector_store import VectorStore
+
+CONVERSATION_RETRIEVALS = REGISTRY.counter(
+    "rag_conversation_retrievals_total", "Chat retrievals by source (reused session candidates or full search)."
+)
+
+
+class ConversationSession:
+    """Recent turn embeddings and the chunk ids retrieved so far in one conversation."""
+
+    def __init__(self, session_id: str, max_turns: int):
+        self.id = session_id
+        self.max_turns = max_turns
+        self.turns: List[np.ndarray] = []
+        self.candidate_ids: List[int] = []
+        self.index_version = None
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add_turn(self, embedding: np.ndarray):
+        self.turns.append(embedding)
+        del self.turns[:-self.max_turns]
+
+
+class ConversationStore:
+    def __init__(self, max_sessions: int = 1000, ttl: float = 1800, max_turns: int = 5,
+                 search_candidates: int = 30, max_candidates: int = 100,
+                 reuse_min_score: float = 0.5, context_weight: float = 0.5):
+        """
+        Conversation-scoped retrieval state for multi-turn chat.
+
+        Each turn is retrieved with the new question's embedding blended with
+        the session's recent turn embeddings, so follow-ups keep their
+        context. Chunks already retrieved in the conversation are rescored
+        first, and the full index is searched only when they no longer cover
+        the question. Sessions are evicted LRU beyond `max_sessions` and
+        expire after `ttl` seconds idle.
+
+        Args:
+            max_sessions (int): Sessions kept before the least recently used is dropped.
+            ttl (float): Idle seconds before a session expires (0 = never).
+            max_turns (int): Recent turn embeddings kept per session.
+            search_candidates (int): Chunks fetched from the full index per search.
+            max_candidates (int): Cap on a session's cached candidate ids.
+            reuse_min_score (float): Score the top_k-th cached candidate must reach to skip the full search.
+            context_weight (float): Weight of earlier turns in the blended query.
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.search_candidates = search_candidates
+        self.max_candidates = max_candidates
+        self.reuse_min_score = reuse_min_score
+        self.context_weight = context_weight
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.expired = 0
+
+    def session(self, session_id: str) -> ConversationSession:
+        """Returns the live session for `session_id`, starting a new one if it is unknown or expired."""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and self.ttl and now - session.updated > self.ttl:
+                del self._sessions[session_id]
+                self.expired += 1
+                session = None
+            if session is None:
+                session = ConversationSession(session_id, self.max_turns)
+                self._sessions[session.id] = session
+            session.updated = now
+            self._sessions.move_to_end(session.id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def _context_query(self, session: ConversationSession, query: np.ndarray) -> np.ndarray:
+        if not session.turns:
+            return query
+        blended = query + self.context_weight * np.mean(session.turns, axis=0)
+        norm = np.linalg.norm(blended)
+        return blended / norm if norm else query
+
+    def retrieve(self, session: ConversationSession, store: VectorStore, query_embedding,
+                 top_k: int = 5, min_score: Optional[float] = None) -> Tuple[List[Dict], Dict]:
+        """
+        Retrieve top_k chunks for the next turn of a conversation.
+
+        Returns:
+            Tuple[List[Dict], Dict]: Results with metadata and scores, and
+            {"turn", "source", "candidates"} describing how they were found.
+        """
+        query = store.prepare_query(query_embedding)[0]
+        with session.lock:
+            context = self._context_query(session, query)
+            if session.index_version != store.version:
+                # Ids are positions in the flat index; a reset/reload invalidates them
+                session.candidate_ids = []
+                session.index_version = store.version
+
+            source = "search"
+            ids, scores = self._rescore(store, session.candidate_ids, context)
+            if store.use_cosine and len(ids) >= top_k and scores[top_k - 1] >= self.reuse_min_score:
+                source = "reused"
+            elif store.index.ntotal:
+                _, found = store.index.search(context.reshape(1, -1), self.search_candidates)
+                merged = list(dict.fromkeys([int(i) for i in found[0] if i >= 0] + session.candidate_ids))
+                session.candidate_ids = merged[:self.max_candidates]
+                ids, scores = self._rescore(store, session.candidate_ids, context)
+
+            session.add_turn(query)
+            turn = len(session.turns)
+
+        CONVERSATION_RETRIEVALS.inc(source=source)
+        results = store.build_results(ids[:top_k], scores[:top_k], min_score)
+        return results, {"turn": turn, "source": source, "candidates": len(session.candidate_ids)}
+
+    @staticmethod
+    def _rescore(store: VectorStore, ids: List[int], query: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = store.index.reconstruct_batch(ids)
+        if store.use_cosine:
+            scores = vectors @ query
+            order = np.argsort(-scores)
+        else:
+            scores = ((vectors - query) ** 2).sum(axis=1)
+            order = np.argsort(scores)
+        return ids[order], scores[order]
+
+    def stats(self) -> Dict:
+        return {"sessions": len(self._sessions), "expired": self.expired}
+
+
+# Singleton instance
+_conversation_store_instance: Optional[ConversationStore] = None
+
+def get_conversation_store() -> Optional[ConversationStore]:
+    """
+    Returns a singleton ConversationStore, or None when conversation retrieval is disabled.
+    """
+    global _conversation_store_instance
+    if not config.CONVERSATIONS_ENABLED:
+        return None
+    if _conversation_store_instance is None:
+        _conversation_store_instance = ConversationStore(
+            max_sessions=config.CONVERSATION_MAX_SESSIONS,
+            ttl=config.CONVERSATION_TTL,
+            max_turns=config.CONVERSATION_MAX_TURNS,
+            search_candidates=config.CONVERSATION_SEARCH_CANDIDATES,
+            max_candidates=config.CONVERSATION_MAX_CANDIDATES,
+            reuse_min_score=config.CONVERSATION_REUSE_MIN_SCORE,
+            context_weight=config.CONVERSATION_CONTEXT_WEIGHT,
+        )
+    return _conversation_store_instance
@@ -8,6 +8,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.vector_store import get_vector_store
 from app.embedder import get_embedding_local
+from app.snippets import sentence_offsets
+from app.dedup import get_dedup_index
 
 # List of source URLs to index
 URLS = [
@@ -44,7 +46,9 @@ def ingest_documents():
     Fetch content, generate embeddings, and add to the vector store.
     """
     vector_store = get_vector_store()
+    dedup = get_dedup_index()
     total_chunks = 0
+    checked = duplicates = 0
 
     for url in URLS:
         print(f"🔍 Fetching: {url}")
@@ -55,21 +59,37 @@ def ingest_documents():
 
         chunks = chunk_text(text, max_tokens=300)
         docs = []
+        signatures = []
 
         for chunk in chunks:
+            signature = None
+            if dedup is not None:
+                checked += 1
+                is_dup, signature = dedup.check(chunk, signatures)
+                if is_dup:
+                    duplicates += 1
+                    continue
             embedding = get_embedding_local(chunk)
             if embedding is None:
                 print("⚠️ Failed to get embedding for a chunk, skipping it.")
                 continue
+            if signature is not None:
+                signatures.append(signature)
 
             docs.append({
                 "text": chunk,
                 "url": url,
+                "sentences": sentence_offsets(chunk),
                 "embedding": embedding
             })
 
         if docs:
             vector_store.add_documents(docs)
+            # Registered only once the chunks are stored, so a failed add can be retried
+            if dedup is not None:
+                for signature in signatures:
+                    dedup.add(signature)
+                dedup.save()
             total_chunks += len(docs)
             print(f"✅ Indexed {len(docs)} chunks from: {url}")
         else:
@@ -77,6 +97,8 @@ def ingest_documents():
 
     print(f"🔍 Total indexed chunks: {total_chunks}")
     print(f"📦 FAISS Index size: {vector_store.index.ntotal}")
+    if dedup is not None:
+        print(f"🪞 Near-duplicate report: {dedup.report(vector_store.dim, checked, duplicates)}")
 
 if __name__ == "__main__":
     ingest_documents()
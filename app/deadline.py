@@ -0,0 +1,65 @@
+# app/deadline.py
+import time
+from typing import Dict, List, Optional
+
+
+class Deadline:
+    def __init__(self, budget_ms: float):
+        """
+        Per-request latency budget, started when the request is accepted.
+
+        Pipeline stages check `remaining_ms()` before optional work and call
+        `degrade(name)` when they cut it, so the response can report what was
+        skipped.
+
+        Args:
+            budget_ms (float): Total time allowed for the request, in milliseconds.
+        """
+        self.budget_ms = float(budget_ms)
+        self.start = time.perf_counter()
+        self.degradations: List[str] = []
+
+    @classmethod
+    def from_request(cls, header_value: Optional[str], payload_value=None,
+                     default_ms: float = 0) -> Optional["Deadline"]:
+        """
+        Build a deadline from the `X-Deadline-Ms` header, the payload's
+        `deadline_ms`, or the configured default, in that order. Returns None
+        when none is set (or it is not a positive number).
+        """
+        for value in (header_value, payload_value, default_ms):
+            if value in (None, ""):
+                continue
+            try:
+                budget = float(value)
+            except (TypeError, ValueError):
+                raise ValueError("deadline must be a number of milliseconds")
+            return cls(budget) if budget > 0 else None
+        return None
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def remaining_ms(self) -> float:
+        return max(0.0, self.budget_ms - self.elapsed_ms())
+
+    def remaining_seconds(self) -> float:
+        return self.remaining_ms() / 1000
+
+    def expired(self) -> bool:
+        return self.remaining_ms() <= 0
+
+    def short(self, needed_ms: float) -> bool:
+        """True when less than `needed_ms` of the budget is left."""
+        return self.remaining_ms() < needed_ms
+
+    def degrade(self, name: str):
+        if name not in self.degradations:
+            self.degradations.append(name)
+
+    def report(self) -> Dict:
+        return {
+            "budget_ms": self.budget_ms,
+            "elapsed_ms": round(self.elapsed_ms(), 3),
+            "degradations": list(self.degradations),
+        }
@@ -0,0 +1,261 @@
+# app/dedup.py
+import os
+import re
+import zlib
+import numpy as np
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app import config
+from app.logger import get_logger
+from app.manifest import IndexManifest
+
+log = get_logger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Pick (bands, rows) so the LSH candidate threshold (1/b)^(1/r) sits just
+    below the requested similarity threshold. Candidates are verified against
+    the estimated Jaccard similarity afterwards, so erring low only costs a
+    few extra comparisons.
+    """
+    best = (num_perm, 1)
+    best_gap = float("inf")
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        candidate_threshold = (1.0 / bands) ** (1.0 / rows)
+        gap = threshold - candidate_threshold
+        if 0 <= gap < best_gap:
+            best, best_gap = (bands, rows), gap
+    return best
+
+
+class NearDuplicateDetector:
+    def __init__(self, threshold: float = 0.85, num_perm: int = 128,
+                 shingle_size: int = 3, index_path: Optional[str] = "outputs/minhash_signatures.npy",
+                 seed: int = 1):
+        """
+        MinHash + LSH near-duplicate detector for text chunks.
+
+        Args:
+            threshold (float): Estimated Jaccard similarity at or above which a chunk is a duplicate.
+            num_perm (int): Number of MinHash permutations per signature.
+            shingle_size (int): Number of consecutive words per shingle.
+            index_path (str): Path to save/load the signature index (None keeps it in memory only).
+            seed (int): Seed for the permutation parameters. Must stay fixed for persisted signatures.
+        """
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("Threshold must be in (0, 1].")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.index_path = index_path
+        self.bands, self.rows = _choose_bands(num_perm, threshold)
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+        self.signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self._pending: List[np.ndarray] = []
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        self.stats = {"checked": 0, "duplicates": 0}
+        # Other worker processes append to the same file: writes are locked and merged,
+        # and a changed file (by stat) is folded in before the next check
+        self._file = IndexManifest(index_path) if index_path else None
+        self._file_signature = None
+
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.signatures) + len(self._pending)
+
+    def _shingles(self, text: str) -> List[bytes]:
+        tokens = _TOKEN_RE.findall(text.lower())
+        if not tokens:
+            return []
+        if len(tokens) <= self.shingle_size:
+            return [" ".join(tokens).encode("utf-8")]
+        k = self.shingle_size
+        return list({" ".join(tokens[i:i + k]).encode("utf-8") for i in range(len(tokens) - k + 1)})
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Compute the MinHash signature of a text, or None if it has no tokens."""
+        shingles = self._shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, signature[start:start + self.rows].tobytes()
+
+    def _get_row(self, row_id: int) -> np.ndarray:
+        if row_id < len(self.signatures):
+            return self.signatures[row_id]
+        return self._pending[row_id - len(self.signatures)]
+
+    def find_duplicate(self, signature: np.ndarray) -> Tuple[Optional[int], float]:
+        """Return (row id, estimated similarity) of the closest indexed duplicate, or (None, 0.0)."""
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+
+        best_id, best_sim = None, 0.0
+        for row_id in candidates:
+            sim = float(np.mean(self._get_row(row_id) == signature))
+            if sim >= self.threshold and sim > best_sim:
+                best_id, best_sim = row_id, sim
+        return best_id, best_sim
+
+    def check(self, text: str, batch: Sequence[np.ndarray] = ()) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Check a chunk against the signature index without registering it.
+
+        Args:
+            text (str): Chunk text.
+            batch (Sequence[np.ndarray]): Signatures of chunks accepted earlier in the
+                same ingest batch and not yet registered; duplicates of them count too.
+
+        Returns:
+            Tuple[bool, np.ndarray]: (is_duplicate, signature). Pass the signature to
+            `add` once the chunk has actually been indexed.
+        """
+        self.refresh()
+        self.stats["checked"] += 1
+        signature = self.signature(text)
+        if signature is None:
+            return False, None
+        dup_id, _ = self.find_duplicate(signature)
+        if dup_id is not None or any(np.mean(other == signature) >= self.threshold for other in batch):
+            self.stats["duplicates"] += 1
+            return True, signature
+        return False, signature
+
+    def add(self, signature: Optional[np.ndarray]):
+        """Register a signature so later near-duplicates of it are detected."""
+        if signature is None:
+            return
+        row_id = len(self)
+        self._pending.append(signature)
+        for key in self._band_keys(signature):
+            self._buckets[key].append(row_id)
+
+    def _rebuild_buckets(self):
+        # Built aside and swapped in, so concurrent checks never see a partial table
+        buckets = defaultdict(list)
+        for row_id, signature in enumerate(list(self.signatures) + self._pending):
+            for key in self._band_keys(signature):
+                buckets[key].append(row_id)
+        self._buckets = buckets
+
+    def save(self):
+        """Append pending signatures to the file, merging rows other processes wrote since we read it."""
+        if not self.index_path:
+            if self._pending:
+                self.signatures = np.vstack([self.signatures, np.stack(self._pending)])
+                self._pending = []
+            return
+        with self._file.locked():
+            self._read_file()
+            if self._pending:
+                self.signatures = np.vstack([self.signatures, np.stack(self._pending)])
+                self._pending = []
+            index_dir = os.path.dirname(self.index_path)
+            if index_dir:
+                os.makedirs(index_dir, exist_ok=True)
+            with open(self.index_path, "wb") as f:
+                np.save(f, self.signatures)
+            self._file_signature = self._file.signature()
+
+    def refresh(self):
+        """Fold in signatures another process saved; one stat() when the file is unchanged."""
+        if self._file is None or self._file.signature() == self._file_signature:
+            return
+        with self._file.locked(exclusive=False):
+            self._read_file()
+
+    def _read_file(self):
+        # Caller holds the file lock. The file only grows between resets, so any change
+        # means other rows on disk: adopt them and re-index our pending rows after them.
+        signature = self._file.signature()
+        if signature == self._file_signature:
+            return
+        self._file_signature = signature
+        if signature is None:  # reset by another process
+            signatures = np.empty((0, self.num_perm), dtype=np.uint32)
+        else:
+            signatures = np.load(self.index_path)
+        if signatures.ndim != 2 or signatures.shape[1] != self.num_perm:
+            log.warning("⚠️ Ignoring signature index with mismatched shape",
+                        extra={"shape": list(signatures.shape), "num_perm": self.num_perm})
+            return
+        if len(signatures) == len(self.signatures):
+            return
+        self.signatures = signatures.astype(np.uint32)
+        self._rebuild_buckets()
+
+    def _load(self):
+        """Load the signature index from disk."""
+        if self._file is None or self._file.signature() is None:
+            return
+        with self._file.locked(exclusive=False):
+            self._read_file()
+        if len(self.signatures):
+            log.info("📥 Loaded MinHash signatures",
+                     extra={"path": self.index_path, "signatures": len(self.signatures)})
+
+    def reset(self):
+        """Drop all signatures and delete the persisted index."""
+        self.signatures = np.empty((0, self.num_perm), dtype=np.uint32)
+        self._pending = []
+        self._buckets = defaultdict(list)
+        self.stats = {"checked": 0, "duplicates": 0}
+        if self._file is not None:
+            with self._file.locked():
+                if os.path.exists(self.index_path):
+                    os.remove(self.index_path)
+                self._file_signature = None
+
+    def report(self, dim: int, checked: int, duplicates: int) -> Dict:
+        """
+        Summarize one ingest call: duplicates skipped and the FAISS index bytes
+        that saved (float32 vectors). `stats` holds the process-lifetime totals.
+        """
+        return {
+            "checked_chunks": checked,
+            "near_duplicates_skipped": duplicates,
+            "skip_ratio": round(duplicates / checked, 4) if checked else 0.0,
+            "index_bytes_saved": duplicates * dim * 4,
+            "signatures_indexed": len(self),
+        }
+
+
+# Singleton instance
+_dedup_instance: Optional[NearDuplicateDetector] = None
+
+def get_dedup_index() -> Optional[NearDuplicateDetector]:
+    """
+    Returns a singleton NearDuplicateDetector, or None when dedup is disabled.
+    """
+    global _dedup_instance
+    if not config.DEDUP_ENABLED:
+        return None
+    if _dedup_instance is None:
+        _dedup_instance = NearDuplicateDetector(
+            threshold=config.DEDUP_THRESHOLD,
+            num_perm=config.DEDUP_NUM_PERM,
+            shingle_size=config.DEDUP_SHINGLE_SIZE,
+            index_path=config.DEDUP_INDEX_PATH,
+        )
+    return _dedup_instance
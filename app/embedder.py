@@ -1,4 +1,8 @@
 from sentence_transformers import SentenceTransformer
+from app.logger import get_logger
+from app.metrics import timed
+
+log = get_logger(__name__)
 
 # Load the model once
 model = SentenceTransformer('all-MiniLM-L6-v2')
@@ -13,12 +17,30 @@ def get_embedding_local(text):
     Returns:
     - list: Embedding vector.
     """
-    print(f"🔍 Getting embedding for: {text[:60]}...")
-    embedding = model.encode(text)
-    print(f"✅ Got embedding of length {len(embedding)}")
+    with timed("embed"):
+        embedding = model.encode(text)
+    log.debug("🔍 Embedded text", extra={"chars": len(text), "dim": len(embedding)})
     return embedding
 
-# Example
-text = "Building A Generative AI Platform"
-embedding = get_embedding_local(text)
-print(f"Embedding (first 5 values): {embedding[:5]}")
+def get_sentence_embeddings(text, offsets):
+    """
+    Embed each sentence of a chunk in one batch.
+
+    Parameters:
+    - text (str): The chunk text.
+    - offsets (list): [start, end) character offsets of each sentence.
+
+    Returns:
+    - np.ndarray or None: One embedding row per sentence.
+    """
+    sentences = [text[start:end] for start, end in offsets]
+    if not sentences:
+        return None
+    with timed("embed"):
+        return model.encode(sentences, batch_size=32)
+
+if __name__ == "__main__":
+    # Example
+    text = "Building A Generative AI Platform"
+    embedding = get_embedding_local(text)
+    print(f"Embedding (first 5 values): {embedding[:5]}")
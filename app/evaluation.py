@@ -0,0 +1,227 @@
+# app/evaluation.py
+import gzip
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import faiss
+import numpy as np
+
+from app.logger import get_logger
+from app.two_stage import TwoStageRetriever
+from app.vector_store import VectorStore
+
+log = get_logger(__name__)
+
+EVAL_MODES = ("dense", "lexical", "hybrid", "two_stage")
+# Numeric report fields compared between configurations
+COMPARED_METRICS = ("recall_at_k", "empty_rate", "avg_results", "qps",
+                    "latency_ms.mean", "latency_ms.p50", "latency_ms.p90", "latency_ms.p99")
+
+
+def _open_text(path: str):
+    return gzip.open(path, "rt", encoding="utf-8") if path.endswith(".gz") else open(path, encoding="utf-8")
+
+
+def load_queries(paths: Iterable[str], limit: Optional[int] = None) -> List[str]:
+    """
+    Collect distinct queries, in first-seen order, from logged traffic or a query set.
+
+    JSONL records contribute their "query" (request traces, query sets) or
+    "user_input" (feedback log); any other file is read as one query per
+    line. Rotated ".gz" segments are read as well. Missing files are skipped,
+    as are traced requests the intent router answered.
+    """
+    seen = {}
+    for path in paths:
+        if not os.path.exists(path):
+            log.warning("⚠️ Query source not found", extra={"path": path})
+            continue
+        jsonl = path.endswith((".jsonl", ".jsonl.gz"))
+        with _open_text(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if jsonl:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if not isinstance(record, dict) or record.get("intent"):
+                        # Small talk answered by the intent router never reached retrieval
+                        continue
+                    query = record.get("query") or record.get("user_input")
+                else:
+                    query = line
+                if isinstance(query, str) and query.strip():
+                    seen.setdefault(query.strip(), None)
+                if limit is not None and len(seen) >= limit:
+                    return list(seen)
+    return list(seen)
+
+
+def exact_neighbors(store: VectorStore, queries: np.ndarray, k: int) -> np.ndarray:
+    """
+    Ground-truth top-k ids from an exhaustive flat index over the store's
+    full-precision vectors (inner product for cosine stores, else L2).
+    """
+    ntotal = store.index.ntotal
+    truth = faiss.IndexFlatIP(store.dim) if store.use_cosine else faiss.IndexFlatL2(store.dim)
+    if ntotal:
+        truth.add(store.index.reconstruct_n(0, ntotal))
+    prepared = np.vstack([store.prepare_query(q) for q in queries]) if len(queries) else np.empty((0, store.dim), np.float32)
+    _, ids = truth.search(prepared, min(k, ntotal) or 1)
+    return ids
+
+
+def recall_at_k(retrieved: List[int], truth: Iterable[int], k: int) -> float:
+    """Fraction of the exact top-k that the configuration returned in its top-k."""
+    truth = [int(i) for i in truth if i >= 0][:k]
+    if not truth:
+        return 1.0
+    return len(set(retrieved[:k]) & set(truth)) / len(truth)
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict:
+    values = np.asarray(latencies_ms, dtype=np.float64)
+    if not len(values):
+        return {"mean": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "mean": round(float(values.mean()), 4),
+        "p50": round(float(np.percentile(values, 50)), 4),
+        "p90": round(float(np.percentile(values, 90)), 4),
+        "p99": round(float(np.percentile(values, 99)), 4),
+        "max": round(float(values.max()), 4),
+    }
+
+
+def make_retriever(store: VectorStore, params: Dict, top_k: int) -> Callable[[str, np.ndarray], List[Dict]]:
+    """
+    Build the retrieval call for one configuration, mirroring /api/query.
+
+    Args:
+        params (Dict): "mode" (dense, lexical, hybrid or two_stage),
+            "score_threshold" (cut-off; null for none), and for two_stage
+            "index", "candidates", "nprobe" and "rerank".
+    """
+    mode = params.get("mode", "dense")
+    threshold = params.get("score_threshold")
+    if mode not in EVAL_MODES:
+        raise ValueError(f"Unknown mode {mode!r}; expected one of {', '.join(EVAL_MODES)}")
+
+    if mode == "lexical":
+        return lambda query, emb: store.lexical_search(query, top_k=top_k)
+    if mode == "hybrid":
+        from api.routes_query import hybrid_search
+        cutoff = -1.0 if threshold is None else threshold
+        return lambda query, emb: hybrid_search(store, emb, query, top_k, cutoff)
+    if mode == "two_stage":
+        retriever = TwoStageRetriever(store, index_spec=params.get("index", "SQ8"),
+                                      cross_encoder=params.get("cross_encoder"))
+
+        def two_stage(query, emb):
+            results, _ = retriever.search(
+                emb, top_k=top_k, min_score=threshold, candidates=params.get("candidates"),
+                query_text=query, rerank=bool(params.get("rerank", False)), nprobe=params.get("nprobe")
+            )
+            return results
+        return two_stage
+    if threshold is None:
+        return lambda query, emb: store.search(emb, top_k=top_k)
+    return lambda query, emb: store.range_search(emb, threshold, max_results=top_k)
+
+
+def evaluate(store: VectorStore, queries: List[str], embeddings: np.ndarray, params: Dict,
+             truth: np.ndarray, top_k: int = 5, warmup: int = 5) -> Dict:
+    """
+    Replay queries through one configuration and score it against the exact neighbours.
+
+    Each query is timed on its own (embedding excluded, as it is shared by
+    every configuration); QPS is sequential throughput over the timed calls.
+    The first `warmup` queries are run once untimed so lazily built indexes
+    do not skew the latencies.
+    """
+    retrieve = make_retriever(store, params, top_k)
+    for query, emb in list(zip(queries, embeddings))[:warmup]:
+        retrieve(query, emb)
+
+    latencies, recalls, counts = [], [], []
+    for query, emb, exact in zip(queries, embeddings, truth):
+        start = time.perf_counter()
+        results = retrieve(query, emb)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(recall_at_k([doc["id"] for doc in results], exact, top_k))
+        counts.append(len(results))
+    wall = sum(latencies) / 1000
+
+    n = len(queries)
+    return {
+        "name": params.get("name", params.get("mode", "dense")),
+        "params": params,
+        "queries": n,
+        "recall_at_k": round(float(np.mean(recalls)), 4) if n else 0.0,
+        "empty_rate": round(counts.count(0) / n, 4) if n else 0.0,
+        "avg_results": round(float(np.mean(counts)), 3) if n else 0.0,
+        "qps": round(n / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": latency_summary(latencies),
+    }
+
+
+def _metric(report: Dict, path: str) -> float:
+    value = report
+    for part in path.split("."):
+        value = value[part]
+    return value
+
+
+def compare(reports: List[Dict]) -> Dict:
+    """
+    Side-by-side view of each configuration against the first (the baseline):
+    per metric, the baseline value, the candidate value and their difference.
+    """
+    if len(reports) < 2:
+        return {}
+    baseline = reports[0]
+    comparison = {}
+    for report in reports[1:]:
+        comparison[report["name"]] = {
+            metric: {
+                "baseline": _metric(baseline, metric),
+                "candidate": _metric(report, metric),
+                "delta": round(_metric(report, metric) - _metric(baseline, metric), 4),
+            }
+            for metric in COMPARED_METRICS
+        }
+    return {"baseline": baseline["name"], "candidates": comparison}
+
+
+def run_evaluation(store: VectorStore, queries: List[str], embed: Callable, configs: List[Dict],
+                   top_k: int = 5, warmup: int = 5) -> Dict:
+    """
+    Evaluate every configuration on the same queries and exact ground truth.
+
+    Args:
+        embed (callable): Embeds a list of strings into a 2-D array.
+        configs (List[Dict]): Configurations (see make_retriever); the first is the baseline.
+
+    Returns:
+        Dict: Machine-readable report with per-configuration results and a comparison.
+    """
+    start = time.perf_counter()
+    embeddings = np.asarray(embed(queries), dtype=np.float32).reshape(len(queries), -1) if queries \
+        else np.empty((0, store.dim), np.float32)
+    embed_ms = (time.perf_counter() - start) * 1000
+    truth = exact_neighbors(store, embeddings, top_k)
+
+    reports = [evaluate(store, queries, embeddings, params, truth, top_k=top_k, warmup=warmup) for params in configs]
+    return {
+        "queries": len(queries),
+        "top_k": top_k,
+        "vectors": store.index.ntotal,
+        "index_version": store.version,
+        "embed_ms_per_query": round(embed_ms / len(queries), 4) if queries else 0.0,
+        "configs": reports,
+        "comparison": compare(reports),
+    }
@@ -0,0 +1,57 @@
+# app/executor.py
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from app import config
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_compute_executor() -> ThreadPoolExecutor:
+    """
+    Returns the shared executor for blocking model (PyTorch) and FAISS work.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=config.COMPUTE_WORKERS, thread_name_prefix="compute")
+    return _executor
+
+
+async def run_blocking(func: Callable, *args, **kwargs):
+    """Await a blocking call on the compute executor instead of the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_compute_executor(), functools.partial(func, *args, **kwargs))
+
+
+def configure_thread_budget(workers: Optional[int] = None) -> int:
+    """
+    Split the CPU cores between executor workers so FAISS (OpenMP) and torch
+    intra-op pools do not oversubscribe the machine when several requests
+    run at once.
+
+    Returns:
+        int: Threads each library may use per call.
+    """
+    workers = workers or config.COMPUTE_WORKERS
+    threads = config.COMPUTE_THREADS_PER_WORKER or max(1, (os.cpu_count() or 1) // workers)
+    try:
+        import faiss
+        faiss.omp_set_num_threads(threads)
+    except ImportError:
+        pass
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    return threads
+
+
+def shutdown_compute_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,234 @@
+# app/export.py
+import csv
+import io
+import json
+import os
+import time
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from app import config
+from app.logger import get_logger
+
+log = get_logger(__name__)
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_PREFIX = "query_results_"
+# Leading columns; any other keys follow in first-seen order
+BASE_COLUMNS = ["id", "score", "url", "text"]
+ROWS_PER_CHUNK = 500
+
+
+class ExportError(ValueError):
+    """Unknown export format, or its optional dependency is missing."""
+
+
+def check_format(fmt: str) -> str:
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError("parquet export requires pyarrow (pip install pyarrow)")
+    return fmt
+
+
+def result_columns(rows: List[Dict]) -> List[str]:
+    extra = dict.fromkeys(key for row in rows for key in row if key not in BASE_COLUMNS)
+    return BASE_COLUMNS + list(extra)
+
+
+def _cell(value):
+    # Lists and dicts (sentence offsets, vectors) are kept as JSON, not Python reprs
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return "" if value is None else value
+
+
+def iter_csv(rows: Iterable[Dict], columns: List[str]) -> Iterator[bytes]:
+    """CSV bytes with a header row, flushed every ROWS_PER_CHUNK rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for n, row in enumerate(rows, start=1):
+        writer.writerow([_cell(row.get(column)) for column in columns])
+        if n % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_jsonl(rows: Iterable[Dict]) -> Iterator[bytes]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False, default=float))
+        if len(lines) == ROWS_PER_CHUNK:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink that hands back what was written since the last drain."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def iter_parquet(rows: Iterable[Dict], columns: List[str]) -> Iterator[bytes]:
+    """Parquet bytes, one row group per ROWS_PER_CHUNK rows (requires pyarrow)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _Drain()
+    writer = None
+
+    def write(batch):
+        nonlocal writer
+        table = pa.Table.from_pylist([{c: _parquet_cell(row.get(c)) for c in columns} for row in batch])
+        if writer is None:
+            # Columns that are empty in the first row group would be typed null; store them as text
+            schema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                                for f in table.schema])
+            writer = pq.ParquetWriter(sink, schema)
+        writer.write_table(table.cast(writer.schema))
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == ROWS_PER_CHUNK:
+            write(batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        write(batch)
+    if writer is None:
+        writer = pq.ParquetWriter(sink, pa.schema([pa.field(c, pa.string()) for c in columns]))
+    writer.close()
+    yield sink.drain()
+
+
+def _parquet_cell(value):
+    # Nested values vary per row (offset pairs, optional fields); keep them as JSON text
+    if isinstance(value, dict) or (isinstance(value, list) and value and not isinstance(value[0], (int, float))):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def iter_export(rows: Iterable[Dict], fmt: str, columns: Optional[List[str]] = None) -> Iterator[bytes]:
+    """
+    Stream rows in an export format without materializing the file.
+
+    Args:
+        rows (iterable): Result or metadata dicts.
+        fmt (str): One of EXPORT_FORMATS.
+        columns (List[str]): Column order for csv/parquet (default: from the rows, which are then listed first).
+    """
+    check_format(fmt)
+    if fmt == "jsonl":
+        return iter_jsonl(rows)
+    if columns is None:
+        rows = list(rows)
+        columns = result_columns(rows)
+    return iter_csv(rows, columns) if fmt == "csv" else iter_parquet(rows, columns)
+
+
+def write_export(rows: List[Dict], path: str, fmt: str = "csv"):
+    """Write already retrieved results to a file, streaming the encoded chunks."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as f:
+        for chunk in iter_export(rows, fmt):
+            f.write(chunk)
+    log.info("📄 Results saved", extra={"path": path, "rows": len(rows), "format": fmt})
+
+
+def save_results(rows: List[Dict], fmt: str = "csv") -> str:
+    """Write results to a new file in EXPORT_DIR, collect old exports, and return its path."""
+    path = os.path.join(config.EXPORT_DIR, f"{EXPORT_PREFIX}{uuid.uuid4().hex[:6]}.{fmt}")
+    write_export(rows, path, fmt)
+    collect_exports(config.EXPORT_DIR, config.EXPORT_TTL, config.EXPORT_MAX_FILES, keep=path)
+    return path
+
+
+def collect_exports(directory: str, ttl: float, max_files: int, keep: Optional[str] = None) -> int:
+    """
+    Delete export files older than `ttl` seconds (0 = no age limit), then the
+    oldest beyond `max_files` (0 = no count limit). Returns how many were removed.
+    """
+    if not os.path.isdir(directory):
+        return 0
+    exports = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith(EXPORT_PREFIX) and path != keep:
+            try:
+                exports.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+    exports.sort(reverse=True)
+
+    now = time.time()
+    expired = [path for i, (mtime, path) in enumerate(exports)
+               if (ttl and now - mtime > ttl) or (max_files and i >= max_files - (keep is not None))]
+    removed = 0
+    for path in expired:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            continue
+    if removed:
+        log.info("🧹 Removed old exports", extra={"directory": directory, "removed": removed})
+    return removed
+
+
+def iter_index_rows(store, include_vectors: bool = False, batch_size: int = 1024) -> Iterator[Dict]:
+    """
+    Every chunk in the store as a metadata row with its "id" (and its
+    stored, normalized "vector"), read in batches so the whole index is
+    never copied at once.
+    """
+    # reset()/_load() swap these objects out, so hold on to the ones being exported
+    index, metadata = store.index, store.metadata
+    total = min(index.ntotal, len(metadata))
+    for start in range(0, total, batch_size):
+        end = min(start + batch_size, total)
+        vectors = index.reconstruct_n(start, end - start) if include_vectors else None
+        for offset, idx in enumerate(range(start, end)):
+            row = {"id": idx, **metadata[idx]}
+            if vectors is not None:
+                row["vector"] = vectors[offset].tolist()
+            yield row
+
+
+def index_columns(store, include_vectors: bool = False) -> List[str]:
+    """Columns for a bulk index export, from the metadata keys."""
+    keys = dict.fromkeys(key for item in store.metadata for key in item if key not in BASE_COLUMNS)
+    columns = ["id", "url", "text"] + list(keys)
+    return columns + ["vector"] if include_vectors else columns
@@ -1,13 +1,228 @@
 # app/generator.py
-from openai import OpenAI
-
-def generate_answer(query, context_chunks):
-    context_text = "\n\n".join(chunk.page_content for chunk in context_chunks)
-    prompt = f"Answer the question based only on the context below.\n\nContext:\n{context_text}\n\nQuestion: {query}"
-
-    client = OpenAI()
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    return response.choices[0].message.content
+import asyncio
+import functools
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from openai import APIError, AsyncOpenAI
+
+from app import config
+from app.logger import get_logger
+from app.metrics import timed
+
+log = get_logger(__name__)
+
+SYSTEM_PROMPT = (
+    "Answer the question based only on the numbered context passages. "
+    "Cite the passages you use as [1], [2], ... If the context does not contain the answer, say so."
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_token_counter(model: str) -> Callable[[str], int]:
+    """
+    Returns a function counting tokens with the model's tiktoken encoding.
+    Falls back to a ~4 characters per token estimate when the encoding
+    cannot be loaded (tiktoken downloads it on first use).
+    """
+    try:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        log.warning("⚠️ tiktoken encoding unavailable, estimating tokens from length",
+                    extra={"model": model, "error": str(e)})
+        return lambda text: (len(text) + 3) // 4
+
+
+def pack_context(docs: List[Dict], budget_tokens: int, count_tokens: Callable[[str], int]) -> Tuple[str, int, int]:
+    """
+    Number and concatenate retrieved chunks, best first, until the token
+    budget is spent. The chunk that crosses the budget is cut at a word
+    boundary; everything after it is dropped.
+
+    Args:
+        docs (List[Dict]): Search results with "text" (and optionally "url").
+        budget_tokens (int): Maximum tokens of context.
+        count_tokens (callable): Token counter for the target model.
+
+    Returns:
+        Tuple[str, int, int]: Context text, tokens used, and number of chunks included.
+    """
+    parts = []
+    used = 0
+    for n, doc in enumerate(docs, start=1):
+        text = doc.get("text", "").strip()
+        if not text:
+            continue
+        header = f"[{n}] {doc.get('url', '')}".rstrip()
+        passage = f"{header}\n{text}"
+        tokens = count_tokens(passage) + 1
+        if used + tokens > budget_tokens:
+            remaining = budget_tokens - used
+            words = passage.split(" ")
+            # Shrink proportionally, then trim until it fits
+            keep = int(len(words) * remaining / tokens)
+            while keep > 0 and count_tokens(" ".join(words[:keep])) + 1 > remaining:
+                keep -= max(1, keep // 10)
+            if keep > len(header.split(" ")):
+                passage = " ".join(words[:keep])
+                parts.append(passage)
+                used += count_tokens(passage) + 1
+            break
+        parts.append(passage)
+        used += tokens
+    return "\n\n".join(parts), used, len(parts)
+
+
+class Generator:
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 model: str = "gpt-3.5-turbo", timeout: float = 30.0,
+                 context_tokens: int = 3000, max_tokens: int = 512, max_connections: int = 20):
+        """
+        Answer generation against any OpenAI-compatible chat completions API.
+
+        One AsyncOpenAI client (and its pooled httpx connections) is shared by
+        every request instead of being built per call.
+
+        Args:
+            base_url (str): API base URL, e.g. "http://localhost:8001/v1" (default: OpenAI).
+            api_key (str): API key; local servers usually accept any value.
+            model (str): Model name sent with each request.
+            timeout (float): Default seconds allowed for a whole generation.
+            context_tokens (int): Token budget for packed context passages.
+            max_tokens (int): Completion token limit.
+            max_connections (int): Connection pool size.
+        """
+        self.model = model
+        self.timeout = timeout
+        self.context_tokens = context_tokens
+        self.max_tokens = max_tokens
+        self.count_tokens = get_token_counter(model)
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0)),
+        )
+        self.client = AsyncOpenAI(
+            base_url=base_url or None,
+            api_key=api_key or "unused",
+            http_client=self._http,
+            max_retries=0,
+        )
+
+    def build_messages(self, query: str, docs: List[Dict]) -> Tuple[List[Dict], Dict]:
+        context, tokens, included = pack_context(docs, self.context_tokens, self.count_tokens)
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {query}"},
+        ]
+        return messages, {"context_tokens": tokens, "sources": included}
+
+    async def stream(self, query: str, docs: List[Dict],
+                     timeout: Optional[float] = None) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Stream an answer as ("token", text) events, finishing with one
+        ("done", info) event. When the timeout expires, or the API or the
+        connection fails mid-answer, the stream stops and info reports
+        `"partial": True`; the tokens already yielded are the partial result.
+
+        Args:
+            query (str): User question.
+            docs (List[Dict]): Retrieved chunks, best first.
+            timeout (float): Seconds allowed for the whole generation (default: the generator's).
+        """
+        messages, info = self.build_messages(query, docs)
+        info.update({"model": self.model, "partial": False, "finish_reason": None})
+        start = time.perf_counter()
+        deadline = start + (timeout if timeout is not None else self.timeout)
+        response = None
+
+        with timed("generate"):
+            try:
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(
+                        model=self.model, messages=messages, max_tokens=self.max_tokens, stream=True
+                    ),
+                    max(0.0, deadline - time.perf_counter()),
+                )
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - time.perf_counter()))
+                    except StopAsyncIteration:
+                        break
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    if choice.delta and choice.delta.content:
+                        yield "token", choice.delta.content
+                    if choice.finish_reason:
+                        info["finish_reason"] = choice.finish_reason
+            except asyncio.TimeoutError:
+                info["partial"] = True
+                info["finish_reason"] = "timeout"
+                log.warning("⏱️ Generation timed out", extra={"model": self.model})
+            # Transport errors while reading the stream (dropped connection, bad chunking)
+            # reach us as raw httpx errors; the openai SDK only wraps those raised by create()
+            except (APIError, httpx.HTTPError) as e:
+                info["partial"] = True
+                info["finish_reason"] = "error"
+                info["error"] = str(e)
+                log.error("❌ Generation failed", extra={"model": self.model, "error": str(e)})
+            finally:
+                if response is not None:
+                    await response.close()
+
+        info["ms"] = round((time.perf_counter() - start) * 1000, 3)
+        yield "done", info
+
+    async def generate(self, query: str, docs: List[Dict], timeout: Optional[float] = None) -> Dict:
+        """Collect a streamed answer: {"content": str, **info}."""
+        tokens = []
+        info: Dict = {}
+        async for event, data in self.stream(query, docs, timeout=timeout):
+            if event == "token":
+                tokens.append(data)
+            else:
+                info = data
+        return {"content": "".join(tokens), **info}
+
+    async def aclose(self):
+        await self.client.close()
+
+
+async def generate_answer(query: str, docs: List[Dict], timeout: Optional[float] = None) -> Dict:
+    """Generate an answer from retrieved result dicts with the shared generator."""
+    return await get_generator().generate(query, docs, timeout=timeout)
+
+
+# Singleton instance
+_generator_instance: Optional[Generator] = None
+
+def get_generator() -> Generator:
+    """
+    Returns a singleton Generator configured from LLM_* settings.
+    """
+    global _generator_instance
+    if _generator_instance is None:
+        _generator_instance = Generator(
+            base_url=config.LLM_BASE_URL,
+            api_key=config.LLM_API_KEY,
+            model=config.LLM_MODEL,
+            timeout=config.LLM_TIMEOUT,
+            context_tokens=config.LLM_CONTEXT_TOKENS,
+            max_tokens=config.LLM_MAX_TOKENS,
+            max_connections=config.LLM_MAX_CONNECTIONS,
+        )
+    return _generator_instance
+
+
+async def close_generator():
+    global _generator_instance
+    if _generator_instance is not None:
+        await _generator_instance.aclose()
+        _generator_instance = None
@@ -0,0 +1,137 @@
+# app/intent_router.py
+import re
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app import config
+from app.logger import get_logger
+from app.metrics import REGISTRY
+
+log = get_logger(__name__)
+
+INTENT_ROUTES = REGISTRY.counter(
+    "rag_intent_routes_total", "Queries answered by the intent router instead of retrieval, by intent."
+)
+
+OFF_TOPIC_ANSWER = (
+    "🤖 I'm here to assist with queries related to the indexed topics. "
+    "It seems your question doesn't match the available content. "
+    "Please rephrase or try asking about GenAI platforms, ColBERT, hallucinations, embedding search, vector databases, or similar AI topics."
+)
+
+# Canned intents answered without retrieval. Examples are embedded once; keep
+# them short and unambiguous so on-topic questions never land here.
+INTENTS: List[Dict] = [
+    {
+        "name": "greeting",
+        "examples": ["Hi", "Hello", "Hey", "Hey there", "Good morning", "Hi, how are you?", "How are you?"],
+        "answer": "Hello! How can I assist you today?",
+    },
+    {
+        "name": "thanks",
+        "examples": ["Thank you", "Thanks", "Thanks a lot", "Thank you so much", "Great, thanks"],
+        "answer": "You’re welcome!",
+    },
+    {
+        "name": "goodbye",
+        "examples": ["Goodbye", "Bye", "See you later", "Bye for now", "That's all, thanks"],
+        "answer": "Goodbye! Have a great day!",
+    },
+    {
+        "name": "identity",
+        "examples": ["What’s your name?", "Who are you?", "Are you human?", "Who created you?",
+                     "Are you a bot?", "How old are you?", "Where are you from?"],
+        "answer": "I’m an AI assistant that answers questions from the indexed documents.",
+    },
+    {
+        "name": "capabilities",
+        "examples": ["What can you do?", "What do you do?", "Can you help me?", "Help", "How do I use this?"],
+        "answer": "I can answer questions about the indexed topics, such as GenAI platforms, ColBERT, "
+                  "hallucinations, embedding search and vector databases, with citations.",
+    },
+    {
+        "name": "off_topic",
+        "examples": ["Tell me a joke", "What’s the weather like?", "What is the meaning of life?",
+                     "Who will win the game tonight?", "What should I eat for dinner?"],
+        "answer": OFF_TOPIC_ANSWER,
+    },
+    {
+        "name": "abuse",
+        "examples": ["This is stupid", "You are dumb", "Nonsense answer", "You idiot", "What is this nonsense"],
+        "answer": OFF_TOPIC_ANSWER,
+    },
+]
+
+
+def normalize_intent_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace for exact matching."""
+    text = re.sub(r"[^\w\s]", "", text.lower().replace("’", "'"))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class IntentRouter:
+    def __init__(self, intents: List[Dict], embed: Callable, threshold: float = 0.8):
+        """
+        Route small talk and off-topic chatter to canned answers before retrieval.
+
+        Every intent example is embedded once into a normalized matrix, so a
+        query is routed with one matrix-vector product against the query
+        embedding the pipeline already computed. Exact (normalized) example
+        matches are answered before embedding at all.
+
+        Args:
+            intents (List[Dict]): Intents with "name", "examples" and "answer".
+            embed (callable): Embeds a list of strings into a 2-D array.
+            threshold (float): Minimum cosine similarity to route a query.
+        """
+        self.intents = intents
+        self.threshold = threshold
+        examples = [example for intent in intents for example in intent["examples"]]
+        self._owners = np.array([i for i, intent in enumerate(intents) for _ in intent["examples"]])
+        self._exact = {normalize_intent_text(example): owner for example, owner in zip(examples, self._owners)}
+
+        matrix = np.asarray(embed(examples), dtype=np.float32).reshape(len(examples), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        self.matrix = matrix / norms
+
+    def _result(self, owner: int, score: float) -> Dict:
+        intent = self.intents[owner]
+        INTENT_ROUTES.inc(intent=intent["name"])
+        return {"intent": intent["name"], "answer": intent["answer"], "score": round(float(score), 4)}
+
+    def match_text(self, query: str) -> Optional[Dict]:
+        """Exact match on normalized text; no embedding needed."""
+        owner = self._exact.get(normalize_intent_text(query))
+        return None if owner is None else self._result(owner, 1.0)
+
+    def route(self, query_embedding) -> Optional[Dict]:
+        """Nearest intent example by cosine similarity, if it clears the threshold."""
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None
+        scores = self.matrix @ (query / norm)
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return self._result(self._owners[best], scores[best])
+
+
+# Singleton instance
+_router_instance: Optional[IntentRouter] = None
+
+def get_intent_router() -> Optional[IntentRouter]:
+    """
+    Returns a singleton IntentRouter over INTENTS, or None when routing is disabled.
+    The first call embeds the intent examples with the local model.
+    """
+    global _router_instance
+    if not config.INTENT_ROUTER_ENABLED:
+        return None
+    if _router_instance is None:
+        from app.embedder import get_embedding_local
+        _router_instance = IntentRouter(INTENTS, get_embedding_local, threshold=config.INTENT_THRESHOLD)
+        log.info("🧭 Intent router ready", extra={"intents": len(INTENTS), "examples": len(_router_instance.matrix)})
+    return _router_instance
@@ -0,0 +1,152 @@
+# app/lexical_index.py
+import json
+import os
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.snippets import BM25_B, BM25_K1, STOPWORDS, TOKEN_RE, query_terms
+
+RRF_K = 60
+
+
+def index_terms(text: str) -> List[str]:
+    """Lowercased tokens of a chunk with stopwords removed."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class LexicalIndex:
+    def __init__(self, path: str = "outputs/lexical_index.npz"):
+        """
+        BM25 inverted index over chunk texts, kept beside the FAISS index.
+
+        Document ids are positions in the vector store, so lexical and dense
+        hits refer to the same metadata rows. Postings are compact uint32
+        arrays that grow in place as chunks are added.
+
+        Args:
+            path (str): Path to save/load the index.
+        """
+        self.path = path
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.doc_lengths = array("I")
+        self.total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, texts: Sequence[str]):
+        """Index texts as the next document ids, in order."""
+        with self._lock:
+            for text in texts:
+                doc_id = len(self.doc_lengths)
+                terms = index_terms(text)
+                for term, tf in Counter(terms).items():
+                    ids, tfs = self.postings.setdefault(term, (array("I"), array("I")))
+                    ids.append(doc_id)
+                    tfs.append(tf)
+                self.doc_lengths.append(len(terms))
+                self.total_length += len(terms)
+
+    def search(self, query: str, top_k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        BM25 top_k for a query, scoring only documents in the query terms' postings.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Document ids and scores, best first.
+        """
+        # Score from copies of the matched postings and their document lengths,
+        # taken under the lock: add() cannot grow an array while a numpy view of
+        # its buffer is alive, and must not race the reads
+        with self._lock:
+            n_docs = len(self.doc_lengths)
+            if n_docs == 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            total_length = self.total_length
+            doc_lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32)
+            postings = []
+            for posting in (self.postings.get(term) for term in query_terms(query)):
+                if posting is not None:
+                    ids = np.array(posting[0], dtype=np.uint32)
+                    postings.append((ids, np.array(posting[1], dtype=np.float32), doc_lengths[ids]))
+            del doc_lengths
+        if not postings:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        avg_length = total_length / n_docs or 1.0
+        # Accumulate over the union of matched ids rather than a dense per-document array
+        matched, slots = np.unique(np.concatenate([ids for ids, _, _ in postings]), return_inverse=True)
+        scores = np.zeros(len(matched), dtype=np.float32)
+        offset = 0
+        for ids, tfs, lengths in postings:
+            idf = np.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / avg_length)
+            np.add.at(scores, slots[offset:offset + len(ids)], idf * tfs * (BM25_K1 + 1) / (tfs + norm))
+            offset += len(ids)
+
+        order = np.arange(len(matched))
+        if len(order) > top_k:
+            order = np.argpartition(-scores, top_k - 1)[:top_k]
+        order = order[np.argsort(-scores[order], kind="stable")]
+        return matched[order].astype(np.int64), scores[order]
+
+    def reset(self):
+        with self._lock:
+            self.postings = {}
+            self.doc_lengths = array("I")
+            self.total_length = 0
+
+    def save(self):
+        with self._lock:
+            terms = list(self.postings)
+            ids = [self.postings[t][0] for t in terms]
+            tfs = [self.postings[t][1] for t in terms]
+            lengths = np.array([len(p) for p in ids], dtype=np.int64)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "wb") as f:
+                np.savez(
+                    f,
+                    terms=np.frombuffer(json.dumps(terms).encode("utf-8"), dtype=np.uint8),
+                    posting_lengths=lengths,
+                    ids=np.concatenate([np.frombuffer(p, dtype=np.uint32) for p in ids]) if ids else np.empty(0, np.uint32),
+                    tfs=np.concatenate([np.frombuffer(p, dtype=np.uint32) for p in tfs]) if tfs else np.empty(0, np.uint32),
+                    doc_lengths=np.frombuffer(self.doc_lengths, dtype=np.uint32),
+                )
+
+    def load(self) -> bool:
+        """Load the saved index; returns False when there is none."""
+        if not os.path.exists(self.path):
+            return False
+        with np.load(self.path) as data:
+            terms = json.loads(data["terms"].tobytes().decode("utf-8"))
+            bounds = np.concatenate([[0], np.cumsum(data["posting_lengths"])])
+            all_ids, all_tfs = data["ids"], data["tfs"]
+            doc_lengths = data["doc_lengths"]
+        with self._lock:
+            self.postings = {
+                term: (array("I", all_ids[start:end].tobytes()), array("I", all_tfs[start:end].tobytes()))
+                for term, start, end in zip(terms, bounds[:-1], bounds[1:])
+            }
+            self.doc_lengths = array("I", doc_lengths.astype(np.uint32).tobytes())
+            self.total_length = int(doc_lengths.sum())
+        return True
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """
+    Fuse ranked id lists: each id scores sum(1 / (k + rank)) over the lists it appears in.
+
+    Returns:
+        List[Tuple[int, float]]: (id, fused score), best first.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[int(doc_id)] = fused.get(int(doc_id), 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,228 @@
+# app/log_sink.py
+import atexit
+import contextlib
+import glob
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app import config
+from app.logger import get_logger
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: appends stay atomic per write, rotation is unlocked
+    fcntl = None
+
+log = get_logger(__name__)
+
+
+class JsonlSink:
+    def __init__(self, path: str, max_bytes: int = 50_000_000, backup_count: int = 10,
+                 flush_records: int = 100, flush_interval: float = 1.0, max_queue: int = 10_000):
+        """
+        Buffered JSON-lines writer for request-path logging.
+
+        `write()` only appends to an in-memory buffer; a background thread
+        serializes and appends a batch when `flush_records` are queued or
+        `flush_interval` seconds pass. Each batch is one O_APPEND write under
+        a shared file lock, so several worker processes can share the file.
+        Once the file reaches `max_bytes` it is renamed under an exclusive
+        lock, gzip-compressed, and only `backup_count` segments are kept.
+
+        Args:
+            path (str): JSONL file to append to.
+            max_bytes (int): Size that triggers rotation (0 = never rotate).
+            backup_count (int): Compressed segments kept.
+            flush_records (int): Buffered records that trigger a flush.
+            flush_interval (float): Maximum seconds a record waits in the buffer.
+            max_queue (int): Buffered records beyond which new ones are dropped.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._buffer: List[Dict] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"sink:{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict):
+        """Queue one record; never blocks on disk."""
+        with self._cond:
+            if self._closed or len(self._buffer) >= self.max_queue:
+                self.dropped += 1
+                return
+            self._buffer.append(record)
+            if len(self._buffer) >= self.flush_records:
+                self._cond.notify()
+
+    def flush(self):
+        """Write everything queued so far (blocking)."""
+        with self._cond:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._append(batch)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or len(self._buffer) >= self.flush_records,
+                                    timeout=self.flush_interval)
+                if self._closed:
+                    return
+                batch, self._buffer = self._buffer, []
+            if batch:
+                try:
+                    self._append(batch)
+                except OSError:
+                    log.error("❌ Failed to write log batch", exc_info=True,
+                              extra={"path": self.path, "records": len(batch)})
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _append(self, batch: List[Dict]):
+        data = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in batch).encode("utf-8")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._locked(exclusive=False):
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+        self.written += len(batch)
+        if self.max_bytes and size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        stem = self.path[:-len(".jsonl")] if self.path.endswith(".jsonl") else self.path
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"{now % 1:.6f}"[1:]
+        segment = f"{stem}.{stamp}.{os.getpid()}.jsonl"
+        with self._locked(exclusive=True):
+            # Another worker may have rotated while we waited for the lock
+            if not os.path.exists(self.path) or os.path.getsize(self.path) < self.max_bytes:
+                return
+            os.rename(self.path, segment)
+        with open(segment, "rb") as src, gzip.open(segment + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(segment)
+        self.rotations += 1
+
+        # Segment names start with their timestamp, so name order is age order
+        segments = sorted(glob.glob(f"{glob.escape(stem)}.*.jsonl.gz"))
+        for old in segments[:max(0, len(segments) - self.backup_count)]:
+            os.remove(old)
+        log.info("🗜️ Rotated log segment", extra={"path": self.path, "segment": segment + ".gz"})
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "queued": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+        }
+
+
+def _make_sink(path: str) -> JsonlSink:
+    sink = JsonlSink(
+        path,
+        max_bytes=config.LOG_SINK_MAX_BYTES,
+        backup_count=config.LOG_SINK_BACKUP_COUNT,
+        flush_records=config.LOG_SINK_FLUSH_RECORDS,
+        flush_interval=config.LOG_SINK_FLUSH_INTERVAL,
+    )
+    atexit.register(sink.close)
+    return sink
+
+
+# Singleton instances
+_feedback_sink: Optional[JsonlSink] = None
+_trace_sink: Optional[JsonlSink] = None
+_sink_lock = threading.Lock()
+
+def get_feedback_sink() -> JsonlSink:
+    """
+    Returns the shared sink for user feedback records.
+    """
+    global _feedback_sink
+    with _sink_lock:
+        if _feedback_sink is None:
+            _feedback_sink = _make_sink(config.FEEDBACK_LOG_PATH)
+    return _feedback_sink
+
+def get_trace_sink() -> Optional[JsonlSink]:
+    """
+    Returns the shared sink for per-query traces, or None when tracing is disabled.
+    """
+    global _trace_sink
+    if not config.REQUEST_TRACE_ENABLED:
+        return None
+    with _sink_lock:
+        if _trace_sink is None:
+            _trace_sink = _make_sink(config.REQUEST_TRACE_PATH)
+    return _trace_sink
+
+def close_sinks():
+    """Flush and stop the shared sinks (called on app shutdown)."""
+    global _feedback_sink, _trace_sink
+    with _sink_lock:
+        sinks, _feedback_sink, _trace_sink = [_feedback_sink, _trace_sink], None, None
+    for sink in sinks:
+        if sink is not None:
+            sink.close()
+
+
+async def traced(endpoint: str, query: str, stages, trace: Dict):
+    """
+    Pass (event, data) pipeline stages through and record one trace line
+    when they finish. The pipeline fills `trace` (hit ids, scores, cache
+    outcome); latency covers the whole pipeline, including streaming.
+    """
+    start = time.perf_counter()
+    try:
+        async for stage in stages:
+            yield stage
+    finally:
+        sink = get_trace_sink()
+        if sink is not None:
+            sink.write({
+                "ts": round(time.time(), 3),
+                "endpoint": endpoint,
+                "query": query,
+                **trace,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+            })
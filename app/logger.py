@@ -0,0 +1,122 @@
+# app/logger.py
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+from app import config
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, plus any `extra` fields."""
+
+    _RESERVED = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in self._RESERVED:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class JsonQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that keeps the traceback out of the message. The stock
+    prepare() formats the record, folding the traceback into `msg`; here the
+    message and traceback are rendered separately (before the frames go
+    stale) so JsonFormatter can emit them as "msg" and "exc".
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Allow at most `burst` records per message template in each `interval`
+    seconds; the next record that gets through reports how many were dropped.
+    Warnings and errors are never dropped.
+    """
+
+    def __init__(self, burst: int, interval: float):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.burst <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            start, count, dropped = self._windows.get(key, (now, 0, 0))
+            if now - start >= self.interval:
+                start, count = now, 0
+            if count >= self.burst:
+                self._windows[key] = (start, count, dropped + 1)
+                return False
+            self._windows[key] = (start, count + 1, 0)
+        if dropped:
+            record.dropped = dropped
+        return True
+
+
+def _setup():
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter())
+
+        # Records are formatted and written by a background thread, so request
+        # handlers only pay for an in-memory queue put.
+        log_queue = queue.SimpleQueue()
+        queue_handler = JsonQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(config.LOG_RATE_LIMIT_BURST, config.LOG_RATE_LIMIT_INTERVAL))
+
+        root = logging.getLogger("rag")
+        root.setLevel(config.LOG_LEVEL)
+        root.addHandler(queue_handler)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Returns a leveled, rate-limited JSON logger under the "rag" namespace.
+
+    Usage:
+        log = get_logger(__name__)
+        log.info("Indexed URL", extra={"url": url, "chunks": 12})
+    """
+    _setup()
+    return logging.getLogger(f"rag.{name}")
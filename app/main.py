@@ -17,18 +17,44 @@ from api.routes_index import router as index_router
 from api.routes_chat import router as chat_router
 from api.routes_feedback import router as feedback_router
 from api.routes_query import router as query_router
+from api.routes_metrics import router as metrics_router
+from api.routes_admin import router as admin_router
 
 # Import VectorStore loader
 from app.vector_store import get_vector_store
+from app import config
+from app.logger import get_logger
+from app.profiling import ProfilingMiddleware
+from app.admission import AdmissionMiddleware
+from app.executor import configure_thread_budget, get_compute_executor, run_blocking, shutdown_compute_executor
+from app.generator import close_generator
+from app.intent_router import get_intent_router
+from app.log_sink import close_sinks
+from app.manifest import start_index_watcher, stop_index_watcher
+from app.store_registry import get_collection_registry
+
+log = get_logger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup code: load FAISS index
+    # Startup code: size the compute pool, then load FAISS index
+    get_compute_executor()
+    threads = configure_thread_budget()
+    log.info("🧵 Compute executor ready", extra={"workers": config.COMPUTE_WORKERS, "threads_per_worker": threads})
     vector_store = get_vector_store()
     vector_store._load()
-    print(f"📦 FAISS index loaded at startup with {vector_store.index.ntotal} vectors")
+    log.info("📦 FAISS index loaded at startup",
+             extra={"vectors": vector_store.index.ntotal, "version": vector_store.version})
+    # Pick up indexes written by other workers without a restart
+    start_index_watcher(lambda: [get_vector_store()] + [c.store for c in get_collection_registry().loaded()])
+    # Embed the intent examples now rather than on the first request
+    await run_blocking(get_intent_router)
     yield
-    print("🛑 Shutting down FastAPI app...")
+    log.info("🛑 Shutting down FastAPI app...")
+    stop_index_watcher()
+    await close_generator()
+    close_sinks()
+    shutdown_compute_executor()
 
 # ✅ Final app instantiation (only once)
 app = FastAPI(
@@ -43,6 +69,15 @@ app.include_router(index_router)
 app.include_router(chat_router)
 app.include_router(feedback_router)
 app.include_router(query_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
+
+# Opt-in request profiling; not installed at all unless enabled
+if config.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Per-client rate limits and per-pool concurrency limits; sheds excess load with 429/503
+app.add_middleware(AdmissionMiddleware)
 
 # ✅ Root endpoint
 @app.get("/")
@@ -0,0 +1,181 @@
+# app/manifest.py
+import contextlib
+import json
+import os
+import struct
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from app import config
+from app.logger import get_logger
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: writers in different processes are not serialized
+    fcntl = None
+
+log = get_logger(__name__)
+
+# Serialized IndexFlatIP / IndexFlatL2: fourcc, d, ntotal, two unused ids, is_trained,
+# metric type, then the float32 codes (length-prefixed) at the end of the file.
+FLAT_FOURCCS = (b"IxFI", b"IxF2")
+FLAT_HEADER = struct.Struct("<4siqqq?iQ")
+
+
+class IndexManifest:
+    def __init__(self, path: str):
+        """
+        Versioned description of a store's files, shared by every process
+        that uses them. Writers hold the exclusive lock while they change
+        the files and then replace the manifest atomically with a bumped
+        version; readers notice the change with a single stat().
+
+        Args:
+            path (str): Manifest JSON path; the lock file sits next to it.
+        """
+        self.path = path
+        self.lock_path = path + ".lock"
+        # Reentrant within the process: add() holds it while it catches up with other writers
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+
+    def signature(self) -> Optional[Tuple[int, int, int]]:
+        """Cheap change check: (mtime_ns, size, inode), or None when there is no manifest yet."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def read(self) -> Optional[Dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            log.warning("⚠️ Unreadable index manifest", extra={"path": self.path})
+            return None
+
+    def write(self, data: Dict):
+        """Replace the manifest atomically, so readers never see a partial file."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    @contextlib.contextmanager
+    def locked(self, exclusive: bool = True):
+        """
+        Exclusive (writers) or shared (readers) lock over the store's files.
+        Nested use in the same process does not lock again.
+        """
+        with self._thread_lock:
+            if self._depth or fcntl is None or (not exclusive and not os.path.exists(self.lock_path)):
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            directory = os.path.dirname(self.lock_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_flat_rows(path: str, start: int, dim: int) -> Optional[np.ndarray]:
+    """
+    Rows `start:` of a serialized flat index, read from the end of the file
+    instead of loading the whole index. None when the file is not a plain
+    IndexFlatIP/L2 of that dimension (the caller then reloads everything).
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(FLAT_HEADER.size)
+            if len(header) < FLAT_HEADER.size:
+                return None
+            fourcc, d, ntotal, _, _, _, metric, _ = FLAT_HEADER.unpack(header)
+            size = os.fstat(f.fileno()).st_size
+            if fourcc not in FLAT_FOURCCS or d != dim or metric > 1 or not 0 <= start <= ntotal \
+                    or size != FLAT_HEADER.size + ntotal * d * 4:
+                return None
+            f.seek(size - (ntotal - start) * d * 4)
+            data = f.read((ntotal - start) * d * 4)
+    except OSError:
+        return None
+    return np.frombuffer(data, dtype="<f4").reshape(-1, dim).astype(np.float32)
+
+
+class IndexWatcher:
+    def __init__(self, stores: Callable[[], Iterable], interval: float = 2.0):
+        """
+        Background thread that keeps stores in step with writes made by
+        other processes (uvicorn workers): every `interval` seconds it calls
+        refresh() on each store, which costs one stat() when nothing changed.
+
+        Args:
+            stores (callable): Returns the stores to watch (re-evaluated every pass).
+            interval (float): Seconds between checks.
+        """
+        self.stores = stores
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="index-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for store in list(self.stores()):
+                try:
+                    store.refresh()
+                except Exception:
+                    log.error("❌ Index reload failed", extra={"path": store.manifest.path}, exc_info=True)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=self.interval + 5)
+
+
+_watcher_instance: Optional[IndexWatcher] = None
+
+def start_index_watcher(stores: Callable[[], Iterable]) -> Optional[IndexWatcher]:
+    """
+    Start the singleton IndexWatcher, or return None when INDEX_RELOAD_INTERVAL is 0.
+    """
+    global _watcher_instance
+    if config.INDEX_RELOAD_INTERVAL <= 0:
+        return None
+    if _watcher_instance is None:
+        _watcher_instance = IndexWatcher(stores, config.INDEX_RELOAD_INTERVAL)
+        _watcher_instance.start()
+    return _watcher_instance
+
+def stop_index_watcher():
+    global _watcher_instance
+    if _watcher_instance is not None:
+        _watcher_instance.stop()
+        _watcher_instance = None
+
+
+def manifest_record(version: int, epoch: str, vectors: int, **fields) -> Dict:
+    return {"version": version, "epoch": epoch, "vectors": vectors, "updated": time.time(),
+            "pid": os.getpid(), **fields}
@@ -0,0 +1,233 @@
+# app/profiling.py
+import asyncio
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from app import config
+from app.logger import get_logger
+
+log = get_logger(__name__)
+
+Frame = Tuple[str, str, int]  # (function, file, line)
+PROFILE_SUFFIXES = (".collapsed", ".speedscope.json")
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005):
+        """
+        Wall-clock sampling profiler over every Python thread.
+
+        Sampling all threads (rather than cProfile on the handler thread)
+        captures work awaited on the compute executor and the threadpool.
+        Stacks from other requests running at the same time are included too.
+
+        Args:
+            interval (float): Seconds between samples.
+        """
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start = 0.0
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, frame.f_lineno))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[(names.get(thread_id, str(thread_id)),) + tuple(stack)] += 1
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._start
+
+    def collapsed(self) -> str:
+        """Brendan Gregg collapsed-stack format, one `thread;frame;frame count` line per stack."""
+        lines = []
+        for key, count in self.samples.most_common():
+            thread, stack = key[0], key[1:]
+            frames = [f"{name} ({os.path.basename(path)}:{line})" for name, path, line in stack]
+            lines.append(";".join([thread] + frames) + f" {count}")
+        return "".join(line + "\n" for line in lines)
+
+    def speedscope(self, name: str) -> Dict:
+        """Speedscope "sampled" profile, one profile per thread."""
+        frame_ids: Dict[Frame, int] = {}
+        frames: List[Dict] = []
+        per_thread: Dict[str, Tuple[list, list]] = {}
+        for key, count in self.samples.items():
+            thread, stack = key[0], key[1:]
+            ids = []
+            for frame in stack:
+                if frame not in frame_ids:
+                    frame_ids[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                ids.append(frame_ids[frame])
+            samples, weights = per_thread.setdefault(thread, ([], []))
+            samples.append(ids)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "rag-web-retrieval",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": thread,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": round(self.duration, 6),
+                    "samples": samples,
+                    "weights": weights,
+                }
+                for thread, (samples, weights) in per_thread.items()
+            ],
+        }
+
+
+def profile_dir() -> str:
+    return config.PROFILE_DIR
+
+
+def list_profiles() -> List[Dict]:
+    """Saved profiles, newest first."""
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            entries.append({"name": name, "bytes": stat.st_size, "created": stat.st_mtime})
+    return sorted(entries, key=lambda e: e["created"], reverse=True)
+
+
+def profile_filename(method: str, path: str, fmt: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    stem = f"{time.strftime('%Y%m%d-%H%M%S')}_{method.lower()}_{slug}_{uuid.uuid4().hex[:6]}"
+    return f"{stem}.speedscope.json" if fmt == "speedscope" else f"{stem}.collapsed"
+
+
+def _write_profile(profiler: SamplingProfiler, filename: str, title: str):
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    if filename.endswith(".speedscope.json"):
+        body = json.dumps(profiler.speedscope(title))
+    else:
+        body = profiler.collapsed()
+    path = os.path.join(directory, filename)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(body)
+    collect_profiles(directory, config.PROFILE_TTL, config.PROFILE_MAX_FILES, keep=path)
+
+
+def collect_profiles(directory: str, ttl: float, max_files: int, keep: Optional[str] = None) -> int:
+    """
+    Delete profiles older than `ttl` seconds (0 = no age limit), then the
+    oldest beyond `max_files` (0 = no count limit). Returns how many were removed.
+    """
+    if not os.path.isdir(directory):
+        return 0
+    profiles = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith(PROFILE_SUFFIXES) and path != keep:
+            try:
+                profiles.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+    profiles.sort(reverse=True)
+
+    now = time.time()
+    expired = [path for i, (mtime, path) in enumerate(profiles)
+               if (ttl and now - mtime > ttl) or (max_files and i >= max_files - (keep is not None))]
+    removed = 0
+    for path in expired:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            continue
+    if removed:
+        log.info("🧹 Removed old profiles", extra={"directory": directory, "removed": removed})
+    return removed
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        """
+        ASGI middleware that profiles a request when the admin header
+        `X-Profile: <ADMIN_TOKEN>` is present or a PROFILE_SAMPLE_RATE draw
+        selects it. It is only installed when PROFILING_ENABLED is set, so
+        there is no per-request cost otherwise.
+
+        `X-Profile-Format: speedscope` switches the output from collapsed stacks.
+        The saved file name is returned in the `X-Profile-Id` response header.
+        """
+        self.app = app
+
+    def _should_profile(self, headers: Dict[bytes, bytes]) -> bool:
+        token = headers.get(b"x-profile")
+        # Compared as bytes: header values are arbitrary bytes, not necessarily valid UTF-8
+        if token is not None and config.ADMIN_TOKEN and hmac.compare_digest(token, config.ADMIN_TOKEN.encode()):
+            return True
+        return config.PROFILE_SAMPLE_RATE > 0 and random.random() < config.PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        if not self._should_profile(headers):
+            await self.app(scope, receive, send)
+            return
+
+        fmt = headers.get(b"x-profile-format", b"collapsed").decode("latin-1")
+        filename = profile_filename(scope["method"], scope["path"], fmt)
+        profiler = SamplingProfiler(interval=config.PROFILE_INTERVAL)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", filename.encode())]
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            await asyncio.to_thread(_write_profile, profiler, filename, f"{scope['method']} {scope['path']}")
+            log.info("🔥 Saved request profile", extra={
+                "profile": filename, "path": scope["path"], "seconds": round(profiler.duration, 4),
+                "samples": sum(profiler.samples.values()),
+            })
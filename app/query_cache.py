@@ -0,0 +1,188 @@
+# app/query_cache.py
+import copy
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app import config
+from app.metrics import CACHE_LOOKUPS
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share a cache entry."""
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+
+class InMemoryBackend:
+    """Process-local LRU + TTL store."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            created, value = item
+            if self.ttl and time.monotonic() - created > self.ttl:
+                del self._data[key]
+                self.evictions += 1
+                return None
+            self._data.move_to_end(key)
+            return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic(), copy.deepcopy(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """LRU + TTL store in a local SQLite file, shared by every worker on the host."""
+
+    def __init__(self, path: str, max_entries: int, ttl: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM query_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl and now - created > self.ttl:
+                self._conn.execute("DELETE FROM query_cache WHERE key = ?", (key,))
+                self.evictions += 1
+                return None
+            self._conn.execute("UPDATE query_cache SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM query_cache").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM query_cache WHERE key IN "
+                    "(SELECT key FROM query_cache ORDER BY accessed ASC LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM query_cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM query_cache").fetchone()
+        return count
+
+
+class QueryCache:
+    def __init__(self, backend):
+        """
+        Response cache for query endpoints.
+
+        Keys combine the endpoint, normalized query, request parameters and the
+        vector store's index version, so any `VectorStore.add`/`reset` makes
+        older entries unreachable; they then age out through LRU/TTL eviction.
+
+        Args:
+            backend: An InMemoryBackend or SQLiteBackend instance.
+        """
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(endpoint: str, query: str, index_version: int, **params) -> str:
+        parts = [endpoint, f"v{index_version}", normalize_query(query)]
+        parts.extend(f"{name}={params[name]}" for name in sorted(params))
+        return "|".join(parts)
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            CACHE_LOOKUPS.inc(outcome="miss")
+        else:
+            self.hits += 1
+            CACHE_LOOKUPS.inc(outcome="hit")
+        return value
+
+    def set(self, key: str, value: Dict):
+        self.backend.set(key, value)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Singleton instance
+_query_cache_instance: Optional[QueryCache] = None
+
+def get_query_cache() -> Optional[QueryCache]:
+    """
+    Returns a singleton QueryCache, or None when the cache is disabled.
+    """
+    global _query_cache_instance
+    if not config.QUERY_CACHE_ENABLED:
+        return None
+    if _query_cache_instance is None:
+        if config.QUERY_CACHE_BACKEND == "sqlite":
+            backend = SQLiteBackend(config.QUERY_CACHE_PATH, config.QUERY_CACHE_MAX_ENTRIES, config.QUERY_CACHE_TTL)
+        else:
+            backend = InMemoryBackend(config.QUERY_CACHE_MAX_ENTRIES, config.QUERY_CACHE_TTL)
+        _query_cache_instance = QueryCache(backend)
+    return _query_cache_instance
@@ -1,16 +1,21 @@
 import requests
 from bs4 import BeautifulSoup
+from app.logger import get_logger
+from app.metrics import timed
+
+log = get_logger(__name__)
 
 def scrape_text_from_url(url):
     try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.content, "html.parser")
-        for script in soup(["script", "style", "nav", "header", "footer"]):
-            script.extract()
-        text = soup.get_text(separator="\n")
-        lines = [line.strip() for line in text.splitlines()]
-        clean_text = "\n".join([line for line in lines if line])
-        return clean_text
+        with timed("scrape"):
+            response = requests.get(url, timeout=10)
+            soup = BeautifulSoup(response.content, "html.parser")
+            for script in soup(["script", "style", "nav", "header", "footer"]):
+                script.extract()
+            text = soup.get_text(separator="\n")
+            lines = [line.strip() for line in text.splitlines()]
+            clean_text = "\n".join([line for line in lines if line])
+            return clean_text
     except Exception as e:
-        print(f"Failed to scrape {url}: {e}")
+        log.warning("Failed to scrape URL", extra={"url": url, "error": str(e)})
         return None
@@ -0,0 +1,179 @@
+# app/semantic_cache.py
+import copy
+import threading
+import time
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from app import config
+from app.metrics import REGISTRY
+from app.vector_store import get_vector_store
+
+SEMANTIC_LOOKUPS = REGISTRY.counter(
+    "rag_semantic_cache_lookups_total", "Semantic answer cache lookups by outcome."
+)
+SEMANTIC_SAVED_SECONDS = REGISTRY.counter(
+    "rag_semantic_cache_saved_seconds_total", "Pipeline time skipped by semantic cache hits."
+)
+
+
+class SemanticCache:
+    def __init__(self, dim: int, threshold: float = 0.92, max_entries: int = 2048, ttl: float = 600):
+        """
+        Answer cache keyed by query-embedding similarity, so paraphrases of a
+        recent question reuse its answer and citations.
+
+        Past query embeddings live in a small flat inner-product index; a
+        lookup returns the stored response of the nearest entry with the same
+        scope (endpoint and parameters) whose cosine similarity is at least
+        `threshold`. All entries are dropped when the document index version
+        changes.
+
+        Args:
+            dim (int): Query embedding dimensionality.
+            threshold (float): Minimum cosine similarity for a hit.
+            max_entries (int): Entries kept before the oldest are evicted.
+            ttl (float): Seconds an entry stays valid (0 = no expiry).
+        """
+        self.dim = dim
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.index = faiss.IndexFlatIP(dim)
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.entries: List[Dict] = []
+        self.index_version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_ms = 0.0
+        self.lookup_ms = 0.0
+
+    @staticmethod
+    def scope(endpoint: str, **params) -> str:
+        return "|".join([endpoint] + [f"{name}={params[name]}" for name in sorted(params)])
+
+    @staticmethod
+    def _prepare(embedding) -> np.ndarray:
+        vector = np.array(embedding, dtype=np.float32).reshape(1, -1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self, index_version: int):
+        if self.index_version != index_version:
+            self.evictions += len(self.entries)
+            self.index.reset()
+            self.vectors = self.vectors[:0]
+            self.entries = []
+            self.index_version = index_version
+
+    def get(self, embedding, index_version: int, scope: str) -> Optional[Dict]:
+        """
+        Returns a copy of the cached response for the closest matching query,
+        or None. Hits carry the similarity under `response["semantic_cache"]`.
+        """
+        start = time.perf_counter()
+        query = self._prepare(embedding)
+        hit = None
+        with self._lock:
+            self._check_version(index_version)
+            if self.index.ntotal:
+                scores, ids = self.index.search(query, min(8, self.index.ntotal))
+                now = time.monotonic()
+                for score, idx in zip(scores[0], ids[0]):
+                    if idx < 0 or score < self.threshold:
+                        break
+                    entry = self.entries[idx]
+                    if entry["scope"] != scope or (self.ttl and now - entry["created"] > self.ttl):
+                        continue
+                    hit = (float(score), entry)
+                    break
+            if hit is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.saved_ms += hit[1]["compute_ms"]
+            self.lookup_ms += (time.perf_counter() - start) * 1000
+
+        if hit is None:
+            SEMANTIC_LOOKUPS.inc(outcome="miss")
+            return None
+        SEMANTIC_LOOKUPS.inc(outcome="hit")
+        SEMANTIC_SAVED_SECONDS.inc(hit[1]["compute_ms"] / 1000)
+        response = copy.deepcopy(hit[1]["response"])
+        response["semantic_cache"] = {"similarity": round(hit[0], 4), "query": hit[1]["query"]}
+        return response
+
+    def set(self, embedding, index_version: int, scope: str, query: str, response: Dict, compute_ms: float):
+        """
+        Store a response under its query embedding.
+
+        Args:
+            compute_ms (float): Time the pipeline took to produce it, credited as saved on each hit.
+        """
+        vector = self._prepare(embedding)
+        with self._lock:
+            self._check_version(index_version)
+            self.entries.append({
+                "scope": scope,
+                "query": query,
+                "response": copy.deepcopy(response),
+                "created": time.monotonic(),
+                "compute_ms": compute_ms,
+            })
+            self.vectors = np.vstack([self.vectors, vector])
+            self.index.add(vector)
+            if len(self.entries) > self.max_entries:
+                self._evict_oldest()
+
+    def _evict_oldest(self):
+        # Drop the oldest tenth at once so the flat index is rebuilt rarely
+        drop = max(1, self.max_entries // 10)
+        self.entries = self.entries[drop:]
+        self.vectors = self.vectors[drop:]
+        self.index.reset()
+        self.index.add(self.vectors)
+        self.evictions += drop
+
+    def clear(self):
+        with self._lock:
+            self.index.reset()
+            self.vectors = self.vectors[:0]
+            self.entries = []
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_ms": round(self.saved_ms, 3),
+            "avg_lookup_ms": round(self.lookup_ms / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Singleton instance
+_semantic_cache_instance: Optional[SemanticCache] = None
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Returns a singleton SemanticCache sized for the shared VectorStore, or
+    None when the semantic cache is disabled.
+    """
+    global _semantic_cache_instance
+    if not config.SEMANTIC_CACHE_ENABLED:
+        return None
+    if _semantic_cache_instance is None:
+        _semantic_cache_instance = SemanticCache(
+            get_vector_store().dim,
+            threshold=config.SEMANTIC_CACHE_THRESHOLD,
+            max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES,
+            ttl=config.SEMANTIC_CACHE_TTL,
+        )
+    return _semantic_cache_instance
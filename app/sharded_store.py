@@ -0,0 +1,403 @@
+# app/sharded_store.py
+import heapq
+import json
+import os
+import threading
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from app.lexical_index import LexicalIndex
+from app.logger import get_logger
+from app.metrics import INDEX_VECTORS, timed
+from app.vector_store import VectorStore
+
+log = get_logger(__name__)
+
+SHARD_ROUTING = ("hash", "url")
+
+
+class Shard:
+    """One partition: a flat index keyed by global chunk id, and its chunks' metadata."""
+
+    def __init__(self, dim: int, use_cosine: bool, index_path: str, meta_path: str):
+        self.dim = dim
+        self.use_cosine = use_cosine
+        self.index_path = index_path
+        self.meta_path = meta_path
+        self.ids: List[int] = []
+        self.metadata: List[Dict] = []
+        self.dirty = False
+        # Bumped on every save and recorded in the store manifest, so readers reload only changed shards
+        self.generation = 0
+        self.index = self._empty_index()
+
+    def _empty_index(self) -> faiss.Index:
+        flat = faiss.IndexFlatIP(self.dim) if self.use_cosine else faiss.IndexFlatL2(self.dim)
+        return faiss.IndexIDMap2(flat)
+
+    def add(self, vectors: np.ndarray, ids: List[int], meta: List[Dict]):
+        self.index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+        self.ids.extend(ids)
+        self.metadata.extend(meta)
+        self.dirty = True
+
+    def save(self):
+        faiss.write_index(self.index, self.index_path)
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "metadata": self.metadata}, f, ensure_ascii=False)
+        self.dirty = False
+        self.generation += 1
+
+    def load(self) -> bool:
+        if not os.path.exists(self.index_path) or not os.path.exists(self.meta_path):
+            return False
+        self.index = faiss.read_index(self.index_path)
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.ids, self.metadata = data["ids"], data["metadata"]
+        self.dirty = False
+        return True
+
+    def remove_files(self):
+        for path in (self.index_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class ShardedIndex:
+    """
+    FAISS-like view over all shards, so code written against a single flat
+    index (search, range_search, reconstruct_*) works unchanged. Ids are
+    global chunk ids, i.e. positions in the store's metadata.
+    """
+
+    def __init__(self, store: "ShardedVectorStore"):
+        self.store = store
+        self.d = store.dim
+
+    @property
+    def ntotal(self) -> int:
+        return len(self.store.owner)
+
+    def _scatter(self, fn, shards):
+        if len(shards) == 1:
+            return [fn(shards[0])]
+        while True:
+            with self.store._shard_lock:
+                executor = self.store.executor
+            try:
+                futures = [executor.submit(fn, shard) for shard in shards]
+            except RuntimeError:
+                # A shard was added (here or by another worker) and the pool replaced
+                # after we took it: its submitted work still runs, so retry on the new one
+                if executor is self.store.executor:
+                    raise
+                continue
+            return [future.result() for future in futures]
+
+    def search(self, x: np.ndarray, k: int, params=None):
+        """Search every non-empty shard in parallel and merge each query's top k by heap."""
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        nq = len(x)
+        higher_is_better = self.store.use_cosine
+        pad = -np.inf if higher_is_better else np.inf
+        scores = np.full((nq, k), pad, dtype=np.float32)
+        ids = np.full((nq, k), -1, dtype=np.int64)
+        shards = [shard for shard in self.store.shards if shard.index.ntotal]
+        if not shards or k <= 0:
+            return scores, ids
+
+        parts = self._scatter(lambda shard: shard.index.search(x, min(k, shard.index.ntotal)), shards)
+        pick = heapq.nlargest if higher_is_better else heapq.nsmallest
+        for q in range(nq):
+            candidates = ((float(s), int(i)) for part_scores, part_ids in parts
+                          for s, i in zip(part_scores[q], part_ids[q]) if i >= 0)
+            best = pick(k, candidates)
+            if best:
+                scores[q, :len(best)] = [s for s, _ in best]
+                ids[q, :len(best)] = [i for _, i in best]
+        return scores, ids
+
+    def range_search(self, x: np.ndarray, radius: float):
+        """Range search on every shard in parallel; hits are concatenated per query."""
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        nq = len(x)
+        shards = [shard for shard in self.store.shards if shard.index.ntotal]
+        parts = self._scatter(lambda shard: shard.index.range_search(x, radius), shards) if shards else []
+        lims, all_scores, all_ids, total = [0], [], [], 0
+        for q in range(nq):
+            for part_lims, part_scores, part_ids in parts:
+                all_scores.append(part_scores[part_lims[q]:part_lims[q + 1]])
+                all_ids.append(part_ids[part_lims[q]:part_lims[q + 1]])
+                total += part_lims[q + 1] - part_lims[q]
+            lims.append(total)
+        scores = np.concatenate(all_scores) if all_scores else np.empty(0, dtype=np.float32)
+        ids = np.concatenate(all_ids) if all_ids else np.empty(0, dtype=np.int64)
+        return np.asarray(lims, dtype=np.int64), scores, ids
+
+    def reconstruct(self, key: int) -> np.ndarray:
+        return self.store.shards[self.store.owner[key]].index.reconstruct(int(key))
+
+    def reconstruct_batch(self, keys) -> np.ndarray:
+        keys = np.asarray(keys, dtype=np.int64)
+        out = np.empty((len(keys), self.d), dtype=np.float32)
+        owners = np.asarray(self.store.owner, dtype=np.int64)[keys] if len(keys) else keys
+        for shard_no in np.unique(owners):
+            rows = np.flatnonzero(owners == shard_no)
+            out[rows] = self.store.shards[shard_no].index.reconstruct_batch(keys[rows])
+        return out
+
+    def reconstruct_n(self, start: int, n: int) -> np.ndarray:
+        return self.reconstruct_batch(np.arange(start, start + n))
+
+
+class ShardedVectorStore(VectorStore):
+    def __init__(self, dim: int, use_cosine: bool = True, num_shards: int = 4, shard_by: str = "hash",
+                 directory: str = "outputs/shards",
+                 import_index_path: Optional[str] = None, import_meta_path: Optional[str] = None):
+        """
+        VectorStore whose vectors are partitioned across `num_shards` flat
+        indexes, searched in parallel threads (FAISS releases the GIL) with
+        per-query top-k merged by heap.
+
+        Chunk ids stay global (positions in `metadata`), so results, the
+        lexical index, two-stage retrieval and conversations work unchanged.
+        Each shard persists its own index and metadata and only shards that
+        changed are rewritten on save. Shards can be added at any time: new
+        chunks are routed over the larger set and nothing is rebuilt.
+
+        Args:
+            dim (int): Dimensionality of embeddings.
+            use_cosine (bool): Whether to use cosine similarity (default True).
+            num_shards (int): Shard count for a new store; an existing store keeps
+                its shards and grows to this count if it has fewer.
+            shard_by (str): "hash" spreads chunks by a hash of their id; "url"
+                keeps every chunk of a page in the same shard.
+            directory (str): Directory holding the manifest and per-shard files.
+            import_index_path (str): Optional unsharded index to import when the
+                sharded store is still empty.
+            import_meta_path (str): Metadata for `import_index_path`.
+        """
+        if shard_by not in SHARD_ROUTING:
+            raise ValueError(f"shard_by must be one of {', '.join(SHARD_ROUTING)}")
+        self.directory = directory
+        self.num_shards = max(1, num_shards)
+        self.shard_by = shard_by
+        self.import_index_path = import_index_path
+        self.import_meta_path = import_meta_path
+        self.shards: List[Shard] = []
+        self.owner: List[int] = []
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._shard_lock = threading.Lock()
+        super().__init__(
+            dim, use_cosine,
+            index_path=os.path.join(directory, "manifest.json"),
+            meta_path=os.path.join(directory, "manifest.json"),
+            sentence_path=os.path.join(directory, "sentence_embeddings.npy"),
+            lexical_path=os.path.join(directory, "lexical_index.npz"),
+            manifest_path=os.path.join(directory, "manifest.json"),
+        )
+
+    def _new_shard(self, number: int) -> Shard:
+        return Shard(self.dim, self.use_cosine,
+                     os.path.join(self.directory, f"shard_{number:03d}.faiss"),
+                     os.path.join(self.directory, f"shard_{number:03d}.json"))
+
+    def _resize_executor(self):
+        # Caller holds _shard_lock. The old pool finishes what it was given; searches
+        # that took it just before the swap retry their submit on the new one.
+        old = self.executor
+        self.executor = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix="shard")
+        if old is not None:
+            old.shutdown(wait=False)
+
+    def add_shard(self) -> int:
+        """Add an empty shard; later chunks are routed over the new count. Returns its number."""
+        with self.manifest.locked():
+            self.refresh()
+            with self._shard_lock:
+                self.shards.append(self._new_shard(len(self.shards)))
+                self.num_shards = len(self.shards)
+                self._resize_executor()
+            self.version += 1
+            self._publish()
+        log.info("➕ Added vector shard", extra={"shards": self.num_shards})
+        return self.num_shards - 1
+
+    def _route(self, chunk_id: int, meta: Dict) -> int:
+        key = meta.get("url", "") if self.shard_by == "url" else str(chunk_id)
+        return zlib.crc32(key.encode("utf-8")) % len(self.shards)
+
+    def _index_vectors(self, embeddings: np.ndarray, meta: List[Dict]):
+        with self._shard_lock:
+            start = len(self.owner)
+            routes = np.array([self._route(start + i, item) for i, item in enumerate(meta)], dtype=np.int64)
+            for shard_no in np.unique(routes):
+                rows = np.flatnonzero(routes == shard_no)
+                self.shards[shard_no].add(embeddings[rows], [start + int(r) for r in rows], [meta[r] for r in rows])
+            self.owner.extend(int(r) for r in routes)
+
+    def _manifest_fields(self) -> Dict:
+        return {**super()._manifest_fields(), "dim": self.dim, "use_cosine": self.use_cosine,
+                "shard_by": self.shard_by, "shards": len(self.shards),
+                "generations": [shard.generation for shard in self.shards]}
+
+    def _save(self):
+        """Write changed shards and the global side indexes; add() then publishes the manifest."""
+        with timed("persist"):
+            os.makedirs(self.directory, exist_ok=True)
+            written = 0
+            for shard in self.shards:
+                if shard.dirty:
+                    shard.save()
+                    written += 1
+            if self.sentence_embeddings is not None:
+                with open(self.sentence_path, "wb") as f:
+                    np.save(f, self.sentence_embeddings)
+            self.lexical.save()
+        log.debug("💾 Saved shards", extra={"written": written, "shards": len(self.shards)})
+
+    def _load(self):
+        super()._load()
+        if self.owner or not self.import_index_path or not os.path.exists(self.import_index_path):
+            return
+        # Workers starting together would each import: re-check under the writer lock, so
+        # only the first imports and the rest pick its shards up through refresh()
+        with self.manifest.locked():
+            self.refresh()
+            if not self.owner and self.manifest.read() is None:
+                self._import_flat()
+
+    def _read_files(self):
+        """Load every shard listed in the manifest, and reassemble global metadata by chunk id."""
+        count = self.num_shards
+        manifest = self.manifest.read() or {}
+        generations = manifest.get("generations", [])
+        self.shard_by = manifest.get("shard_by", self.shard_by)
+        count = max(count, manifest.get("shards", 0))
+
+        shards = [self._new_shard(n) for n in range(count)]
+        total = 0
+        for n, shard in enumerate(shards):
+            if shard.load():
+                total += len(shard.ids)
+            shard.generation = generations[n] if n < len(generations) else 0
+        metadata: List[Optional[Dict]] = [None] * total
+        owner = [0] * total
+        for shard_no, shard in enumerate(shards):
+            for chunk_id, item in zip(shard.ids, shard.metadata):
+                metadata[chunk_id] = item
+                owner[chunk_id] = shard_no
+
+        sentence_embeddings = np.load(self.sentence_path) if os.path.exists(self.sentence_path) else None
+        lexical = LexicalIndex(self.lexical.path)
+        if not lexical.load() or len(lexical) != len(metadata):
+            lexical.reset()
+            lexical.add([item.get("text", "") for item in metadata])
+
+        with self._shard_lock:
+            self.shards, self.owner, self.metadata = shards, owner, metadata
+            self.num_shards = len(shards)
+            self._resize_executor()
+        self.sentence_embeddings = sentence_embeddings
+        self.lexical = lexical
+        self.index = ShardedIndex(self)
+        # Two-stage indexes built over the old shards are rebuilt
+        self.rebuilds += 1
+        if total:
+            log.info("📥 Loaded vector shards", extra={"path": self.directory, "shards": count, "vectors": total})
+        self.version += 1
+        INDEX_VECTORS.set(self.index.ntotal)
+
+    def _read_changes(self, manifest: Dict) -> bool:
+        """Reload only the shards whose generation changed; False when the change is not a pure append."""
+        start, total = len(self.owner), manifest.get("vectors", 0)
+        generations = manifest.get("generations", [])
+        if total < start or len(generations) < len(self.shards) or manifest.get("shard_by") != self.shard_by:
+            return False
+        changed = []
+        for n, generation in enumerate(generations):
+            if n < len(self.shards) and self.shards[n].generation == generation:
+                continue
+            shard = self._new_shard(n)
+            shard.load()
+            shard.generation = generation
+            changed.append((n, shard))
+
+        added: List[Optional[Dict]] = [None] * (total - start)
+        owner = [0] * (total - start)
+        for n, shard in changed:
+            for chunk_id, item in zip(shard.ids, shard.metadata):
+                if chunk_id >= total:
+                    return False
+                if chunk_id >= start:
+                    added[chunk_id - start] = item
+                    owner[chunk_id - start] = n
+        if any(item is None for item in added):
+            return False
+
+        if manifest.get("sentences", 0) != (0 if self.sentence_embeddings is None else len(self.sentence_embeddings)):
+            self.sentence_embeddings = np.load(self.sentence_path) if os.path.exists(self.sentence_path) else None
+        with self._shard_lock:
+            grown = len(generations) > len(self.shards)
+            for n, shard in changed:
+                if n < len(self.shards):
+                    self.shards[n] = shard
+                else:
+                    self.shards.append(shard)
+            self.num_shards = len(self.shards)
+            if grown:
+                self._resize_executor()
+            self.owner.extend(owner)
+        self.metadata.extend(added)
+        self.lexical.add([item.get("text", "") for item in added])
+        INDEX_VECTORS.set(self.index.ntotal)
+        log.debug("🔄 Reloaded changed shards", extra={"shards": [n for n, _ in changed], "added": len(added)})
+        return True
+
+    def _import_flat(self):
+        """Partition an existing unsharded store into the (empty) shards."""
+        flat = faiss.read_index(self.import_index_path)
+        meta = []
+        if self.import_meta_path and os.path.exists(self.import_meta_path):
+            with open(self.import_meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        if flat.ntotal == 0 or flat.ntotal != len(meta):
+            log.warning("⚠️ Skipped importing unsharded index",
+                        extra={"path": self.import_index_path, "vectors": flat.ntotal, "metadata": len(meta)})
+            return
+        # Stored vectors are already normalized; add() normalizes again, which is a no-op
+        self.add(flat.reconstruct_n(0, flat.ntotal), meta)
+        log.info("📦 Imported unsharded index into shards",
+                 extra={"path": self.import_index_path, "vectors": flat.ntotal, "shards": len(self.shards)})
+
+    def reset(self):
+        """Empty every shard and delete the shard files."""
+        with self.manifest.locked():
+            with self._shard_lock:
+                for shard in self.shards:
+                    shard.remove_files()
+                self.shards = [self._new_shard(n) for n in range(self.num_shards)]
+                self.owner = []
+                self.metadata = []
+            self.index = ShardedIndex(self)
+            self.rebuilds += 1
+            self.sentence_embeddings = None
+            self.lexical.reset()
+            self.version += 1
+            for path in (self.sentence_path, self.lexical.path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.epoch = uuid.uuid4().hex
+            self._publish()
+        INDEX_VECTORS.set(0)
+        log.info("🧹 Vector store reset completed.")
+
+    def shard_stats(self) -> List[Dict]:
+        return [{"shard": n, "vectors": shard.index.ntotal, "dirty": shard.dirty, "generation": shard.generation}
+                for n, shard in enumerate(self.shards)]
@@ -0,0 +1,165 @@
+# app/snippets.py
+import re
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Union
+
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?]) +')
+TOKEN_RE = re.compile(r"\w+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or "
+    "that the this to was what when where which who why with you your".split()
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences on terminal punctuation followed by spaces."""
+    text = text.strip()
+    if not text:
+        return []
+    return SENTENCE_SPLIT_RE.split(text)
+
+
+def sentence_offsets(text: str) -> List[List[int]]:
+    """
+    Character [start, end) offsets of each sentence in text, matching
+    `split_sentences` on already-stripped text. Stored per chunk at ingest
+    so the request path can slice sentences instead of re-splitting.
+    """
+    if not text:
+        return []
+    offsets = []
+    start = 0
+    for match in SENTENCE_SPLIT_RE.finditer(text):
+        offsets.append([start, match.start()])
+        start = match.end()
+    offsets.append([start, len(text)])
+    return offsets
+
+
+def doc_sentences(doc: Dict) -> List[str]:
+    """Sentences of a search hit, using stored offsets when ingestion recorded them."""
+    text = doc.get("text", "")
+    offsets = doc.get("sentences")
+    if offsets is None:
+        return split_sentences(text)
+    return [text[start:end] for start, end in offsets]
+
+
+def query_terms(query: str) -> List[str]:
+    """Unique, lowercased query tokens with stopwords removed (falls back to all tokens)."""
+    tokens = TOKEN_RE.findall(query.lower())
+    terms = [t for t in tokens if t not in STOPWORDS] or tokens
+    return list(dict.fromkeys(terms))
+
+
+def score_sentences(sentences: Sequence[str], query: str) -> np.ndarray:
+    """
+    Score every sentence against the query with BM25, treating each sentence
+    as a document. All sentences are scored in one pass: tokens are mapped to
+    query-term ids and accumulated into a (sentences x terms) count matrix.
+
+    Args:
+        sentences (Sequence[str]): Candidate sentences, possibly from many hits.
+        query (str): The user query.
+
+    Returns:
+        np.ndarray: One float score per sentence.
+    """
+    n = len(sentences)
+    terms = query_terms(query)
+    if n == 0 or not terms:
+        return np.zeros(n, dtype=np.float32)
+
+    term_ids = {term: i for i, term in enumerate(terms)}
+    rows, cols = [], []
+    lengths = np.empty(n, dtype=np.float32)
+    for row, sentence in enumerate(sentences):
+        tokens = TOKEN_RE.findall(sentence.lower())
+        lengths[row] = len(tokens)
+        for token in tokens:
+            col = term_ids.get(token)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+
+    tf = np.zeros((n, len(terms)), dtype=np.float32)
+    if rows:
+        np.add.at(tf, (np.asarray(rows), np.asarray(cols)), 1.0)
+
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+    avg_len = max(float(lengths.mean()), 1.0)
+    norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths / avg_len)
+    weighted = tf * (BM25_K1 + 1.0) / (tf + norm[:, None])
+    return weighted @ idf
+
+
+def _embedding_scores(docs: Sequence[Dict], query_embedding: np.ndarray,
+                      sentence_embeddings: np.ndarray) -> Optional[np.ndarray]:
+    """Cosine scores from stored sentence vectors, or None if any hit lacks them."""
+    rows = []
+    for doc in docs:
+        first = doc.get("sentence_row")
+        if first is None:
+            return None
+        rows.extend(range(first, first + len(doc.get("sentences") or ())))
+    if not rows or max(rows) >= len(sentence_embeddings):
+        return None
+    query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+    query = query / (np.linalg.norm(query) or 1.0)
+    return sentence_embeddings[rows].astype(np.float32) @ query
+
+
+def highlight_snippets(docs: Sequence[Union[Dict, str]], query: str, max_len: int = 180,
+                       query_embedding: Optional[np.ndarray] = None,
+                       sentence_embeddings: Optional[np.ndarray] = None) -> List[str]:
+    """
+    Pick the most query-relevant sentence from each hit, scoring the
+    sentences of all hits together. If the best sentence is very short,
+    the next sentence is appended.
+
+    When ingestion stored per-sentence embeddings and a query embedding is
+    given, sentences are scored by cosine similarity with one matrix
+    product; otherwise BM25 term overlap is used.
+
+    Args:
+        docs (Sequence[dict | str]): Search hits (or raw texts), one per citation.
+        query (str): The user query.
+        max_len (int): Maximum snippet length in characters.
+        query_embedding (np.ndarray): Optional query vector.
+        sentence_embeddings (np.ndarray): Optional sentence vector side array.
+
+    Returns:
+        List[str]: One snippet per input hit ("" for empty texts).
+    """
+    docs = [doc if isinstance(doc, dict) else {"text": doc} for doc in docs]
+    per_doc = [doc_sentences(doc) for doc in docs]
+    offsets = np.cumsum([0] + [len(s) for s in per_doc])
+
+    scores = None
+    if query_embedding is not None and sentence_embeddings is not None:
+        scores = _embedding_scores(docs, query_embedding, sentence_embeddings)
+    if scores is None:
+        scores = score_sentences([s for sentences in per_doc for s in sentences], query)
+
+    snippets = []
+    for i, sentences in enumerate(per_doc):
+        if not sentences:
+            snippets.append("")
+            continue
+        # argmax keeps the first sentence when nothing matches
+        idx = int(np.argmax(scores[offsets[i]:offsets[i + 1]]))
+        snippet = sentences[idx]
+        if len(snippet) < 50 and idx + 1 < len(sentences):
+            snippet += " " + sentences[idx + 1]
+        snippets.append(snippet[:max_len].strip())
+    return snippets
+
+
+def highlight_snippet(doc_text: str, query: str, max_len: int = 180) -> str:
+    """Single-document convenience wrapper around `highlight_snippets`."""
+    return highlight_snippets([doc_text], query, max_len=max_len)[0]
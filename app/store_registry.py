@@ -0,0 +1,263 @@
+# app/store_registry.py
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app import config
+from app.dedup import NearDuplicateDetector, get_dedup_index
+from app.executor import run_blocking
+from app.logger import get_logger
+from app.metrics import REGISTRY
+from app.two_stage import TwoStageRetriever, get_two_stage_retriever
+from app.vector_store import VectorStore, get_vector_store, open_store
+
+log = get_logger(__name__)
+
+DEFAULT_COLLECTION = "default"
+COLLECTION_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+COLLECTION_EVENTS = REGISTRY.counter("rag_collection_events_total", "Named collection loads and evictions.")
+COLLECTIONS_LOADED = REGISTRY.gauge("rag_collections_loaded", "Named collections currently held in memory.")
+
+
+class CollectionError(ValueError):
+    """Invalid collection name, or a collection that does not exist."""
+
+
+def store_bytes(store: VectorStore, dedup: Optional[NearDuplicateDetector] = None) -> int:
+    """Rough resident size: float32 vectors, sentence vectors, chunk texts and dedup signatures."""
+    size = store.index.ntotal * store.dim * 4
+    if store.sentence_embeddings is not None:
+        size += store.sentence_embeddings.nbytes
+    size += sum(len(item.get("text", "")) for item in store.metadata)
+    if dedup is not None:
+        size += dedup.signatures.nbytes
+    return size
+
+
+class Collection:
+    def __init__(self, name: str, store: VectorStore, dedup: Optional[NearDuplicateDetector] = None,
+                 directory: Optional[str] = None):
+        """
+        A named corpus: its vector store, its own near-duplicate index and,
+        on first use, its own two-stage retriever.
+
+        Args:
+            name (str): Collection name (DEFAULT_COLLECTION for the shared store).
+            store (VectorStore): The collection's store.
+            dedup (NearDuplicateDetector): Near-duplicate index for ingest, or None when disabled.
+            directory (str): Directory holding the collection's files (None for the shared store).
+        """
+        self.name = name
+        self.store = store
+        self.dedup = dedup
+        self.directory = directory
+        # Only named collections count against the registry's budget
+        self.nbytes = store_bytes(store, dedup) if directory is not None else 0
+        self.last_used = time.monotonic()
+        self._retriever: Optional[TwoStageRetriever] = None
+
+    @property
+    def is_default(self) -> bool:
+        return self.name == DEFAULT_COLLECTION
+
+    def reset(self):
+        """Empty the store and its near-duplicate index together, so re-ingested pages are not skipped."""
+        self.store.reset()
+        if self.dedup is not None:
+            self.dedup.reset()
+
+    def retriever(self) -> TwoStageRetriever:
+        if self.is_default:
+            return get_two_stage_retriever()
+        if self._retriever is None:
+            self._retriever = TwoStageRetriever(
+                self.store, index_spec=config.TWO_STAGE_INDEX, cross_encoder=config.CROSS_ENCODER_MODEL or None
+            )
+        return self._retriever
+
+    def scoped_id(self, conversation_id: str) -> str:
+        """Conversation ids are per collection, since cached candidate ids index one store."""
+        return conversation_id if self.is_default else f"{self.name}/{conversation_id}"
+
+
+class CollectionRegistry:
+    def __init__(self, root: str, memory_budget_mb: float = 1024, max_loaded: int = 8):
+        """
+        Named collections under `root`, one directory each. A collection is
+        loaded on first use and the least recently used ones are dropped
+        from memory once the loaded set exceeds `memory_budget_mb` (by the
+        store_bytes estimate) or `max_loaded`; the most recently used one is
+        always kept. Stores save on every add, so eviction loses nothing.
+
+        DEFAULT_COLLECTION is the shared store from get_vector_store(): it is
+        never evicted and does not count against the budget.
+
+        Args:
+            root (str): Directory holding one subdirectory per collection.
+            memory_budget_mb (float): Budget for loaded named collections (0 = no limit).
+            max_loaded (int): Maximum named collections in memory (0 = no limit).
+        """
+        self.root = root
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.max_loaded = max_loaded
+        self._loaded: "OrderedDict[str, Collection]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per name, so loading one collection does not block the others
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    @staticmethod
+    def check_name(name: str) -> str:
+        if not isinstance(name, str) or not COLLECTION_NAME_RE.match(name):
+            raise CollectionError("collection must be 1-64 letters, digits, '-' or '_'")
+        return name
+
+    def directory(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def names(self) -> List[str]:
+        """Every collection on disk, plus the default one."""
+        on_disk = sorted(n for n in os.listdir(self.root) if os.path.isdir(self.directory(n))) \
+            if os.path.isdir(self.root) else []
+        return [DEFAULT_COLLECTION] + [n for n in on_disk if n != DEFAULT_COLLECTION]
+
+    def get(self, name: Optional[str] = None, create: bool = False) -> Collection:
+        """
+        The collection called `name` (default: DEFAULT_COLLECTION), loading it if needed.
+
+        Args:
+            name (str): Collection name.
+            create (bool): Create the collection when it does not exist (for ingest).
+
+        Raises:
+            CollectionError: Invalid name, or the collection does not exist and `create` is False.
+        """
+        name = self.check_name(name or DEFAULT_COLLECTION)
+        if name == DEFAULT_COLLECTION:
+            return Collection(name, get_vector_store(), get_dedup_index())
+
+        with self._lock:
+            collection = self._touch(name)
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        if collection is not None:
+            return collection
+
+        with load_lock:
+            with self._lock:
+                collection = self._touch(name)
+            if collection is not None:
+                return collection
+            directory = self.directory(name)
+            if not os.path.isdir(directory):
+                if not create:
+                    raise CollectionError(f"unknown collection {name!r}")
+                os.makedirs(directory, exist_ok=True)
+                log.info("🗂️ Created collection", extra={"collection": name})
+            start = time.perf_counter()
+            collection = Collection(name, open_store(directory), self._open_dedup(directory), directory)
+            with self._lock:
+                self._loaded[name] = collection
+                self.loads += 1
+                self._evict(keep=name)
+            COLLECTION_EVENTS.inc(event="load")
+            log.info("📥 Loaded collection", extra={
+                "collection": name, "vectors": collection.store.index.ntotal, "mb": round(collection.nbytes / 2**20, 2),
+                "ms": round((time.perf_counter() - start) * 1000, 1)})
+        return collection
+
+    def _touch(self, name: str) -> Optional[Collection]:
+        collection = self._loaded.get(name)
+        if collection is not None:
+            self._loaded.move_to_end(name)
+            collection.last_used = time.monotonic()
+        return collection
+
+    @staticmethod
+    def _open_dedup(directory: str) -> Optional[NearDuplicateDetector]:
+        if not config.DEDUP_ENABLED:
+            return None
+        return NearDuplicateDetector(
+            threshold=config.DEDUP_THRESHOLD,
+            num_perm=config.DEDUP_NUM_PERM,
+            shingle_size=config.DEDUP_SHINGLE_SIZE,
+            index_path=os.path.join(directory, "minhash_signatures.npy"),
+        )
+
+    def loaded(self) -> List[Collection]:
+        """Named collections currently in memory."""
+        with self._lock:
+            return list(self._loaded.values())
+
+    def loaded_bytes(self) -> int:
+        return sum(collection.nbytes for collection in self._loaded.values())
+
+    def _evict(self, keep: str):
+        # Caller holds self._lock
+        while len(self._loaded) > 1:
+            over_count = self.max_loaded and len(self._loaded) > self.max_loaded
+            over_budget = self.memory_budget and self.loaded_bytes() > self.memory_budget
+            if not (over_count or over_budget):
+                break
+            name = next(iter(self._loaded))
+            if name == keep:
+                self._loaded.move_to_end(name)
+                continue
+            evicted = self._loaded.pop(name)
+            self.evictions += 1
+            COLLECTION_EVENTS.inc(event="evict")
+            log.info("♻️ Evicted collection", extra={"collection": name, "mb": round(evicted.nbytes / 2**20, 2)})
+        COLLECTIONS_LOADED.set(len(self._loaded))
+
+    def refresh(self, collection: Collection):
+        """Re-measure a collection after ingest and evict others if it outgrew the budget."""
+        if collection.is_default:
+            return
+        with self._lock:
+            collection.nbytes = store_bytes(collection.store, collection.dedup)
+            if self._loaded.get(collection.name) is collection:
+                self._evict(keep=collection.name)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            loaded = [{"name": c.name, "vectors": c.store.index.ntotal, "mb": round(c.nbytes / 2**20, 2),
+                       "idle_s": round(time.monotonic() - c.last_used, 1)}
+                      for c in reversed(self._loaded.values())]
+            return {
+                "collections": self.names(),
+                "loaded": loaded,
+                "loaded_mb": round(self.loaded_bytes() / 2**20, 2),
+                "memory_budget_mb": round(self.memory_budget / 2**20, 2),
+                "max_loaded": self.max_loaded,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+async def resolve_collection(name: Optional[str]) -> Collection:
+    """Collection for a request's `collection` parameter; loading runs on the compute executor."""
+    registry = get_collection_registry()
+    if not name or name == DEFAULT_COLLECTION:
+        return registry.get()
+    return await run_blocking(registry.get, name)
+
+
+# Singleton instance
+_registry_instance: Optional[CollectionRegistry] = None
+
+def get_collection_registry() -> CollectionRegistry:
+    """
+    Returns a singleton CollectionRegistry over COLLECTIONS_DIR.
+    """
+    global _registry_instance
+    if _registry_instance is None:
+        _registry_instance = CollectionRegistry(
+            config.COLLECTIONS_DIR,
+            memory_budget_mb=config.COLLECTION_MEMORY_MB,
+            max_loaded=config.COLLECTION_MAX_LOADED,
+        )
+    return _registry_instance
@@ -0,0 +1,237 @@
+# app/two_stage.py
+import threading
+import time
+import faiss
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from app import config
+from app.logger import get_logger
+from app.metrics import timed
+from app.vector_store import VectorStore, get_vector_store
+
+log = get_logger(__name__)
+
+
+class TwoStageRetriever:
+    def __init__(self, store: VectorStore, index_spec: str = "SQ8", cross_encoder: Optional[str] = None):
+        """
+        Two-stage retrieval over a VectorStore.
+
+        Stage 1 generates candidates from a compressed or ANN index built with
+        `faiss.index_factory` (SQ8 by default: 4x smaller than float32). Stage 2
+        rescores the candidates exactly against the full-precision vectors in
+        the store's flat index, and optionally reranks the best of them with
+        a locally loadable cross-encoder.
+
+        Args:
+            store (VectorStore): Store holding the full-precision flat index and metadata.
+            index_spec (str): faiss.index_factory description for stage 1 (e.g. "SQ8", "HNSW32", "IVF256,PQ32").
+            cross_encoder (str): Optional sentence-transformers CrossEncoder name or local path.
+        """
+        self.store = store
+        self.index_spec = index_spec
+        self.cross_encoder_name = cross_encoder
+        self._cross_encoder = None
+        self._candidate_index: Optional[faiss.Index] = None
+        self._built_version = None
+        self._built_ntotal = 0
+        self._built_rebuilds = None
+        self._lock = threading.Lock()
+
+    def _metric(self):
+        return faiss.METRIC_INNER_PRODUCT if self.store.use_cosine else faiss.METRIC_L2
+
+    def _ensure_index(self) -> faiss.Index:
+        """Build the candidate index, or extend it when the store only grew since the last build."""
+        with self._lock:
+            store = self.store
+            if self._built_version == store.version and self._candidate_index is not None:
+                return self._candidate_index
+
+            ntotal = store.index.ntotal
+            index = self._candidate_index
+            # Appends (add() or an incremental reload) keep store.rebuilds; reset()/_load() bump it
+            grown = self._built_rebuilds == store.rebuilds and ntotal >= self._built_ntotal
+            if index is None or not grown or not index.is_trained:
+                index = faiss.index_factory(store.dim, self.index_spec, self._metric())
+                start = 0
+            else:
+                # search() uses the current index outside the lock: extend a copy and swap it in
+                index = faiss.clone_index(index)
+                start = self._built_ntotal
+
+            if ntotal > start:
+                vectors = store.index.reconstruct_n(start, ntotal - start)
+                if not index.is_trained:
+                    try:
+                        index.train(vectors)
+                    except RuntimeError as e:
+                        # e.g. IVF/PQ specs need more training points than a small corpus has
+                        log.warning("⚠️ Could not train stage-1 index, using exact candidates",
+                                    extra={"spec": self.index_spec, "error": str(e)})
+                        index = faiss.IndexFlatIP(store.dim) if store.use_cosine else faiss.IndexFlatL2(store.dim)
+                index.add(vectors)
+
+            ivf = faiss.try_extract_index_ivf(index)
+            if ivf is not None:
+                ivf.nprobe = config.TWO_STAGE_NPROBE
+
+            log.info("🧱 Built stage-1 candidate index",
+                     extra={"spec": self.index_spec, "vectors": ntotal, "incremental_from": start})
+            self._candidate_index = index
+            self._built_version = store.version
+            self._built_ntotal = ntotal
+            self._built_rebuilds = store.rebuilds
+            return index
+
+    def _load_cross_encoder(self):
+        if self._cross_encoder is None and self.cross_encoder_name:
+            from sentence_transformers import CrossEncoder
+            self._cross_encoder = CrossEncoder(self.cross_encoder_name)
+        return self._cross_encoder
+
+    def search(self, query_embedding, top_k: int = 5, min_score: Optional[float] = None,
+               candidates: Optional[int] = None, budget_ms: Optional[float] = None,
+               query_text: Optional[str] = None, rerank: bool = False,
+               report_recall: bool = False, nprobe: Optional[int] = None) -> Tuple[List[Dict], Dict]:
+        """
+        Retrieve top_k results in two stages under a candidate and time budget.
+
+        Args:
+            query_embedding (np.ndarray or list): Query vector.
+            top_k (int): Number of results to return.
+            min_score (float): Optional minimum (final) score filter.
+            candidates (int): Stage-1 candidate count (default TWO_STAGE_CANDIDATES).
+            budget_ms (float): Time budget for the whole retrieval. Stages that would
+                start after it is spent are skipped and reported as such.
+            query_text (str): Query text, required for cross-encoder reranking.
+            rerank (bool): Rerank exact-scored candidates with the cross-encoder.
+            report_recall (bool): Also run an exact flat search and report stage recall@k.
+            nprobe (int): Override the IVF cells probed in stage 1 (ignored for non-IVF specs).
+
+        Returns:
+            Tuple[List[Dict], Dict]: Results with metadata and scores, and per-stage stats.
+        """
+        store = self.store
+        stats: Dict = {"index_spec": self.index_spec, "stages": {}}
+        if store.index.ntotal == 0:
+            return [], stats
+
+        start = time.perf_counter()
+        deadline = start + budget_ms / 1000.0 if budget_ms else None
+        candidates = max(top_k, candidates or config.TWO_STAGE_CANDIDATES)
+        query = store.prepare_query(query_embedding)
+
+        # Stage 1: cheap candidate generation
+        index = self._ensure_index()
+        t0 = time.perf_counter()
+        params = None
+        if nprobe is not None and isinstance(index, faiss.IndexIVF):
+            params = faiss.SearchParametersIVF(nprobe=nprobe)
+        with timed("search_candidates"):
+            approx_scores, ids = index.search(query, min(candidates, store.index.ntotal), params=params)
+        ids = ids[0][ids[0] >= 0]
+        stats["stages"]["candidates"] = {
+            "count": int(len(ids)),
+            "ms": round((time.perf_counter() - t0) * 1000, 3),
+        }
+
+        # Stage 2: exact rescoring against full-precision vectors
+        rerank_scores: Dict[int, float] = {}
+        if deadline is not None and time.perf_counter() >= deadline:
+            stats["stages"]["rescore"] = {"skipped": "budget"}
+            final_ids, final_scores = ids, approx_scores[0][:len(ids)]
+        else:
+            t0 = time.perf_counter()
+            with timed("search_rescore"):
+                vectors = store.index.reconstruct_batch(ids) if len(ids) else np.empty((0, store.dim), dtype=np.float32)
+                if store.use_cosine:
+                    exact = vectors @ query[0]
+                    order = np.argsort(-exact)
+                else:
+                    exact = ((vectors - query[0]) ** 2).sum(axis=1)
+                    order = np.argsort(exact)
+            final_ids, final_scores = ids[order], exact[order]
+            stats["stages"]["rescore"] = {
+                "count": int(len(ids)),
+                "ms": round((time.perf_counter() - t0) * 1000, 3),
+            }
+
+            if rerank and query_text and self.cross_encoder_name:
+                final_ids, final_scores, rerank_scores = self._rerank(
+                    query_text, final_ids, final_scores, top_k, deadline, stats
+                )
+
+        final_ids, final_scores = final_ids[:top_k], final_scores[:top_k]
+        if report_recall:
+            stats["recall_at_k"] = self._recall(query, ids, final_ids, top_k)
+
+        results = []
+        for idx, score in zip(final_ids, final_scores):
+            hit = store.build_results([idx], [score], min_score)
+            if hit and int(idx) in rerank_scores:
+                hit[0]["rerank_score"] = rerank_scores[int(idx)]
+            results.extend(hit)
+
+        stats["total_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return results, stats
+
+    def _rerank(self, query_text, ids, scores, top_k, deadline, stats):
+        """
+        Cross-encoder rerank of the top candidates in small batches until the
+        budget runs out. Exact scores are kept as "score"; the order follows
+        the cross-encoder and its scores are returned per id.
+        """
+        model = self._load_cross_encoder()
+        pool = min(len(ids), max(top_k, config.TWO_STAGE_RERANK_DEPTH))
+        t0 = time.perf_counter()
+        rerank_scores: Dict[int, float] = {}
+        batch = 8
+        for begin in range(0, pool, batch):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            batch_ids = ids[begin:begin + batch]
+            pairs = [(query_text, self.store.metadata[int(i)].get("text", "")) for i in batch_ids]
+            for i, score in zip(batch_ids, model.predict(pairs)):
+                rerank_scores[int(i)] = float(score)
+
+        done = len(rerank_scores)
+        stats["stages"]["rerank"] = {
+            "count": done,
+            "requested": pool,
+            "ms": round((time.perf_counter() - t0) * 1000, 3),
+        }
+        if done == 0:
+            return ids, scores, rerank_scores
+        # Candidates the budget did not reach keep their exact-score order after the reranked head
+        head = sorted(range(done), key=lambda j: -rerank_scores[int(ids[j])])
+        order = np.concatenate([np.asarray(head, dtype=np.int64), np.arange(done, len(ids))])
+        return ids[order], scores[order], rerank_scores
+
+    def _recall(self, query, candidate_ids, final_ids, top_k) -> Dict:
+        _, exact_ids = self.store.index.search(query, top_k)
+        truth = set(int(i) for i in exact_ids[0] if i >= 0)
+        if not truth:
+            return {}
+        return {
+            "candidates": round(len(truth & set(int(i) for i in candidate_ids)) / len(truth), 4),
+            "final": round(len(truth & set(int(i) for i in final_ids[:top_k])) / len(truth), 4),
+        }
+
+
+# Singleton instance
+_retriever_instance: Optional[TwoStageRetriever] = None
+
+def get_two_stage_retriever() -> TwoStageRetriever:
+    """
+    Returns a singleton TwoStageRetriever over the shared VectorStore.
+    """
+    global _retriever_instance
+    if _retriever_instance is None:
+        _retriever_instance = TwoStageRetriever(
+            get_vector_store(),
+            index_spec=config.TWO_STAGE_INDEX,
+            cross_encoder=config.CROSS_ENCODER_MODEL or None,
+        )
+    return _retriever_instance
@@ -0,0 +1,24 @@
+# app/utils.py
+import json
+import inspect
+
+
+def sse_event(event: str, data) -> str:
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _async_sse(stages):
+    async for event, data in stages:
+        yield sse_event(event, data)
+
+
+def sse_stream(stages):
+    """
+    Turn (event, data) pipeline stages into SSE frames. Plain generators stay
+    synchronous so StreamingResponse iterates them in its threadpool rather
+    than on the event loop.
+    """
+    if inspect.isasyncgen(stages):
+        return _async_sse(stages)
+    return (sse_event(event, data) for event, data in stages)
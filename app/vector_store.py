@@ -1,14 +1,25 @@
 import faiss
 import numpy as np
-import pandas as pd
 import json
 import os
+import uuid
 from typing import List, Dict, Union, Optional
+from app import config
+from app.logger import get_logger
+from app.manifest import IndexManifest, manifest_record, read_flat_rows
+from app.metrics import INDEX_VECTORS, timed
+from app.lexical_index import LexicalIndex
+from app.export import write_export
+
+log = get_logger(__name__)
 
 class VectorStore:
     def __init__(self, dim: int, use_cosine: bool = True,
                  index_path="outputs/index.faiss",
-                 meta_path="outputs/metadata.json"):
+                 meta_path="outputs/metadata.json",
+                 sentence_path="outputs/sentence_embeddings.npy",
+                 lexical_path="outputs/lexical_index.npz",
+                 manifest_path: Optional[str] = None):
         """
         Initialize the VectorStore with FAISS index and metadata.
 
@@ -17,14 +28,34 @@ class VectorStore:
             use_cosine (bool): Whether to use cosine similarity (default True).
             index_path (str): Path to save/load the FAISS index.
             meta_path (str): Path to save/load the metadata.
+            sentence_path (str): Path to save/load per-sentence embeddings (float16 side array).
+            lexical_path (str): Path to save/load the BM25 inverted index over chunk texts.
+            manifest_path (str): Path of the versioned manifest shared with other processes
+                (default: next to index_path).
         """
         self.dim = dim
         self.use_cosine = use_cosine
         self.index_path = index_path
         self.meta_path = meta_path
+        self.sentence_path = sentence_path
 
         self.index = faiss.IndexFlatIP(dim) if use_cosine else faiss.IndexFlatL2(dim)
         self.metadata: List[Dict] = []
+        # Optional per-sentence vectors; chunk metadata points into it via "sentence_row"
+        self.sentence_embeddings: Optional[np.ndarray] = None
+        # BM25 inverted index over the same rows, for keyword and hybrid search
+        self.lexical = LexicalIndex(lexical_path)
+        # Bumped whenever the index contents change; used to tag cached query results.
+        # Once the files have a manifest it is the manifest's version, the same in every process.
+        self.version = 0
+        self.manifest = IndexManifest(manifest_path or os.path.splitext(index_path)[0] + ".manifest.json")
+        # Changes on reset(), so readers know a snapshot is not an append to theirs
+        self.epoch: Optional[str] = None
+        # Bumped when the index is replaced by one that does not extend the previous (load,
+        # reset). Appends keep it, so derived indexes (two-stage candidates) can extend theirs.
+        self.rebuilds = 0
+        self.reloads = 0
+        self._manifest_signature = None
 
         self._load()
 
@@ -34,8 +65,17 @@ class VectorStore:
         norms[norms == 0] = 1  # avoid division by zero
         return embeddings / norms
 
-    def add(self, embeddings: Union[np.ndarray, List], meta: List[Dict]):
-        """Add embeddings and associated metadata."""
+    def add(self, embeddings: Union[np.ndarray, List], meta: List[Dict],
+            sentence_embeddings: Optional[List[Optional[np.ndarray]]] = None):
+        """
+        Add embeddings and associated metadata.
+
+        Args:
+            embeddings (np.ndarray or list): Chunk vectors.
+            meta (List[Dict]): Metadata per chunk.
+            sentence_embeddings (list): Optional per-chunk arrays of sentence vectors,
+                aligned with each chunk's "sentences" offsets.
+        """
         embeddings = np.array(embeddings, dtype='float32')
         if embeddings.ndim == 1:
             embeddings = embeddings.reshape(1, -1)
@@ -48,18 +88,54 @@ class VectorStore:
         if self.use_cosine:
             embeddings = self._normalize(embeddings)
 
+        with self.manifest.locked():
+            # Catch up with other processes' writes first, so saving does not overwrite them
+            self.refresh()
+            if sentence_embeddings is not None:
+                self._add_sentence_embeddings(sentence_embeddings, meta)
+
+            self._index_vectors(embeddings, meta)
+            self.metadata.extend(meta)
+            self.lexical.add([item.get("text", "") for item in meta])
+            self.version += 1
+            INDEX_VECTORS.set(self.index.ntotal)
+            self._save()
+            self._publish()
+
+    def _index_vectors(self, embeddings: np.ndarray, meta: List[Dict]):
+        """Append prepared vectors; ids continue from the current total."""
         self.index.add(embeddings)
-        self.metadata.extend(meta)
-        self._save()
+
+    def _add_sentence_embeddings(self, sentence_embeddings: List[Optional[np.ndarray]], meta: List[Dict]):
+        """Append sentence vectors to the side array and record each chunk's first row."""
+        if len(sentence_embeddings) != len(meta):
+            raise ValueError("Sentence embeddings and metadata count mismatch.")
+        blocks = []
+        next_row = 0 if self.sentence_embeddings is None else len(self.sentence_embeddings)
+        for vectors, item in zip(sentence_embeddings, meta):
+            if vectors is None or len(vectors) == 0:
+                continue
+            vectors = self._normalize(np.array(vectors, dtype='float32').reshape(-1, self.dim))
+            item["sentence_row"] = next_row
+            next_row += len(vectors)
+            blocks.append(vectors.astype('float16'))
+        if blocks:
+            existing = [] if self.sentence_embeddings is None else [self.sentence_embeddings]
+            self.sentence_embeddings = np.vstack(existing + blocks)
 
     def add_documents(self, docs: List[Dict]):
         """
         Add a list of documents. Each must have an 'embedding' and 'text'.
         """
         embeddings = [doc["embedding"] for doc in docs]
-        meta = [{"text": doc["text"], "url": doc.get("url", "")} for doc in docs]
+        meta = []
+        for doc in docs:
+            item = {"text": doc["text"], "url": doc.get("url", "")}
+            if "sentences" in doc:
+                item["sentences"] = doc["sentences"]
+            meta.append(item)
         self.add(embeddings, meta)
-        print(f"✅ Added {len(embeddings)} documents. Total in index: {self.index.ntotal}")
+        log.info("✅ Added documents", extra={"added": len(embeddings), "total": self.index.ntotal})
 
     def search(self, query_embedding: Union[np.ndarray, List], top_k: int = 5, min_score: Optional[float] = None) -> List[Dict]:
         """
@@ -73,11 +149,77 @@ class VectorStore:
         Returns:
             List[Dict]: Search results with scores and metadata.
         """
-        print("🔍 Searching FAISS index...")
         if self.index.ntotal == 0:
-            print("⚠️ No documents in index.")
+            log.warning("⚠️ No documents in index.")
+            return []
+
+        query_embedding = self.prepare_query(query_embedding)
+
+        with timed("search"):
+            scores, indices = self.index.search(query_embedding, top_k)
+
+        results = self.build_results(indices[0], scores[0], min_score)
+        log.debug("📌 Retrieved results", extra={"results": len(results), "top_k": top_k})
+        return results
+
+    def range_search(self, query_embedding: Union[np.ndarray, List], min_score: float,
+                     max_results: Optional[int] = None) -> List[Dict]:
+        """
+        Return every vector scoring at least min_score, best first.
+
+        Unlike search(top_k) followed by a filter, FAISS only materializes hits
+        above the threshold, so low-relevance queries come back empty without
+        any metadata copies. Hits are cut off at max_results.
+
+        Args:
+            query_embedding (np.ndarray or list): Query vector.
+            min_score (float): Minimum cosine similarity to keep.
+            max_results (int): Optional cap on the number of hits returned.
+
+        Returns:
+            List[Dict]: Search results with scores and metadata.
+        """
+        if self.index.ntotal == 0:
+            log.warning("⚠️ No documents in index.")
             return []
 
+        if not self.use_cosine:
+            # L2 range search is radius-based; keep the existing score filter semantics
+            return self.search(query_embedding, top_k=max_results or self.index.ntotal, min_score=min_score)
+
+        query_embedding = self.prepare_query(query_embedding)
+
+        with timed("search"):
+            # FAISS keeps scores strictly above the radius; step down one ulp so min_score is inclusive
+            radius = float(np.nextafter(np.float32(min_score), np.float32(-np.inf)))
+            lims, scores, indices = self.index.range_search(query_embedding, radius)
+            scores, indices = scores[lims[0]:lims[1]], indices[lims[0]:lims[1]]
+            if max_results is not None and len(scores) > max_results:
+                keep = np.argpartition(-scores, max_results - 1)[:max_results]
+                scores, indices = scores[keep], indices[keep]
+            order = np.argsort(-scores, kind="stable")
+
+        results = self.build_results(indices[order], scores[order])
+        log.debug("📌 Range search results", extra={"results": len(results), "min_score": min_score})
+        return results
+
+    def lexical_search(self, query: str, top_k: int = 5) -> List[Dict]:
+        """
+        BM25 keyword search over chunk texts; no embedding needed.
+
+        Args:
+            query (str): Query text.
+            top_k (int): Number of top results to return.
+
+        Returns:
+            List[Dict]: Results with metadata, "score" holding the BM25 score.
+        """
+        with timed("search_lexical"):
+            indices, scores = self.lexical.search(query, top_k)
+        return self.build_results(indices, scores)
+
+    def prepare_query(self, query_embedding: Union[np.ndarray, List]) -> np.ndarray:
+        """Reshape to (1, dim), check the dimension and normalize for cosine search."""
         query_embedding = np.array(query_embedding, dtype='float32').reshape(1, -1)
 
         if query_embedding.shape[1] != self.dim:
@@ -85,18 +227,18 @@ class VectorStore:
 
         if self.use_cosine:
             query_embedding = self._normalize(query_embedding)
+        return query_embedding
 
-        scores, indices = self.index.search(query_embedding, top_k)
-
+    def build_results(self, indices, scores, min_score: Optional[float] = None) -> List[Dict]:
+        """Attach metadata and scores to FAISS ids, skipping padding ids and low scores."""
         results = []
-        for score, idx in zip(scores[0], indices[0]):
+        for score, idx in zip(scores, indices):
             if 0 <= idx < len(self.metadata):
                 if min_score is None or score >= min_score:
                     result = self.metadata[idx].copy()
+                    result["id"] = int(idx)
                     result["score"] = float(score)
                     results.append(result)
-
-        print(f"📌 Retrieved {len(results)} results.")
         return results
 
     def search_to_csv(self, query_embedding: Union[np.ndarray, List], path: str, top_k: int = 5):
@@ -108,56 +250,198 @@ class VectorStore:
             path (str): Path to save the CSV file.
             top_k (int): Number of top results.
         """
-        results = self.search(query_embedding, top_k=top_k)
-        df = pd.DataFrame(results)
-        df.to_csv(path, index=False)
-        print(f"📄 Results saved to: {path}")
+        self.results_to_csv(self.search(query_embedding, top_k=top_k), path)
+
+    def results_to_csv(self, results: List[Dict], path: str):
+        """Save already retrieved results to a CSV."""
+        write_export(results, path, "csv")
 
     def _save(self):
         """Save FAISS index and metadata to disk."""
-        # Create parent directory for index_path, if any
-        index_dir = os.path.dirname(self.index_path)
-        if index_dir:
-            os.makedirs(index_dir, exist_ok=True)
+        with timed("persist"):
+            # Create parent directory for index_path, if any
+            index_dir = os.path.dirname(self.index_path)
+            if index_dir:
+                os.makedirs(index_dir, exist_ok=True)
+
+            # Create parent directory for meta_path, if any
+            meta_dir = os.path.dirname(self.meta_path)
+            if meta_dir:
+                os.makedirs(meta_dir, exist_ok=True)
 
-        # Create parent directory for meta_path, if any
-        meta_dir = os.path.dirname(self.meta_path)
-        if meta_dir:
-            os.makedirs(meta_dir, exist_ok=True)
+            faiss.write_index(self.index, self.index_path)
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+            if self.sentence_embeddings is not None:
+                with open(self.sentence_path, "wb") as f:
+                    np.save(f, self.sentence_embeddings)
+            self.lexical.save()
 
-        faiss.write_index(self.index, self.index_path)
-        with open(self.meta_path, "w", encoding="utf-8") as f:
-            json.dump(self.metadata, f, ensure_ascii=False, indent=2)
 
+    def _empty_index(self) -> faiss.Index:
+        return faiss.IndexFlatIP(self.dim) if self.use_cosine else faiss.IndexFlatL2(self.dim)
 
     def _load(self):
         """Load FAISS index and metadata from disk."""
+        with self.manifest.locked(exclusive=False):
+            signature, manifest = self.manifest.signature(), self.manifest.read()
+            self._read_files()
+        self._adopt_manifest(manifest, signature)
+
+    def _read_files(self):
+        """Read every file, then swap the new snapshot in."""
+        index = self._empty_index()
+        metadata: List[Dict] = []
+        sentence_embeddings = None
         if os.path.exists(self.index_path):
-            self.index = faiss.read_index(self.index_path)
-            print(f"📥 Loaded FAISS index from {self.index_path}")
+            index = faiss.read_index(self.index_path)
+            log.info("📥 Loaded FAISS index", extra={"path": self.index_path, "vectors": index.ntotal})
         if os.path.exists(self.meta_path):
             with open(self.meta_path, "r", encoding="utf-8") as f:
-                self.metadata = json.load(f)
-            print(f"📥 Loaded metadata from {self.meta_path}")
+                metadata = json.load(f)
+            log.info("📥 Loaded metadata", extra={"path": self.meta_path})
+        if os.path.exists(self.sentence_path):
+            sentence_embeddings = np.load(self.sentence_path)
+            log.info("📥 Loaded sentence embeddings",
+                     extra={"path": self.sentence_path, "rows": len(sentence_embeddings)})
+        lexical = LexicalIndex(self.lexical.path)
+        if not lexical.load() or len(lexical) != len(metadata):
+            # Stores saved before the lexical index existed (or out of sync) are re-indexed from metadata
+            lexical.reset()
+            lexical.add([item.get("text", "") for item in metadata])
+
+        # Metadata first and the index last, so a concurrent search never sees ids past the metadata
+        self.metadata = metadata
+        self.sentence_embeddings = sentence_embeddings
+        self.lexical = lexical
+        self.index = index
+        self.rebuilds += 1
+        self.version += 1
+        INDEX_VECTORS.set(self.index.ntotal)
+
+    def refresh(self) -> bool:
+        """
+        Catch up with changes other processes published to the manifest;
+        one stat() when nothing changed. Appends only the new rows when the
+        files just grew, otherwise reloads everything. Returns True when the
+        store changed.
+        """
+        signature = self.manifest.signature()
+        if signature is None or signature == self._manifest_signature:
+            return False
+        with self.manifest.locked(exclusive=False):
+            signature, manifest = self.manifest.signature(), self.manifest.read()
+            if manifest is None or (manifest.get("version") == self.version and manifest.get("epoch") == self.epoch):
+                self._manifest_signature = signature
+                return False
+            before = self.index.ntotal
+            incremental = manifest.get("epoch") == self.epoch and self._read_changes(manifest)
+            if not incremental:
+                self._read_files()
+        self._adopt_manifest(manifest, signature)
+        self.reloads += 1
+        log.info("🔄 Reloaded index from manifest", extra={
+            "path": self.manifest.path, "version": self.version, "vectors": self.index.ntotal,
+            "added": self.index.ntotal - before, "incremental": incremental})
+        return True
+
+    def _read_changes(self, manifest: Dict) -> bool:
+        """Append the rows another process added; False when the change is not a pure append."""
+        start, total = self.index.ntotal, manifest.get("vectors", 0)
+        if total < start or start != len(self.metadata):
+            return False
+        rows = read_flat_rows(self.index_path, start, self.dim)
+        if rows is None or len(rows) != total - start:
+            return False
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            added = json.load(f)[start:total]
+        if len(added) != len(rows):
+            return False
+        if manifest.get("sentences", 0) != (0 if self.sentence_embeddings is None else len(self.sentence_embeddings)):
+            self.sentence_embeddings = np.load(self.sentence_path) if os.path.exists(self.sentence_path) else None
+        # This runs on the watcher thread while searches use the live index, which add()
+        # could reallocate under them: grow a copy and swap it in like _read_files, metadata
+        # first and the index last. The copy extends the old one, so rebuilds is unchanged.
+        index = faiss.clone_index(self.index)
+        index.add(rows)
+        self.metadata = self.metadata + added
+        self.lexical.add([item.get("text", "") for item in added])
+        self.index = index
+        INDEX_VECTORS.set(self.index.ntotal)
+        return True
+
+    def _manifest_fields(self) -> Dict:
+        """Extra manifest fields describing this store's files."""
+        rows = 0 if self.sentence_embeddings is None else len(self.sentence_embeddings)
+        return {"sentences": rows}
+
+    def _publish(self):
+        """Write the manifest with a bumped version; called with the manifest lock held."""
+        current = self.manifest.read() or {}
+        self.version = max(self.version, current.get("version", 0) + 1)
+        if self.epoch is None:
+            self.epoch = current.get("epoch") or uuid.uuid4().hex
+        self.manifest.write(manifest_record(self.version, self.epoch, self.index.ntotal, **self._manifest_fields()))
+        self._manifest_signature = self.manifest.signature()
+
+    def _adopt_manifest(self, manifest: Optional[Dict], signature):
+        """Take the shared version and epoch of the snapshot just read."""
+        self._manifest_signature = signature
+        if manifest is not None:
+            self.version = manifest["version"]
+            self.epoch = manifest.get("epoch")
 
     def reset(self):
         """Reset the index and metadata, and delete associated files."""
-        self.index = faiss.IndexFlatIP(self.dim) if self.use_cosine else faiss.IndexFlatL2(self.dim)
-        self.metadata = []
-        if os.path.exists(self.index_path):
-            os.remove(self.index_path)
-        if os.path.exists(self.meta_path):
-            os.remove(self.meta_path)
-        print("🧹 Vector store reset completed.")
+        with self.manifest.locked():
+            self.metadata = []
+            self.index = self._empty_index()
+            self.rebuilds += 1
+            self.sentence_embeddings = None
+            self.lexical.reset()
+            self.version += 1
+            for path in (self.index_path, self.meta_path, self.sentence_path, self.lexical.path):
+                if os.path.exists(path):
+                    os.remove(path)
+            # A new epoch tells other processes to drop their copy rather than append to it
+            self.epoch = uuid.uuid4().hex
+            self._publish()
+        INDEX_VECTORS.set(0)
+        log.info("🧹 Vector store reset completed.")
+
+def open_store(directory: str, shard_directory: Optional[str] = None) -> VectorStore:
+    """
+    Open (or create) the store whose files live in `directory`. With
+    VECTOR_SHARDS > 1 it is a ShardedVectorStore in `shard_directory`
+    (default: `directory`/shards) that imports the flat files once.
+    """
+    if config.VECTOR_SHARDS > 1:
+        from app.sharded_store import ShardedVectorStore
+        return ShardedVectorStore(
+            dim=384, use_cosine=True,
+            num_shards=config.VECTOR_SHARDS,
+            shard_by=config.VECTOR_SHARD_BY,
+            directory=shard_directory or os.path.join(directory, "shards"),
+            import_index_path=os.path.join(directory, "index.faiss"),
+            import_meta_path=os.path.join(directory, "metadata.json"),
+        )
+    return VectorStore(
+        dim=384, use_cosine=True,
+        index_path=os.path.join(directory, "index.faiss"),
+        meta_path=os.path.join(directory, "metadata.json"),
+        sentence_path=os.path.join(directory, "sentence_embeddings.npy"),
+        lexical_path=os.path.join(directory, "lexical_index.npz"),
+    )
 
 # Singleton instance
 _vector_store_instance: Optional[VectorStore] = None
 
 def get_vector_store() -> VectorStore:
     """
-    Returns a singleton instance of VectorStore with predefined settings.
+    Returns a singleton instance of VectorStore over VECTOR_STORE_DIR
+    (a ShardedVectorStore when VECTOR_SHARDS > 1).
     """
     global _vector_store_instance
     if _vector_store_instance is None:
-        _vector_store_instance = VectorStore(dim=384, use_cosine=True)
+        _vector_store_instance = open_store(config.VECTOR_STORE_DIR, config.VECTOR_SHARD_DIR)
     return _vector_store_instance
@@ -0,0 +1,113 @@
+"""
+Concurrency benchmark for async handlers that run FAISS work inline vs
+awaiting it on the compute executor (app/executor.py).
+
+A mixed open-loop workload of slow "query" requests (a FAISS flat scan)
+and cheap "feedback" requests is driven through an in-process ASGI
+client. With inline FAISS calls every feedback post queues behind the
+scans on the event loop; with the executor it does not.
+
+Usage:
+    python benchmarks/bench_concurrency.py [--vectors 200000] [--requests 64]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import faiss
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import config
+from app.executor import configure_thread_budget, run_blocking, shutdown_compute_executor
+
+
+def build_app(index: faiss.Index, dim: int, offload: bool) -> FastAPI:
+    app = FastAPI()
+    rng = np.random.default_rng(0)
+
+    def search():
+        query = rng.random((1, dim), dtype=np.float32)
+        return index.search(query, 5)
+
+    @app.post("/api/query")
+    async def query():
+        if offload:
+            await run_blocking(search)
+        else:
+            search()
+        return {"ok": True}
+
+    @app.post("/api/feedback")
+    async def feedback():
+        return {"ok": True}
+
+    return app
+
+
+async def timed(client: httpx.AsyncClient, path: str, arrival: float, latencies: list):
+    # Latency is measured from the scheduled arrival, so time spent waiting
+    # for a blocked event loop to wake this request up is counted too.
+    await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+    response = await client.post(path)
+    response.raise_for_status()
+    latencies.append(time.perf_counter() - arrival)
+
+
+async def drive(app: FastAPI, requests: int, feedback_ratio: int, rate: float):
+    query_lat, feedback_lat = [], []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        tasks = []
+        start = time.perf_counter()
+        interval = 1.0 / rate
+        for i in range(requests * (feedback_ratio + 1)):
+            arrival = start + i * interval
+            if i % (feedback_ratio + 1) == 0:
+                tasks.append(timed(client, "/api/query", arrival, query_lat))
+            else:
+                tasks.append(timed(client, "/api/feedback", arrival, feedback_lat))
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - start
+    return wall, query_lat, feedback_lat
+
+
+def pct(values, q):
+    return float(np.percentile(np.asarray(values) * 1000, q))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--requests", type=int, default=64, help="Query requests to send")
+    parser.add_argument("--feedback-ratio", type=int, default=4, help="Feedback posts per query")
+    parser.add_argument("--rate", type=float, default=200.0, help="Open-loop arrivals per second (all endpoints)")
+    args = parser.parse_args()
+
+    threads = configure_thread_budget()
+    rng = np.random.default_rng(42)
+    index = faiss.IndexFlatIP(args.dim)
+    index.add(rng.random((args.vectors, args.dim), dtype=np.float32))
+    print(f"index={args.vectors}x{args.dim} workers={config.COMPUTE_WORKERS} threads/worker={threads}")
+
+    for label, offload in (("inline  ", False), ("executor", True)):
+        wall, query_lat, feedback_lat = asyncio.run(
+            drive(build_app(index, args.dim, offload), args.requests, args.feedback_ratio, args.rate)
+        )
+        print(
+            f"{label}: wall={wall:6.2f}s  "
+            f"query p50={pct(query_lat, 50):7.1f}ms p99={pct(query_lat, 99):7.1f}ms  "
+            f"feedback p50={pct(feedback_lat, 50):7.1f}ms p99={pct(feedback_lat, 99):7.1f}ms"
+        )
+    shutdown_compute_executor()
+
+
+if __name__ == "__main__":
+    main()
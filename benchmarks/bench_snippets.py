@@ -0,0 +1,116 @@
+"""
+Benchmark citation snippet selection: legacy difflib matching vs the
+vectorized BM25 scorer in app/snippets.py.
+
+Each synthetic hit hides one "answer" sentence containing every query term
+among distractor sentences that share at most one; quality is the fraction
+of hits whose snippet contains the answer.
+
+Usage:
+    python benchmarks/bench_snippets.py [--queries 200] [--top-k 10]
+"""
+import argparse
+import difflib
+import os
+import random
+import re
+import sys
+import time
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.snippets import highlight_snippets
+
+WORDS = (
+    "retrieval embedding vector index latency search model token query document "
+    "cluster shard cache graph platform scoring ranking context window memory "
+    "quantization recall precision throughput encoder decoder attention layer"
+).split()
+FILLER = "the of and a to in is for on with as by that this from".split()
+
+
+def legacy_highlight_snippet(doc_text, query, max_len=180):
+    sentences = re.split(r'(?<=[.!?]) +', doc_text.strip())
+    if not sentences:
+        return ""
+    best_match = max(
+        sentences,
+        key=lambda s: difflib.SequenceMatcher(None, s.lower(), query.lower()).ratio(),
+        default=""
+    )
+    snippet = best_match
+    try:
+        idx = sentences.index(best_match)
+        if len(best_match) < 50 and idx + 1 < len(sentences):
+            snippet += " " + sentences[idx + 1]
+    except ValueError:
+        pass
+    return snippet[:max_len].strip()
+
+
+def make_sentence(rng, words, length):
+    body = [rng.choice(words if rng.random() < 0.6 else FILLER) for _ in range(length)]
+    return " ".join(body).capitalize() + "."
+
+
+def make_answer(rng, query_words):
+    body = query_words + rng.sample(FILLER, rng.randint(4, 8))
+    rng.shuffle(body)
+    return " ".join(body).capitalize() + "."
+
+
+def make_case(rng, top_k, sentences_per_doc):
+    query_words = rng.sample(WORDS, 4)
+    query = "what is " + " ".join(query_words)
+    # Distractors may share a single query term, the answer shares all of them
+    others = [w for w in WORDS if w not in query_words]
+    docs, answers = [], []
+    for _ in range(top_k):
+        sentences = [
+            make_sentence(rng, others + [rng.choice(query_words)], rng.randint(8, 20))
+            for _ in range(sentences_per_doc)
+        ]
+        answer = make_answer(rng, query_words)
+        sentences.insert(rng.randrange(len(sentences) + 1), answer)
+        docs.append(" ".join(sentences))
+        answers.append(answer[:40])
+    return query, docs, answers
+
+
+def run(cases, select):
+    correct = total = 0
+    start = time.perf_counter()
+    for query, docs, answers in cases:
+        snippets = select(docs, query)
+        for snippet, answer in zip(snippets, answers):
+            total += 1
+            correct += answer in snippet
+    elapsed = time.perf_counter() - start
+    return elapsed, correct / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--sentences", type=int, default=20, help="Sentences per hit")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = [make_case(rng, args.top_k, args.sentences) for _ in range(args.queries)]
+
+    legacy_time, legacy_quality = run(
+        cases, lambda docs, query: [legacy_highlight_snippet(d, query) for d in docs]
+    )
+    new_time, new_quality = run(cases, highlight_snippets)
+
+    print(f"queries={args.queries} top_k={args.top_k} sentences/hit={args.sentences + 1}")
+    print(f"difflib : {legacy_time * 1000 / args.queries:8.3f} ms/query  quality={legacy_quality:.3f}")
+    print(f"bm25    : {new_time * 1000 / args.queries:8.3f} ms/query  quality={new_quality:.3f}")
+    print(f"speed-up: {legacy_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Reproducible benchmark suite over synthetic corpora.
+
+Covers TextChunker.chunk, embedding batch throughput, VectorStore
+add/_save/_load/search at several corpus sizes, and /api/query end to end
+through TestClient. Everything is seeded; by default texts are embedded
+with the deterministic hash embedder in benchmarks/fake_embedder.py so no
+model is needed (pass --real-embedder to time sentence-transformers).
+
+Results are written as JSON. With --baseline, every metric is compared to
+a stored run and the exit status is 1 when any regressed by more than
+--tolerance (relative); --update-baseline stores this run as the baseline.
+Only compare runs from the same machine and embedder.
+
+Usage:
+    python benchmarks/bench_suite.py [--only chunk,embed,store,endpoint] [--sizes 10000,100000,1000000]
+                                     [--output results.json] [--baseline baseline.json [--update-baseline]]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_embedder import install as install_fake_embedder
+
+BENCHMARKS = ("chunk", "embed", "store", "endpoint")
+DIM = 384
+SEED = 42
+
+
+def synthetic_words(rng: np.random.Generator, vocab_size: int = 5000):
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    return ["".join(rng.choice(letters, size=rng.integers(3, 10))) for _ in range(vocab_size)]
+
+
+def synthetic_docs(rng: np.random.Generator, vocab, count: int, words: int):
+    """Documents of `words` Zipf-distributed words in sentences of 8-20 words."""
+    docs = []
+    for _ in range(count):
+        ids = np.minimum(rng.zipf(1.3, size=words), len(vocab)) - 1
+        tokens = [vocab[i] for i in ids]
+        sentences, start = [], 0
+        while start < len(tokens):
+            end = start + int(rng.integers(8, 21))
+            sentences.append(" ".join(tokens[start:end]).capitalize() + ".")
+            start = end
+        docs.append(" ".join(sentences))
+    return docs
+
+
+class Results:
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name: str, value: float, unit: str, better: str):
+        self.metrics[name] = {"value": round(float(value), 4), "unit": unit, "better": better}
+        print(f"  {name:<40} {value:>14.3f} {unit}")
+
+
+def latency_metrics(results: Results, prefix: str, latencies_ms):
+    values = np.asarray(latencies_ms)
+    results.add(f"{prefix}.p50_ms", np.percentile(values, 50), "ms", "lower")
+    results.add(f"{prefix}.p99_ms", np.percentile(values, 99), "ms", "lower")
+    results.add(f"{prefix}.qps", len(values) / (values.sum() / 1000), "req/s", "higher")
+
+
+def bench_chunk(results: Results, rng, vocab, docs: int):
+    from app.TextChunker import TextChunker
+
+    print("chunk")
+    texts = synthetic_docs(rng, vocab, docs, 2000)
+    chunker = TextChunker(max_words=500, overlap=50)
+    start = time.perf_counter()
+    for text in texts:
+        chunker.chunk(text)
+    elapsed = time.perf_counter() - start
+    results.add("chunk.ms_per_doc", elapsed * 1000 / docs, "ms", "lower")
+    results.add("chunk.words_per_s", docs * 2000 / elapsed, "words/s", "higher")
+
+
+def bench_embed(results: Results, rng, vocab, encode, texts: int):
+    print("embed")
+    sentences = [s for doc in synthetic_docs(rng, vocab, texts // 10 + 1, 150) for s in doc.split(". ")][:texts]
+    encode(sentences[:8])  # warm up
+    for batch in (1, 32, 128):
+        start = time.perf_counter()
+        for i in range(0, len(sentences), batch):
+            encode(sentences[i:i + batch])
+        results.add(f"embed.batch_{batch}.texts_per_s", len(sentences) / (time.perf_counter() - start),
+                    "texts/s", "higher")
+
+
+def bench_store(results: Results, rng, vocab, size: int, queries: int):
+    from app.vector_store import VectorStore
+
+    print(f"store @ {size}")
+    vectors = rng.standard_normal((size, DIM), dtype=np.float32)
+    meta = [{"text": f"{vocab[i % len(vocab)]} {vocab[(i * 7) % len(vocab)]}", "url": f"doc-{i}"}
+            for i in range(size)]
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {name: os.path.join(tmp, file) for name, file in (
+            ("index_path", "index.faiss"), ("meta_path", "metadata.json"),
+            ("sentence_path", "sentences.npy"), ("lexical_path", "lexical.npz"))}
+        store = VectorStore(DIM, **paths)
+        start = time.perf_counter()
+        store.add(vectors, meta)  # normalizes, indexes and saves once
+        results.add(f"store.{size}.add_ms", (time.perf_counter() - start) * 1000, "ms", "lower")
+
+        start = time.perf_counter()
+        store._save()
+        results.add(f"store.{size}.save_ms", (time.perf_counter() - start) * 1000, "ms", "lower")
+
+        start = time.perf_counter()
+        store = VectorStore(DIM, **paths)  # __init__ runs _load
+        results.add(f"store.{size}.load_ms", (time.perf_counter() - start) * 1000, "ms", "lower")
+
+        query_vectors = rng.standard_normal((queries, DIM), dtype=np.float32)
+        store.search(query_vectors[0], top_k=5)
+        latencies = []
+        for query in query_vectors:
+            start = time.perf_counter()
+            store.search(query, top_k=5)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latency_metrics(results, f"store.{size}.search", latencies)
+    del vectors, meta, store
+
+
+def bench_endpoint(results: Results, rng, vocab, size: int, requests: int):
+    from fastapi.testclient import TestClient
+    from app import config, vector_store as vector_store_module
+    from app.embedder import get_embedding_local
+    from app.vector_store import VectorStore
+    from app.main import app
+
+    print(f"endpoint /api/query @ {size}")
+    # Measure the uncached pipeline and keep the run free of side effects
+    config.QUERY_CACHE_ENABLED = False
+    config.SEMANTIC_CACHE_ENABLED = False
+    config.REQUEST_TRACE_ENABLED = False
+
+    texts = synthetic_docs(rng, vocab, size, 60)
+    # Opening words of indexed chunks, so most queries clear the score threshold
+    queries = [" ".join(text.split()[:15]).rstrip(".") for text in texts[:requests]]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(DIM, index_path=os.path.join(tmp, "index.faiss"),
+                            meta_path=os.path.join(tmp, "metadata.json"),
+                            sentence_path=os.path.join(tmp, "sentences.npy"),
+                            lexical_path=os.path.join(tmp, "lexical.npz"))
+        embeddings = np.vstack([get_embedding_local(texts[i:i + 256]) for i in range(0, size, 256)])
+        store.add(embeddings, [{"text": text, "url": f"doc-{i}"} for i, text in enumerate(texts)])
+        vector_store_module._vector_store_instance = store
+
+        with TestClient(app) as client:
+            client.post("/api/query", json={"query": queries[0]}).raise_for_status()
+            for mode in ("dense", "hybrid"):
+                latencies = []
+                for query in queries:
+                    start = time.perf_counter()
+                    client.post("/api/query", json={"query": query, "mode": mode}).raise_for_status()
+                    latencies.append((time.perf_counter() - start) * 1000)
+                latency_metrics(results, f"endpoint.query_{mode}", latencies)
+
+
+def compare(current: dict, baseline: dict, tolerance: float):
+    """Metrics that got worse than the baseline by more than `tolerance` (relative)."""
+    regressions = []
+    for name, metric in current["metrics"].items():
+        base = baseline.get("metrics", {}).get(name)
+        if base is None or not base["value"]:
+            continue
+        change = (metric["value"] - base["value"]) / base["value"]
+        worse = change > tolerance if metric["better"] == "lower" else change < -tolerance
+        if worse:
+            regressions.append((name, base["value"], metric["value"], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="Comma-separated subset of " + ", ".join(BENCHMARKS))
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Vector counts for the store benchmark")
+    parser.add_argument("--queries", type=int, default=200, help="Searches / requests per measurement")
+    parser.add_argument("--endpoint-size", type=int, default=10000, help="Chunks indexed for the endpoint benchmark")
+    parser.add_argument("--real-embedder", action="store_true", help="Use sentence-transformers instead of the hash embedder")
+    parser.add_argument("--output", default=None, help="Results JSON (default: outputs/benchmarks/bench-<time>.json)")
+    parser.add_argument("--baseline", default=None, help="Baseline results JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before flagging")
+    args = parser.parse_args()
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    if not args.real_embedder:
+        install_fake_embedder(DIM)
+    from app.embedder import get_embedding_local
+
+    rng = np.random.default_rng(SEED)
+    vocab = synthetic_words(rng)
+    results = Results()
+    if "chunk" in selected:
+        bench_chunk(results, np.random.default_rng(SEED + 1), vocab, docs=200)
+    if "embed" in selected:
+        bench_embed(results, np.random.default_rng(SEED + 2), vocab, get_embedding_local,
+                    texts=512 if args.real_embedder else 5000)
+    if "store" in selected:
+        for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+            bench_store(results, np.random.default_rng(SEED + 3), vocab, size, args.queries)
+    if "endpoint" in selected:
+        bench_endpoint(results, np.random.default_rng(SEED + 4), vocab, args.endpoint_size, args.queries)
+
+    run = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "embedder": "sentence-transformers" if args.real_embedder else "hash",
+            "seed": SEED,
+            "dim": DIM,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+            "faiss": getattr(faiss, "__version__", "unknown"),
+        },
+        "metrics": results.metrics,
+    }
+    output = args.output or os.path.join("outputs", "benchmarks", f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"results written to {output}")
+
+    if not args.baseline:
+        return
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"baseline updated: {args.baseline}")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("meta", {}).get("embedder") != run["meta"]["embedder"]:
+        print("⚠️ baseline was recorded with a different embedder; embed/endpoint numbers are not comparable")
+    regressions = compare(run, baseline, args.tolerance)
+    for name, before, after, change in regressions:
+        print(f"REGRESSION {name}: {before} -> {after} ({change:+.1%})")
+    if regressions:
+        sys.exit(1)
+    print(f"no regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
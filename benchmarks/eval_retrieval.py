@@ -0,0 +1,90 @@
+"""
+Retrieval quality and latency evaluation by traffic replay (app/evaluation.py).
+
+Replays logged queries (request traces and the feedback log by default,
+or a supplied query set) against the live vector store under one or more
+configurations. Each is scored with recall@k against exact flat-index
+ground truth, latency percentiles and QPS; the first configuration is the
+baseline the others are compared with.
+
+Configurations are JSON objects (inline or a path to a .json file):
+    {"name": "cutoff-0.6", "mode": "dense", "score_threshold": 0.6}
+    {"name": "sq8", "mode": "two_stage", "index": "SQ8", "candidates": 100}
+Modes: dense, lexical, hybrid, two_stage. Without --config, the current
+QUERY_SCORE_THRESHOLD is compared against no cut-off.
+
+Usage:
+    python benchmarks/eval_retrieval.py [--queries FILE ...] [--config JSON ...] [--top-k 5] [--output report.json]
+"""
+import argparse
+import json
+import os
+import sys
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import config
+from app.evaluation import COMPARED_METRICS, load_queries, run_evaluation
+from app.vector_store import get_vector_store
+
+
+def parse_config(value: str) -> dict:
+    if os.path.exists(value):
+        with open(value) as f:
+            return json.load(f)
+    return json.loads(value)
+
+
+def print_table(report: dict):
+    names = [c["name"] for c in report["configs"]]
+    width = max([len("metric")] + [len(m) for m in COMPARED_METRICS])
+    col = max([12] + [len(n) + 2 for n in names])
+    print(f"queries={report['queries']} top_k={report['top_k']} vectors={report['vectors']} "
+          f"embed={report['embed_ms_per_query']}ms/query")
+    print("metric".ljust(width) + "".join(n.rjust(col) for n in names))
+    for metric in COMPARED_METRICS:
+        row = []
+        for c in report["configs"]:
+            value = c
+            for part in metric.split("."):
+                value = value[part]
+            row.append(f"{value:.4f}".rjust(col))
+        print(metric.ljust(width) + "".join(row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", action="append",
+                        help="Query source: .jsonl/.jsonl.gz with query or user_input, or one query per line "
+                             "(repeatable; default: request traces and the feedback log)")
+    parser.add_argument("--config", action="append", type=parse_config,
+                        help="Configuration as inline JSON or a .json file (repeatable; first is the baseline)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=None, help="Maximum distinct queries to replay")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed queries per configuration")
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout table only)")
+    args = parser.parse_args()
+
+    sources = args.queries or [config.REQUEST_TRACE_PATH, config.FEEDBACK_LOG_PATH]
+    queries = load_queries(sources, limit=args.limit)
+    if not queries:
+        sys.exit(f"No queries found in {', '.join(sources)}")
+    configs = args.config or [
+        {"name": f"threshold-{config.QUERY_SCORE_THRESHOLD}", "mode": "dense",
+         "score_threshold": config.QUERY_SCORE_THRESHOLD},
+        {"name": "no-threshold", "mode": "dense", "score_threshold": None},
+    ]
+
+    from app.embedder import get_embedding_local
+    report = run_evaluation(get_vector_store(), queries, get_embedding_local, configs,
+                            top_k=args.top_k, warmup=args.warmup)
+    print_table(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
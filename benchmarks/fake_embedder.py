@@ -0,0 +1,61 @@
+"""
+Deterministic, model-free stand-in for app/embedder.py.
+
+Texts are embedded by feature hashing: every lowercased token adds a
+signed unit to one of `dim` buckets and the sum is L2-normalized, so
+texts sharing words get similar vectors and identical texts always get
+identical ones, on any machine. It is orders of magnitude faster than
+the sentence-transformers model and needs no download, which makes
+benchmarks and API tests reproducible; it says nothing about embedding
+quality or model throughput.
+
+Call install() before anything imports app.embedder (i.e. before
+importing app.main or the api routers).
+"""
+import re
+import sys
+import types
+import zlib
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+class HashEmbedder:
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in TOKEN_RE.findall(text.lower()):
+            h = zlib.crc32(token.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if (h >> 16) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts, batch_size: int = 32) -> np.ndarray:
+        """Same shapes as SentenceTransformer.encode: (dim,) for a string, (n, dim) for a list."""
+        if isinstance(texts, str):
+            return self._embed_one(texts)
+        if not len(texts):
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.stack([self._embed_one(text) for text in texts])
+
+
+def install(dim: int = 384) -> HashEmbedder:
+    """Register a hash-embedder `app.embedder` module with the same functions as the real one."""
+    embedder = HashEmbedder(dim)
+    module = types.ModuleType("app.embedder")
+    module.model = embedder
+    module.get_embedding_local = embedder.encode
+
+    def get_sentence_embeddings(text, offsets):
+        sentences = [text[start:end] for start, end in offsets]
+        return embedder.encode(sentences) if sentences else None
+
+    module.get_sentence_embeddings = get_sentence_embeddings
+    sys.modules["app.embedder"] = module
+    import app
+    app.embedder = module
+    return embedder
@@ -0,0 +1,98 @@
+"""
+Local stand-in for scrape targets: serves canned HTML pages so indexing
+can be exercised offline.
+
+GET /page/<n>.html returns a deterministic article (seeded by n) wrapped
+in the nav/header/script/footer boilerplate the scraper strips, so every
+page is distinct and the same URL always yields the same text. Any other
+path is a 404.
+
+Usage:
+    python benchmarks/html_server.py [--port 8765] [--paragraphs 8]
+"""
+import argparse
+import html
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_suite import synthetic_docs, synthetic_words
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>{title}</title><style>body {{ font-family: sans-serif; }}</style></head>
+<body>
+<header><a href="/">Home</a></header>
+<nav><ul><li><a href="/page/0.html">First</a></li><li><a href="/page/1.html">Second</a></li></ul></nav>
+<main><h1>{title}</h1>
+{paragraphs}
+</main>
+<script>console.log("analytics");</script>
+<footer>Canned page {n}</footer>
+</body></html>
+"""
+
+
+class PageRenderer:
+    def __init__(self, paragraphs: int = 8, seed: int = 7):
+        self.paragraphs = paragraphs
+        self.vocab = synthetic_words(np.random.default_rng(seed))
+
+    def render(self, n: int) -> bytes:
+        rng = np.random.default_rng(n)
+        docs = synthetic_docs(rng, self.vocab, self.paragraphs, 120)
+        title = " ".join(docs[0].split()[:5]).rstrip(".")
+        body = "\n".join(f"<p>{html.escape(doc)}</p>" for doc in docs)
+        return PAGE.format(title=html.escape(title), paragraphs=body, n=n).encode("utf-8")
+
+
+def make_handler(renderer: PageRenderer):
+    class PageHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            name = self.path.split("?", 1)[0]
+            if not (name.startswith("/page/") and name.endswith(".html") and name[6:-5].isdigit()):
+                self.send_error(404)
+                return
+            body = renderer.render(int(name[6:-5]))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return PageHandler
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, paragraphs: int = 8) -> ThreadingHTTPServer:
+    """Serve pages from a daemon thread; port 0 picks a free port (see server.server_address)."""
+    server = ThreadingHTTPServer((host, port), make_handler(PageRenderer(paragraphs)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="html-server", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--paragraphs", type=int, default=8, help="Paragraphs (of ~120 words) per page")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(PageRenderer(args.paragraphs)))
+    print(f"serving canned pages at http://{args.host}:{args.port}/page/<n>.html")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
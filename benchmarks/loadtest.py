@@ -0,0 +1,232 @@
+"""
+Open-loop load generator for a running service (e.g. `uvicorn app.main:app`).
+
+Requests arrive as a Poisson process at --rate per second for --duration
+seconds and are spread over /api/query, /api/v1/chat, /api/feedback and
+/api/v1/index by --mix weights. Latency is measured from each request's
+scheduled arrival, so queueing in the client or server counts. /api/v1/index
+posts pages from the bundled canned-HTML server (benchmarks/html_server.py),
+started on a free local port unless --pages-url points elsewhere; note that
+indexing grows the target's store. Every request carries the same credentials,
+so the target's per-client rate limit applies to the whole run: start it with
+RATE_LIMIT_RPS=0 to measure capacity, or keep it to see 429s and 503s shed load.
+
+The report lists, per endpoint: sent, ok, errors (by status), error rate,
+throughput and latency percentiles. It is printed and optionally saved as JSON.
+
+Usage:
+    python benchmarks/loadtest.py [--base-url http://127.0.0.1:8000] [--rate 20] [--duration 30]
+                                  [--mix query=70,chat=20,feedback=8,index=2] [--queries FILE]
+                                  [--api-key KEY] [--token JWT] [--output report.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.evaluation import latency_summary, load_queries
+
+ENDPOINTS = {
+    "query": "/api/query",
+    "chat": "/api/v1/chat",
+    "feedback": "/api/feedback",
+    "index": "/api/v1/index",
+}
+DEFAULT_MIX = "query=70,chat=20,feedback=8,index=2"
+SAMPLE_QUERIES = [
+    "What is ColBERT?",
+    "How does late interaction retrieval work?",
+    "What causes hallucinations in large language models?",
+    "How do vector databases index embeddings?",
+    "Compare dense and sparse retrieval",
+    "What is a GenAI platform?",
+    "How does approximate nearest neighbour search trade recall for speed?",
+    "Explain embedding search",
+]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}; expected one of {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("mix weights must not all be zero")
+    return mix
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, float], queries: List[str],
+                 pages_url: Optional[str] = None, api_key: Optional[str] = None,
+                 token: Optional[str] = None, seed: int = 0):
+        """
+        Args:
+            client (httpx.AsyncClient): Client bound to the service's base URL.
+            mix (Dict[str, float]): Relative weight of each endpoint in ENDPOINTS.
+            queries (List[str]): Questions sampled for /api/query and /api/v1/chat.
+            pages_url (str): Base URL of the canned-HTML server, for /api/v1/index.
+            api_key (str): X-API-Key for /api/v1/chat.
+            token (str): Bearer token for /api/v1/index.
+        """
+        self.client = client
+        self.names = list(mix)
+        self.weights = np.array([mix[name] for name in self.names]) / sum(mix.values())
+        self.queries = queries
+        self.pages_url = pages_url
+        self.api_key = api_key
+        self.token = token
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+        self.next_page = 0
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Counter] = defaultdict(Counter)
+
+    def _request(self, name: str):
+        query = self.rng.choice(self.queries)
+        if name == "query":
+            return {"json": {"query": query}}
+        if name == "chat":
+            return {"json": {"messages": [{"role": "user", "content": query}]},
+                    "headers": {"X-API-Key": self.api_key or ""}}
+        if name == "feedback":
+            return {"json": {"user_input": query, "bot_response": "load test", "rating": self.rng.randint(1, 5),
+                             "feedback": "load test"}}
+        page = self.next_page
+        self.next_page += 1
+        return {"json": {"url": [f"{self.pages_url}/page/{page}.html"]},
+                "headers": {"Authorization": f"Bearer {self.token or ''}"}}
+
+    async def _send(self, name: str, arrival: float):
+        await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+        try:
+            response = await self.client.post(ENDPOINTS[name], **self._request(name))
+            outcome = "ok" if response.status_code < 400 else str(response.status_code)
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        self.latencies[name].append((time.perf_counter() - arrival) * 1000)
+        self.outcomes[name][outcome] += 1
+
+    async def run(self, rate: float, duration: float) -> Dict:
+        """Send Poisson arrivals at `rate`/s for `duration` seconds and wait for every response."""
+        start = time.perf_counter()
+        tasks, arrival = [], start
+        while True:
+            arrival += self.np_rng.exponential(1.0 / rate)
+            if arrival - start > duration:
+                break
+            name = self.names[self.np_rng.choice(len(self.names), p=self.weights)]
+            tasks.append(asyncio.create_task(self._send(name, arrival)))
+        await asyncio.gather(*tasks)
+        return self.report(rate, duration, time.perf_counter() - start)
+
+    def report(self, rate: float, duration: float, wall: float) -> Dict:
+        endpoints = {}
+        for name in self.names:
+            outcomes = self.outcomes[name]
+            sent = sum(outcomes.values())
+            ok = outcomes.get("ok", 0)
+            endpoints[name] = {
+                "path": ENDPOINTS[name],
+                "sent": sent,
+                "ok": ok,
+                "errors": {k: v for k, v in outcomes.items() if k != "ok"},
+                "error_rate": round((sent - ok) / sent, 4) if sent else 0.0,
+                "throughput": round(ok / wall, 3) if wall else 0.0,
+                "latency_ms": latency_summary(self.latencies[name]),
+            }
+        sent = sum(e["sent"] for e in endpoints.values())
+        ok = sum(e["ok"] for e in endpoints.values())
+        return {
+            "rate": rate,
+            "duration": duration,
+            "wall": round(wall, 3),
+            "sent": sent,
+            "error_rate": round((sent - ok) / sent, 4) if sent else 0.0,
+            "throughput": round(ok / wall, 3) if wall else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def print_report(report: Dict):
+    print(f"rate={report['rate']}/s duration={report['duration']}s wall={report['wall']}s "
+          f"sent={report['sent']} throughput={report['throughput']}/s error_rate={report['error_rate']:.2%}")
+    print(f"{'endpoint':<10}{'sent':>7}{'ok':>7}{'err%':>8}{'rps':>9}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  errors")
+    for name, e in report["endpoints"].items():
+        lat = e["latency_ms"]
+        print(f"{name:<10}{e['sent']:>7}{e['ok']:>7}{e['error_rate']:>8.1%}{e['throughput']:>9.2f}"
+              f"{lat['p50']:>10.1f}{lat['p90']:>10.1f}{lat['p99']:>10.1f}{lat['max']:>10.1f}  {e['errors'] or ''}")
+
+
+def default_token() -> Optional[str]:
+    """Mint an index token with the service's SECRET_KEY, when it is available locally."""
+    if not os.getenv("SECRET_KEY"):
+        return None
+    from app.auth import create_token
+    return create_token("loadtest")
+
+
+async def main_async(args):
+    queries = load_queries(args.queries) if args.queries else SAMPLE_QUERIES
+    if not queries:
+        sys.exit(f"No queries found in {', '.join(args.queries)}")
+
+    server = None
+    pages_url = args.pages_url
+    if args.mix.get("index") and not pages_url:
+        from benchmarks.html_server import start_server
+        server = start_server()
+        host, port = server.server_address[:2]
+        pages_url = f"http://{host}:{port}"
+        print(f"canned pages at {pages_url}")
+
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    try:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+            test = LoadTest(client, args.mix, queries, pages_url=pages_url,
+                            api_key=args.api_key, token=args.token or default_token(), seed=args.seed)
+            return await test.run(args.rate, args.duration)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rate", type=float, default=20.0, help="Mean arrivals per second (all endpoints)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of arrivals")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Endpoint weights (default {DEFAULT_MIX})")
+    parser.add_argument("--queries", action="append", help="Query source (see app/evaluation.load_queries); repeatable")
+    parser.add_argument("--pages-url", default=None, help="Canned-HTML server to index from (default: start one)")
+    parser.add_argument("--api-key", default=os.getenv("SECRET_KEY"), help="X-API-Key for chat (default: $SECRET_KEY)")
+    parser.add_argument("--token", default=None, help="Bearer token for indexing (default: minted from $SECRET_KEY)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
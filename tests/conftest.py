@@ -0,0 +1,74 @@
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def tmp_store(tmp_path):
+    """
+    Factory for VectorStores persisted under tmp_path.
+
+    Args (of the returned callable):
+        dim (int): Embedding dimension.
+        vectors (np.ndarray): Optional rows to add straight away.
+        metadata (list): Metadata for `vectors` (default {"text": "doc <i>"}).
+        name (str): Subdirectory for the files; the same name reopens the same store.
+    """
+    from app.vector_store import VectorStore
+
+    def make(dim=384, vectors=None, metadata=None, name=""):
+        directory = tmp_path / name
+        directory.mkdir(parents=True, exist_ok=True)
+        store = VectorStore(
+            dim,
+            index_path=str(directory / "index.faiss"),
+            meta_path=str(directory / "metadata.json"),
+            sentence_path=str(directory / "sentences.npy"),
+            lexical_path=str(directory / "lexical.npz"),
+        )
+        if vectors is not None:
+            store.add(vectors, metadata if metadata is not None else [{"text": f"doc {i}"} for i in range(len(vectors))])
+        return store
+
+    return make
+
+
+@pytest.fixture
+def api_key():
+    return "test-api-key"
+
+
+@pytest.fixture
+def app_store(tmp_store):
+    """Store installed as the default collection for app_client; override to pre-fill it."""
+    return tmp_store()
+
+
+@pytest.fixture
+def asgi_app():
+    """The ASGI app app_client drives; override to wrap it (e.g. in optional middleware)."""
+    from benchmarks.fake_embedder import install as install_fake_embedder
+    install_fake_embedder()
+    from app.main import app
+    return app
+
+
+@pytest.fixture
+def app_client(asgi_app, app_store, api_key, monkeypatch):
+    """
+    TestClient over the app with the fake embedder, `api_key` as the API key,
+    request traces off and `app_store` as the default vector store.
+    """
+    from api import routes_auth
+    from app import config, vector_store as vector_store_module
+
+    monkeypatch.setattr(routes_auth, "API_KEY", api_key)
+    monkeypatch.setattr(config, "REQUEST_TRACE_ENABLED", False)
+    monkeypatch.setattr(vector_store_module, "_vector_store_instance", app_store)
+    with TestClient(asgi_app) as client:
+        yield client
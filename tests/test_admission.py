@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import admission, auth, config
+from app.admission import AdmissionGate, Overloaded, RateLimiter, TokenBucket
+from app.auth import VerificationCache, create_token, verify_token
+
+QUERY = {"query": "What is late interaction retrieval?"}
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=2, burst=2)
+    bucket.updated = 0.0
+    assert bucket.take(0.0) == 0 and bucket.take(0.0) == 0
+    assert bucket.take(0.0) == pytest.approx(0.5)
+    assert bucket.take(0.5) == 0
+    # Idle time never refills past the burst size
+    bucket.take(100.0)
+    bucket.take(100.0)
+    assert bucket.take(100.0) > 0
+
+
+def test_gate_hands_slots_to_waiters_and_sheds_overflow():
+    async def scenario():
+        gate = AdmissionGate("search", limit=1, max_queue=1, timeout=0.05)
+        await gate.acquire()
+        waiting = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as full:
+            await gate.acquire()
+        assert full.value.reason == "queue_full"
+
+        gate.release()
+        await waiting
+        assert gate.stats() == {"in_flight": 1, "waiting": 0, "limit": 1, "max_queue": 1}
+
+        with pytest.raises(Overloaded) as slow:
+            await gate.acquire()
+        assert slow.value.reason == "queue_timeout" and gate.stats()["waiting"] == 0
+        gate.release()
+        assert gate.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_verification_cache_skips_decode_until_expiry(monkeypatch):
+    monkeypatch.setattr(auth, "SECRET_KEY", "secret")
+    monkeypatch.setattr(config, "AUTH_CACHE_TTL", 60)
+    cache = VerificationCache(ttl=60, max_entries=2)
+    monkeypatch.setattr(auth, "_verification_cache", cache)
+
+    token = create_token("alice")
+    assert verify_token(token) == "alice" and verify_token(token) == "alice"
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+    # An entry is dropped once the token itself has expired
+    cache.put("expired", "bob", time.time() - 1)
+    assert cache.get("expired") is None
+    for name in ("c", "d", "e"):
+        cache.put(name, name, None)
+    assert cache.stats()["entries"] == 2 and cache.get(token) is None
+
+
+@pytest.fixture
+def client(app_client, monkeypatch):
+    monkeypatch.setattr(config, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(admission, "_rate_limiter", RateLimiter(rate=0.1, burst=2))
+    monkeypatch.setattr(admission, "_gates", {})
+    return app_client
+
+
+def test_rate_limit_is_per_client(client):
+    assert [client.post("/api/query", json=QUERY).status_code for _ in range(3)] == [200, 200, 429]
+    response = client.post("/api/query", json=QUERY)
+    assert response.status_code == 429 and response.headers["retry-after"] == "10"
+    # Another credential has its own bucket; unrelated routes are never limited
+    assert client.post("/api/query", json=QUERY, headers={"X-API-Key": "other"}).status_code == 200
+    assert client.get("/").status_code == 200
+
+
+def test_full_pool_is_shed_with_503(client, monkeypatch):
+    gate = AdmissionGate("search", limit=1, max_queue=0, timeout=1)
+    gate.in_flight = 1
+    monkeypatch.setitem(admission._gates, "search", gate)
+    response = client.post("/api/query", json=QUERY)
+    assert response.status_code == 503 and "overloaded" in response.json()["detail"]
+    assert response.headers["retry-after"] == "1"
+
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "admin")
+    stats = client.get("/admin/admission", headers={"X-Admin-Token": "admin"}).json()
+    assert stats["pools"]["search"] == {"in_flight": 1, "waiting": 0, "limit": 1, "max_queue": 0}
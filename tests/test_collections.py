@@ -0,0 +1,108 @@
+import os
+import sys
+
+import pytest
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_embedder import HashEmbedder
+from app import config, store_registry
+from app.store_registry import DEFAULT_COLLECTION, CollectionError, CollectionRegistry
+
+DIM = 384
+
+
+def fill(collection, texts, url):
+    collection.store.add(HashEmbedder().encode(texts), [{"text": t, "url": url} for t in texts])
+
+
+def test_lazy_load_and_lru_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DEDUP_ENABLED", False)
+    registry = CollectionRegistry(str(tmp_path), memory_budget_mb=0, max_loaded=2)
+    for name in ("a", "b", "c"):
+        fill(registry.get(name, create=True), [f"{name} chunk {i}" for i in range(3)], name)
+    assert [c["name"] for c in registry.stats()["loaded"]] == ["c", "b"]
+    assert registry.evictions == 1
+
+    # "a" is reloaded from disk on its next use, and "b" is now least recently used
+    a = registry.get("a")
+    assert a.store.index.ntotal == 3
+    assert registry.get("c") is registry.get("c")
+    assert [c["name"] for c in registry.stats()["loaded"]] == ["c", "a"]
+    assert registry.names() == [DEFAULT_COLLECTION, "a", "b", "c"]
+
+
+def test_memory_budget_keeps_most_recent(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DEDUP_ENABLED", False)
+    registry = CollectionRegistry(str(tmp_path), memory_budget_mb=0.001, max_loaded=0)
+    big = registry.get("big", create=True)
+    fill(big, ["x" * 100] * 4, "big")
+    registry.refresh(big)
+    assert big.nbytes > registry.memory_budget
+    assert [c["name"] for c in registry.stats()["loaded"]] == ["big"]
+
+    registry.get("small", create=True)
+    assert [c["name"] for c in registry.stats()["loaded"]] == ["small"]
+
+
+def test_unknown_and_invalid_names(tmp_path):
+    registry = CollectionRegistry(str(tmp_path))
+    with pytest.raises(CollectionError):
+        registry.get("missing")
+    for name in ("../etc", "-a", "a/b", "x" * 65):
+        with pytest.raises(CollectionError):
+            registry.get(name, create=True)
+    assert not os.path.exists(tmp_path / "missing")
+
+
+def test_reset_clears_dedup_signatures(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DEDUP_ENABLED", True)
+    registry = CollectionRegistry(str(tmp_path))
+    collection = registry.get("docs", create=True)
+    text = "ColBERT scores documents with late interaction over token embeddings for retrieval."
+    collection.dedup.add(collection.dedup.check(text)[1])
+    collection.dedup.save()
+    fill(collection, [text], "docs")
+
+    collection.reset()
+    assert collection.store.index.ntotal == 0 and len(collection.dedup) == 0
+    assert not collection.dedup.check(text)[0]
+    assert os.path.dirname(config.DEDUP_INDEX_PATH) == config.VECTOR_STORE_DIR
+
+
+@pytest.fixture
+def app_store(tmp_store):
+    text = "Default corpus chunk about gardening tools."
+    return tmp_store(DIM, HashEmbedder().encode([text]), [{"text": text, "url": "default"}])
+
+
+@pytest.fixture
+def client(app_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DEDUP_ENABLED", False)
+    registry = CollectionRegistry(str(tmp_path / "collections"))
+    fill(registry.get("team-a", create=True), ["ColBERT uses late interaction over token embeddings."], "team-a")
+    monkeypatch.setattr(store_registry, "_registry_instance", registry)
+    return app_client
+
+
+def test_query_and_chat_use_the_named_collection(client, api_key):
+    query = "ColBERT uses late interaction over token embeddings"
+    body = client.post("/api/query", json={"query": query, "collection": "team-a"}).json()
+    assert [c["url"] for c in body["citations"]] == ["team-a"]
+    body = client.post("/api/query", json={"query": query}).json()
+    assert body["citations"] == []
+
+    chat = {"messages": [{"role": "user", "content": query}], "collection": "team-a"}
+    body = client.post("/api/v1/chat", json=chat, headers={"X-API-Key": api_key}).json()
+    assert [c["url"] for c in body["response"]["citations"]] == ["team-a"]
+
+    body = client.post("/api/query", json={"query": query, "collection": "nope"}).json()
+    assert "unknown collection" in body["error"]
+
+
+def test_index_version_endpoint(client):
+    body = client.get("/api/v1/index/version", params={"collection": "team-a"}).json()
+    assert body["collection"] == "team-a" and body["vectors"] == 1 and body["version"] >= 1
+    assert client.get("/api/v1/index/version").json()["collection"] == "default"
+    assert client.get("/api/v1/index/version", params={"collection": "../x"}).status_code == 400
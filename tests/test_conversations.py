@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.conversations import ConversationStore
+
+
+def make_store(tmp_store, n=300, dim=16):
+    vectors = np.random.default_rng(3).standard_normal((n, dim)).astype("float32")
+    return tmp_store(dim, vectors), vectors
+
+
+def test_follow_up_reuses_session_candidates(tmp_store):
+    store, vectors = make_store(tmp_store)
+    conversations = ConversationStore(reuse_min_score=0.3)
+    session = conversations.session("c1")
+
+    first, info = conversations.retrieve(session, store, vectors[10], top_k=3)
+    assert info == {"turn": 1, "source": "search", "candidates": 30}
+    assert first[0]["text"] == "doc 10"
+
+    follow_up, info = conversations.retrieve(session, store, vectors[10] + 0.05, top_k=3)
+    assert info["source"] == "reused" and info["turn"] == 2
+    assert follow_up[0]["text"] == "doc 10"
+
+
+def test_unrelated_question_searches_again_and_version_resets(tmp_store):
+    store, vectors = make_store(tmp_store)
+    conversations = ConversationStore(reuse_min_score=0.9, context_weight=0.0)
+    session = conversations.session("c1")
+    conversations.retrieve(session, store, vectors[0], top_k=3)
+
+    results, info = conversations.retrieve(session, store, vectors[200], top_k=3)
+    assert info["source"] == "search"
+    assert results[0]["text"] == "doc 200"
+
+    store.add(vectors[:1], [{"text": "dup"}])
+    _, info = conversations.retrieve(session, store, vectors[200], top_k=3)
+    assert info["source"] == "search" and info["candidates"] == 30
+
+
+def test_sessions_expire_and_evict_lru():
+    conversations = ConversationStore(max_sessions=2, ttl=0.01)
+    a = conversations.session("a")
+    a.add_turn(np.ones(4))
+    time.sleep(0.02)
+    assert conversations.session("a").turns == []
+    assert conversations.stats()["expired"] == 1
+
+    conversations = ConversationStore(max_sessions=2, ttl=0)
+    for name in ("a", "b", "a", "c"):
+        conversations.session(name)
+    assert list(conversations._sessions) == ["a", "c"]
@@ -0,0 +1,30 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.deadline import Deadline
+
+
+def test_header_wins_over_payload_and_default():
+    assert Deadline.from_request("250", 900, 5000).budget_ms == 250
+    assert Deadline.from_request(None, 900, 5000).budget_ms == 900
+    assert Deadline.from_request(None, None, 5000).budget_ms == 5000
+    assert Deadline.from_request(None, None, 0) is None
+    with pytest.raises(ValueError):
+        Deadline.from_request("soon")
+
+
+def test_remaining_and_degradations():
+    deadline = Deadline(20)
+    assert not deadline.short(5)
+    time.sleep(0.03)
+    assert deadline.expired()
+    assert deadline.short(5)
+    deadline.degrade("skipped_highlight")
+    deadline.degrade("skipped_highlight")
+    assert deadline.report()["degradations"] == ["skipped_highlight"]
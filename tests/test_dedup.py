@@ -0,0 +1,109 @@
+import os
+import sys
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Model-free, deterministic embeddings so the ingest path imports without sentence-transformers
+from benchmarks.fake_embedder import install as install_fake_embedder
+install_fake_embedder()
+
+from api import index_documents
+from app.dedup import NearDuplicateDetector
+
+BASE = (
+    "ColBERT is a late interaction retrieval model that encodes queries and documents "
+    "into bags of token embeddings and scores them with a cheap MaxSim operator, which "
+    "keeps search fast while preserving fine grained matching between query terms."
+)
+
+
+def test_near_duplicate_is_detected(tmp_path):
+    detector = NearDuplicateDetector(threshold=0.7, index_path=str(tmp_path / "sigs.npy"))
+    is_dup, sig = detector.check(BASE)
+    assert not is_dup
+    detector.add(sig)
+
+    variant = BASE.replace("cheap", "very cheap")
+    is_dup, _ = detector.check(variant)
+    assert is_dup
+
+    unrelated = "Hallucination in large language models refers to fabricated content that is not grounded."
+    is_dup, _ = detector.check(unrelated)
+    assert not is_dup
+
+    report = detector.report(dim=384, checked=3, duplicates=1)
+    assert report["near_duplicates_skipped"] == 1 and report["skip_ratio"] == 0.3333
+    assert report["index_bytes_saved"] == 384 * 4
+    assert detector.stats == {"checked": 3, "duplicates": 1}
+
+
+def test_duplicates_within_an_unregistered_batch(tmp_path):
+    detector = NearDuplicateDetector(threshold=0.7, index_path=None)
+    _, sig = detector.check(BASE)
+    is_dup, _ = detector.check(BASE.replace("cheap", "very cheap"), [sig])
+    assert is_dup and len(detector) == 0
+
+
+def test_signature_index_persists(tmp_path):
+    path = str(tmp_path / "sigs.npy")
+    detector = NearDuplicateDetector(threshold=0.8, index_path=path)
+    _, sig = detector.check(BASE)
+    detector.add(sig)
+    detector.save()
+
+    reloaded = NearDuplicateDetector(threshold=0.8, index_path=path)
+    assert len(reloaded) == 1
+    is_dup, _ = reloaded.check(BASE)
+    assert is_dup
+
+
+def test_workers_merge_signature_files(tmp_path):
+    path = str(tmp_path / "sigs.npy")
+    first = NearDuplicateDetector(threshold=0.8, index_path=path)
+    second = NearDuplicateDetector(threshold=0.8, index_path=path)
+    unrelated = "Product quantization compresses vectors into short codes for approximate search."
+
+    first.add(first.check(BASE)[1])
+    first.save()
+    # `second` sees the first worker's rows without reloading, and its save keeps them
+    assert second.check(BASE)[0]
+    second.add(second.check(unrelated)[1])
+    second.save()
+
+    assert len(NearDuplicateDetector(threshold=0.8, index_path=path)) == 2
+    assert first.check(unrelated)[0]
+
+    # Rows pending in both workers survive both saves
+    first.add(first.signature("Dense retrieval embeds queries and documents in one vector space."))
+    second.add(second.signature("Hallucinations happen when generation ignores the retrieved context."))
+    first.save()
+    second.save()
+    assert len(NearDuplicateDetector(threshold=0.8, index_path=path)) == 4
+
+    first.reset()
+    assert not second.check(BASE)[0] and len(second) == 0
+
+
+def test_failed_add_does_not_register_signatures(tmp_path, monkeypatch):
+    detector = NearDuplicateDetector(threshold=0.8, index_path=str(tmp_path / "sigs.npy"))
+
+    class FlakyStore:
+        dim = 384
+        index = type("Index", (), {"ntotal": 0})()
+        calls = 0
+
+        def add(self, embeddings, metadata, sentence_embeddings=None):
+            FlakyStore.calls += 1
+            if FlakyStore.calls == 1:
+                raise OSError("disk full")
+
+    monkeypatch.setattr(index_documents, "get_vector_store", FlakyStore)
+    monkeypatch.setattr(index_documents, "get_dedup_index", lambda: detector)
+    monkeypatch.setattr(index_documents, "scrape_text_from_url", lambda url: BASE)
+
+    first = index_documents.index_urls(["https://example.com/a"])
+    assert first["failed"][0]["reason"] == "disk full" and len(detector) == 0
+    retry = index_documents.index_urls(["https://example.com/a"])
+    assert retry["indexed_urls"] == ["https://example.com/a"] and len(detector) == 1
+    assert retry["dedup"]["checked_chunks"] == 1 and retry["dedup"]["near_duplicates_skipped"] == 0
@@ -0,0 +1,79 @@
+import gzip
+import json
+import os
+import sys
+import zlib
+
+import numpy as np
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.evaluation import load_queries, recall_at_k, run_evaluation
+
+DIM = 16
+
+
+def make_store(tmp_store):
+    vectors = np.random.default_rng(0).standard_normal((300, DIM)).astype("float32")
+    return tmp_store(DIM, vectors, [{"text": f"chunk {i} about topic{i % 7}"} for i in range(300)])
+
+
+def fake_embed(texts):
+    return np.stack([
+        np.random.default_rng(zlib.crc32(t.encode())).standard_normal(DIM).astype("float32") for t in texts
+    ])
+
+
+def test_load_queries_from_traces_feedback_and_query_sets(tmp_path):
+    traces = tmp_path / "requests.jsonl"
+    traces.write_text("\n".join(json.dumps(r) for r in [
+        {"endpoint": "/api/query", "query": "what is colbert"},
+        {"endpoint": "/api/v1/chat", "query": "thanks", "intent": "thanks"},
+        {"endpoint": "/api/query", "query": "what is colbert"},
+    ]) + "\nnot json\n")
+    with gzip.open(tmp_path / "requests.20260101-000000.000000.1.jsonl.gz", "wt") as f:
+        f.write(json.dumps({"query": "rotated query"}) + "\n")
+    feedback = tmp_path / "feedback_log.jsonl"
+    feedback.write_text(json.dumps({"user_input": "vector databases", "rating": 5}) + "\n")
+    query_set = tmp_path / "queries.txt"
+    query_set.write_text("hnsw graphs\n\nwhat is colbert\n")
+
+    paths = [str(traces), str(tmp_path / "requests.20260101-000000.000000.1.jsonl.gz"),
+             str(feedback), str(query_set), str(tmp_path / "missing.jsonl")]
+    assert load_queries(paths) == ["what is colbert", "rotated query", "vector databases", "hnsw graphs"]
+    assert load_queries(paths, limit=2) == ["what is colbert", "rotated query"]
+
+
+def test_recall_at_k():
+    assert recall_at_k([1, 2, 3], [3, 2, 9], 3) == 2 / 3
+    assert recall_at_k([], [4, 5], 2) == 0.0
+    assert recall_at_k([], [-1, -1], 2) == 1.0
+
+
+def test_exact_search_has_full_recall_and_threshold_costs_recall(tmp_store):
+    store = make_store(tmp_store)
+    queries = [f"query {i}" for i in range(40)]
+    configs = [
+        {"name": "exact", "mode": "dense", "score_threshold": None},
+        {"name": "strict", "mode": "dense", "score_threshold": 0.8},
+        {"name": "sq8", "mode": "two_stage", "index": "SQ8", "candidates": 50},
+    ]
+    report = run_evaluation(store, queries, fake_embed, configs, top_k=5, warmup=2)
+
+    exact, strict, sq8 = report["configs"]
+    assert report["queries"] == 40 and report["vectors"] == 300
+    assert exact["recall_at_k"] == 1.0 and exact["empty_rate"] == 0.0
+    # Random queries rarely reach 0.8 cosine, so the cut-off drops most exact neighbours
+    assert strict["recall_at_k"] < 0.5 and strict["empty_rate"] > 0.2
+    assert sq8["recall_at_k"] >= 0.9
+    for config in report["configs"]:
+        latency = config["latency_ms"]
+        assert 0 <= latency["p50"] <= latency["p90"] <= latency["p99"] <= latency["max"]
+        assert config["qps"] > 0
+
+    comparison = report["comparison"]
+    assert comparison["baseline"] == "exact"
+    delta = comparison["candidates"]["strict"]["recall_at_k"]
+    assert delta["baseline"] == 1.0 and delta["delta"] == round(strict["recall_at_k"] - 1.0, 4)
+    json.dumps(report)
@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_embedder import HashEmbedder
+from app import config, export
+from app.export import collect_exports, index_columns, iter_export, iter_index_rows, save_results
+
+ROWS = [
+    {"id": 3, "score": 0.91, "url": "u3", "text": 'ColBERT, "late" interaction', "sentences": [[0, 7]]},
+    {"id": 1, "score": 0.85, "url": "u1", "text": "line\nbreak", "rrf_score": 0.03},
+]
+
+
+def test_csv_streams_in_chunks_and_round_trips(monkeypatch):
+    monkeypatch.setattr(export, "ROWS_PER_CHUNK", 1)
+    chunks = list(iter_export(ROWS, "csv"))
+    assert len(chunks) == 2  # header with the first row, then the second
+
+    parsed = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert list(parsed[0]) == ["id", "score", "url", "text", "sentences", "rrf_score"]
+    assert parsed[0]["text"] == 'ColBERT, "late" interaction'
+    assert json.loads(parsed[0]["sentences"]) == [[0, 7]]
+    assert parsed[1]["text"] == "line\nbreak" and parsed[1]["sentences"] == ""
+
+
+def test_jsonl_export():
+    lines = b"".join(iter_export(ROWS, "jsonl")).decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == ROWS
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(export.ExportError):
+        iter_export(ROWS, "xlsx")
+
+
+def test_parquet_export():
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = pq.read_table(io.BytesIO(b"".join(iter_export(ROWS, "parquet"))))
+    assert table.column("id").to_pylist() == [3, 1]
+    assert table.column("rrf_score").to_pylist() == [None, 0.03]
+
+
+def test_collect_exports_by_age_and_count(tmp_path):
+    now = time.time()
+    for i in range(5):
+        path = tmp_path / f"query_results_{i}.csv"
+        path.write_text("x")
+        os.utime(path, (now - i * 100, now - i * 100))
+    (tmp_path / "unrelated.csv").write_text("keep")
+
+    assert collect_exports(str(tmp_path), ttl=350, max_files=0) == 1  # query_results_4
+    assert collect_exports(str(tmp_path), ttl=0, max_files=2) == 2  # 2 and 3
+    assert sorted(os.listdir(tmp_path)) == ["query_results_0.csv", "query_results_1.csv", "unrelated.csv"]
+
+
+def test_save_results_collects_old_files(tmp_path, monkeypatch):
+    # Anchored at the project root, not the working directory the server starts in
+    assert os.path.dirname(config.EXPORT_DIR).startswith(config.PROJECT_ROOT)
+    monkeypatch.setattr(config, "EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "EXPORT_MAX_FILES", 2)
+    paths = [save_results(ROWS) for _ in range(4)]
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in paths[-2:])
+
+
+def test_index_rows_stream_metadata_and_vectors(tmp_store):
+    store = tmp_store(4, np.eye(4, dtype=np.float32)[:3],
+                      [{"text": f"chunk {i}", "url": f"u{i}", "sentences": [[0, 5]]} for i in range(3)])
+
+    rows = list(iter_index_rows(store, include_vectors=True, batch_size=2))
+    assert [row["id"] for row in rows] == [0, 1, 2]
+    assert rows[1]["text"] == "chunk 1" and rows[1]["vector"] == [0.0, 1.0, 0.0, 0.0]
+    assert index_columns(store, include_vectors=True) == ["id", "url", "text", "sentences", "vector"]
+
+
+@pytest.fixture
+def app_store(tmp_store):
+    texts = ["ColBERT uses late interaction over token embeddings.",
+             "Vector databases index embeddings for nearest neighbour search."]
+    return tmp_store(vectors=HashEmbedder().encode(texts), metadata=[{"text": t, "url": f"u{i}"} for i, t in enumerate(texts)])
+
+
+@pytest.fixture
+def client(app_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "EXPORT_DIR", str(tmp_path / "exports"))
+    return app_client
+
+
+def test_query_export_download_and_saved_csv(client):
+    query = {"query": "ColBERT uses late interaction over token embeddings"}
+    response = client.post("/api/query/export?format=jsonl", json=query)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows[0]["id"] == 0 and rows[0]["url"] == "u0" and rows[0]["score"] > 0.99
+
+    assert client.post("/api/query/export?format=xlsx", json=query).status_code == 400
+
+    body = client.post("/api/query", json={**query, "save_to_csv": True}).json()
+    assert body["csv_path"].startswith(config.EXPORT_DIR)
+    with open(body["csv_path"], newline="") as f:
+        assert next(csv.DictReader(f))["url"] == "u0"
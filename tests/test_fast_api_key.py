@@ -1,15 +1,55 @@
-from fastapi.testclient import TestClient
-from . import app  # Replace with your FastAPI app import
+import os
+import sys
 
-client = TestClient(app)
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def test_query_without_api_key():
-    response = client.post("/api/query", json={"query": "test"})
-    assert response.status_code == 401 or response.status_code == 403
+# Model-free, deterministic embeddings so the app imports without sentence-transformers
+from benchmarks.fake_embedder import install as install_fake_embedder
+install_fake_embedder()
+
+from app import config
+from app.profiling import ProfilingMiddleware
+from app.main import app
+
+CHAT = {"messages": [{"role": "user", "content": "What is late interaction retrieval?"}]}
+
+
+def test_chat_without_api_key(app_client):
+    response = app_client.post("/api/v1/chat", json=CHAT)
+    assert response.status_code == 403
     assert "Invalid" in response.text
 
-def test_query_with_api_key():
-    headers = {"X-API-Key": "your_valid_api_key_here"}
-    response = client.post("/api/query", json={"query": "test"}, headers=headers)
+
+def test_chat_with_wrong_api_key(app_client):
+    response = app_client.post("/api/v1/chat", json=CHAT, headers={"X-API-Key": "nope"})
+    assert response.status_code == 403
+
+
+def test_chat_with_non_ascii_api_key(app_client):
+    response = app_client.post("/api/v1/chat", json=CHAT, headers={"X-API-Key": b"cl\xe9"})
+    assert response.status_code == 403
+
+
+def test_chat_with_api_key(app_client, api_key):
+    response = app_client.post("/api/v1/chat", json=CHAT, headers={"X-API-Key": api_key})
+    assert response.status_code == 200
+    assert "answer" in response.json()["response"]
+
+
+def test_chat_rejects_non_numeric_min_score(app_client, api_key):
+    response = app_client.post("/api/v1/chat", json={**CHAT, "min_score": "high"}, headers={"X-API-Key": api_key})
     assert response.status_code == 200
-    assert "answer" in response.json()
+    assert response.json()["response"]["answer"]["content"] == "❌ `min_score` must be a number."
+
+
+def test_non_ascii_admin_tokens_are_rejected(app_client, monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "admin")
+    monkeypatch.setattr(config, "PROFILE_SAMPLE_RATE", 0)
+    assert app_client.get("/admin/profiles").status_code == 403
+    assert app_client.get("/admin/profiles", headers={"X-Admin-Token": b"adm\xe9"}).status_code == 403
+    assert app_client.get("/admin/profiles", headers={"X-Admin-Token": "admin"}).status_code == 200
+
+    middleware = ProfilingMiddleware(app)
+    assert not middleware._should_profile({b"x-profile": b"\xe9\xff"})
+    assert middleware._should_profile({b"x-profile": b"admin"})
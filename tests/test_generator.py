@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.generator import Generator, pack_context
+
+
+class StubCompletions(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /v1/chat/completions that streams a fixed answer."""
+
+    pieces = ["ColBERT ", "uses ", "late ", "interaction ", "[1]."]
+    delay = 0.0
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StubCompletions.requests.append(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        try:
+            for i, piece in enumerate(self.pieces):
+                time.sleep(self.delay)
+                chunk = {
+                    "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                    "choices": [{
+                        "index": 0, "delta": {"content": piece},
+                        "finish_reason": "stop" if i == len(self.pieces) - 1 else None,
+                    }],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client gave up (timeout test)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCompletions)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StubCompletions.delay = 0.0
+    StubCompletions.requests = []
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+
+
+DOCS = [
+    {"text": "ColBERT scores documents with late interaction over token embeddings.", "url": "u1"},
+    {"text": "FAISS provides flat and compressed vector indexes.", "url": "u2"},
+]
+
+
+def test_streams_tokens_from_compatible_server(stub_server):
+    async def run():
+        generator = Generator(base_url=stub_server, model="stub-model", timeout=5)
+        try:
+            return await generator.generate("How does ColBERT score?", DOCS)
+        finally:
+            await generator.aclose()
+
+    result = asyncio.run(run())
+    assert result["content"] == "ColBERT uses late interaction [1]."
+    assert result["partial"] is False
+    assert result["finish_reason"] == "stop"
+    assert result["sources"] == 2
+    prompt = StubCompletions.requests[0]["messages"][-1]["content"]
+    assert "[1] u1" in prompt and "How does ColBERT score?" in prompt
+
+
+def test_timeout_returns_partial_answer(stub_server):
+    StubCompletions.delay = 0.15
+
+    async def run():
+        generator = Generator(base_url=stub_server, model="stub-model", timeout=0.4)
+        try:
+            return await generator.generate("How does ColBERT score?", DOCS)
+        finally:
+            await generator.aclose()
+
+    result = asyncio.run(run())
+    assert result["partial"] is True
+    assert result["finish_reason"] == "timeout"
+    assert result["content"].startswith("ColBERT")
+    assert result["content"] != "ColBERT uses late interaction [1]."
+
+
+class BrokenStream:
+    """Streams two pieces, then fails the way httpx does when the connection drops mid-body."""
+
+    def __init__(self):
+        self.closed = False
+
+    async def __aiter__(self):
+        for piece in ("ColBERT ", "uses "):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece), finish_reason=None)])
+        raise httpx.ReadError("connection reset")
+
+    async def close(self):
+        self.closed = True
+
+
+def test_transport_error_keeps_streamed_tokens(monkeypatch):
+    stream = BrokenStream()
+
+    async def run():
+        generator = Generator(base_url="http://127.0.0.1:9/v1", model="stub-model", timeout=5)
+
+        async def create(**kwargs):
+            return stream
+
+        monkeypatch.setattr(generator.client.chat.completions, "create", create)
+        try:
+            return await generator.generate("How does ColBERT score?", DOCS)
+        finally:
+            await generator.aclose()
+
+    result = asyncio.run(run())
+    assert result["partial"] is True and result["finish_reason"] == "error"
+    assert result["content"] == "ColBERT uses " and stream.closed
+
+
+def test_pack_context_respects_budget():
+    count = lambda text: len(text.split())
+    docs = [{"text": "word " * 40, "url": f"u{i}"} for i in range(5)]
+    context, used, included = pack_context(docs, 100, count)
+    assert used <= 100
+    assert included == 3  # two whole chunks and a truncated third
+    assert context.startswith("[1] u0")
@@ -0,0 +1,35 @@
+import os
+import sys
+import zlib
+
+import numpy as np
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.intent_router import INTENTS, IntentRouter, normalize_intent_text
+
+
+def bag_of_words(texts, dim=256):
+    """Deterministic stand-in for the sentence model: hashed word counts."""
+    if isinstance(texts, str):
+        texts = [texts]
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in normalize_intent_text(text).split():
+            out[row, zlib.crc32(word.encode()) % dim] += 1
+    return out
+
+
+def test_exact_match_skips_embedding():
+    router = IntentRouter(INTENTS, bag_of_words)
+    routed = router.match_text("  THANKS!! ")
+    assert routed["intent"] == "thanks"
+    assert router.match_text("What is ColBERT?") is None
+
+
+def test_embedding_route_and_threshold():
+    router = IntentRouter(INTENTS, bag_of_words, threshold=0.7)
+    routed = router.route(bag_of_words("hello there")[0])
+    assert routed["intent"] == "greeting"
+    assert router.route(bag_of_words("how does colbert late interaction work")[0]) is None
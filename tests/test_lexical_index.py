@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+
+import numpy as np
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.lexical_index import BM25_B, BM25_K1, LexicalIndex, query_terms, reciprocal_rank_fusion
+
+TEXTS = [
+    "ColBERT uses late interaction over token embeddings.",
+    "Product quantization (PQ) compresses vectors into short codes.",
+    "Dense retrieval embeds queries and documents in one space.",
+    "Hallucinations happen when generation ignores retrieved context.",
+]
+
+
+def test_bm25_finds_rare_exact_terms():
+    index = LexicalIndex()
+    index.add(TEXTS)
+    ids, scores = index.search("what is PQ", top_k=3)
+    assert list(ids) == [1]
+    assert scores[0] > 0
+    assert len(index.search("nothing matches here", top_k=3)[0]) == 0
+
+
+def test_scores_match_dense_bm25():
+    index = LexicalIndex()
+    index.add(TEXTS)
+    ids, scores = index.search("late interaction retrieval over compressed vectors", top_k=10)
+
+    # Reference: score every document, not just the matched postings
+    n_docs = len(index.doc_lengths)
+    lengths = np.array(index.doc_lengths, dtype=np.float64)
+    expected = np.zeros(n_docs)
+    for term in query_terms("late interaction retrieval over compressed vectors"):
+        if term in index.postings:
+            term_ids = np.array(index.postings[term][0])
+            tfs = np.array(index.postings[term][1], dtype=np.float64)
+            idf = np.log(1 + (n_docs - len(term_ids) + 0.5) / (len(term_ids) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[term_ids] / (index.total_length / n_docs))
+            expected[term_ids] += idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+    matched = np.flatnonzero(expected)
+    assert set(ids) == set(matched)
+    np.testing.assert_allclose(scores, expected[ids], rtol=1e-5)
+    assert list(scores) == sorted(scores, reverse=True)
+    assert list(index.search("late interaction retrieval over compressed vectors", top_k=1)[0]) == [ids[0]]
+
+
+def test_incremental_add_and_persistence(tmp_store):
+    store = tmp_store(8)
+    rng = np.random.default_rng(0)
+    store.add(rng.standard_normal((2, 8)), [{"text": t} for t in TEXTS[:2]])
+    store.add(rng.standard_normal((2, 8)), [{"text": t} for t in TEXTS[2:]])
+    assert store.lexical_search("hallucinations context")[0]["id"] == 3
+
+    reloaded = tmp_store(8)
+    hits = reloaded.lexical_search("colbert")
+    assert [h["text"] for h in hits] == [TEXTS[0]]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]])
+    assert [doc_id for doc_id, _ in fused][:2] == [1, 3]
+    assert {doc_id for doc_id, _ in fused} == {1, 2, 3, 4}
+
+
+def test_concurrent_add_and_search():
+    index = LexicalIndex()
+    index.add(TEXTS)
+    errors = []
+    done = threading.Event()
+
+    def search():
+        while not done.is_set():
+            try:
+                index.search("colbert late interaction", top_k=3)
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=search) for _ in range(3)]
+    for t in readers:
+        t.start()
+    try:
+        for i in range(500):
+            index.add([f"ColBERT chunk {i} uses late interaction."])
+    except Exception as e:
+        errors.append(e)
+    finally:
+        done.set()
+        for t in readers:
+            t.join()
+
+    assert errors == []
+    assert len(index) == 504 and len(index.postings["colbert"][0]) == 501
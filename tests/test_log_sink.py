@@ -0,0 +1,95 @@
+import gzip
+import json
+import os
+import sys
+import time
+from multiprocessing import Process
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.log_sink import JsonlSink
+
+
+def read_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_write_is_buffered_until_batch_size(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    sink = JsonlSink(path, flush_records=3, flush_interval=60)
+    sink.write({"n": 1})
+    sink.write({"n": 2})
+    time.sleep(0.05)
+    assert not os.path.exists(path)
+
+    sink.write({"n": 3})
+    deadline = time.time() + 2
+    while sink.written < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    assert [r["n"] for r in read_lines(path)] == [1, 2, 3]
+    sink.close()
+
+
+def test_flushes_on_interval_and_close(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    sink = JsonlSink(path, flush_records=100, flush_interval=0.05)
+    sink.write({"n": 1})
+    deadline = time.time() + 2
+    while sink.written < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert read_lines(path) == [{"n": 1}]
+
+    sink.write({"n": 2})
+    sink.close()
+    assert [r["n"] for r in read_lines(path)] == [1, 2]
+    sink.write({"n": 3})
+    assert sink.dropped == 1
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    sink = JsonlSink(str(tmp_path / "log.jsonl"), flush_records=100, flush_interval=60, max_queue=2)
+    for n in range(5):
+        sink.write({"n": n})
+    assert sink.dropped == 3
+    sink.close()
+    assert sink.written == 2
+
+
+def test_rotation_compresses_and_prunes_segments(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    sink = JsonlSink(path, max_bytes=200, backup_count=2, flush_records=1000, flush_interval=60)
+    for n in range(4):
+        for i in range(10):
+            sink.write({"batch": n, "i": i, "pad": "x" * 20})
+        sink.flush()
+    sink.close()
+
+    segments = sorted(p for p in os.listdir(tmp_path) if p.endswith(".jsonl.gz"))
+    assert sink.rotations == 4
+    assert len(segments) == 2
+    assert not os.path.exists(path)
+    with gzip.open(tmp_path / segments[-1], "rt") as f:
+        assert [json.loads(line)["batch"] for line in f] == [3] * 10
+
+
+def _append_records(path, worker):
+    sink = JsonlSink(path, flush_records=7, flush_interval=0.01)
+    for i in range(200):
+        sink.write({"worker": worker, "i": i, "pad": "y" * 100})
+    sink.close()
+
+
+def test_concurrent_processes_never_interleave_lines(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    workers = [Process(target=_append_records, args=(path, w)) for w in range(4)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+
+    records = read_lines(path)
+    assert len(records) == 800
+    for w in range(4):
+        assert [r["i"] for r in records if r["worker"] == w] == list(range(200))
@@ -0,0 +1,151 @@
+import os
+import sys
+import threading
+from multiprocessing import Process
+
+import faiss
+import numpy as np
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.manifest import read_flat_rows
+from app.sharded_store import ShardedVectorStore
+from app.vector_store import VectorStore
+
+DIM = 16
+
+
+def make_store(tmp_path):
+    return VectorStore(
+        DIM,
+        index_path=str(tmp_path / "index.faiss"),
+        meta_path=str(tmp_path / "metadata.json"),
+        sentence_path=str(tmp_path / "sentences.npy"),
+        lexical_path=str(tmp_path / "lexical.npz"),
+    )
+
+
+def batch(start, n):
+    rng = np.random.default_rng(start)
+    return rng.standard_normal((n, DIM)).astype("float32"), [{"text": f"doc{i} word{i % 3}"} for i in range(start, start + n)]
+
+
+def test_reader_appends_new_rows(tmp_path):
+    writer, reader = make_store(tmp_path), make_store(tmp_path)
+    writer.add(*batch(0, 10))
+    assert reader.refresh()
+    index, rebuilds = reader.index, reader.rebuilds
+    assert reader.version == writer.version and reader.index.ntotal == 10
+
+    writer.add(*batch(10, 5))
+    assert reader.refresh()
+    # A grown copy is swapped in; it still extends the old one
+    assert reader.index is not index and index.ntotal == 10 and reader.index.ntotal == 15
+    assert reader.rebuilds == rebuilds
+    assert reader.metadata == writer.metadata
+    assert reader.lexical_search("doc12")[0]["text"] == "doc12 word0"
+    assert np.allclose(reader.index.reconstruct_n(0, 15), writer.index.reconstruct_n(0, 15))
+    assert not reader.refresh()
+
+
+def test_search_while_reader_appends(tmp_path):
+    writer, reader = make_store(tmp_path), make_store(tmp_path)
+    writer.add(*batch(0, 50))
+    reader.refresh()
+    query = batch(0, 1)[0][0]
+    errors = []
+    done = threading.Event()
+
+    def search():
+        while not done.is_set():
+            try:
+                hits = reader.search(query, top_k=3)
+                assert hits[0]["text"] == "doc0 word0" and all(h["text"] for h in hits)
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=search) for _ in range(3)]
+    for t in readers:
+        t.start()
+    try:
+        for start in range(50, 250, 10):
+            writer.add(*batch(start, 10))
+            assert reader.refresh()
+    finally:
+        done.set()
+        for t in readers:
+            t.join()
+
+    assert errors == [] and reader.index.ntotal == len(reader.metadata) == 250
+
+
+def test_writer_catches_up_before_saving(tmp_path):
+    first, second = make_store(tmp_path), make_store(tmp_path)
+    first.add(*batch(0, 4))
+    # `second` never refreshed; its add must not overwrite the rows `first` wrote
+    second.add(*batch(4, 3))
+    assert second.index.ntotal == 7
+    assert [m["text"] for m in make_store(tmp_path).metadata][:5] == [f"doc{i} word{i % 3}" for i in range(5)]
+    assert first.refresh() and first.index.ntotal == 7 and first.version == second.version
+
+
+def test_reset_forces_full_reload(tmp_path):
+    writer, reader = make_store(tmp_path), make_store(tmp_path)
+    writer.add(*batch(0, 6))
+    reader.refresh()
+    writer.reset()
+    writer.add(*batch(100, 2))
+
+    assert reader.refresh()
+    assert reader.index.ntotal == 2 and reader.metadata[0]["text"] == "doc100 word1"
+    assert reader.epoch == writer.epoch
+
+
+def test_read_flat_rows(tmp_path):
+    vectors, _ = batch(0, 8)
+    for index in (faiss.IndexFlatIP(DIM), faiss.IndexFlatL2(DIM)):
+        index.add(vectors)
+        faiss.write_index(index, str(tmp_path / "flat.faiss"))
+        assert np.array_equal(read_flat_rows(str(tmp_path / "flat.faiss"), 5, DIM), vectors[5:])
+        assert read_flat_rows(str(tmp_path / "flat.faiss"), 5, DIM + 1) is None
+    hnsw = faiss.IndexHNSWFlat(DIM, 8)
+    hnsw.add(vectors)
+    faiss.write_index(hnsw, str(tmp_path / "hnsw.faiss"))
+    assert read_flat_rows(str(tmp_path / "hnsw.faiss"), 0, DIM) is None
+
+
+def test_sharded_reader_reloads_only_changed_shards(tmp_path):
+    make = lambda: ShardedVectorStore(DIM, num_shards=4, directory=str(tmp_path / "shards"))
+    writer, reader = make(), make()
+    writer.add(*batch(0, 40))
+    assert reader.refresh() and reader.index.ntotal == 40
+
+    before = list(reader.shards)
+    writer.add(*batch(40, 1))
+    assert reader.refresh()
+    changed = [n for n, shard in enumerate(reader.shards) if shard is not before[n]]
+    assert changed == [writer.owner[40]]
+    assert reader.metadata == writer.metadata and reader.version == writer.version
+    query = batch(40, 1)[0][0]
+    assert reader.search(query)[0]["id"] == 40
+
+
+def _add_rows(tmp_path, worker):
+    store = make_store(tmp_path)
+    for i in range(5):
+        store.add(*batch(worker * 100 + i * 2, 2))
+
+
+def test_concurrent_writers_do_not_lose_rows(tmp_path):
+    workers = [Process(target=_add_rows, args=(tmp_path, w)) for w in range(3)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+        assert p.exitcode == 0
+
+    store = make_store(tmp_path)
+    assert store.index.ntotal == len(store.metadata) == 30
+    assert len({m["text"] for m in store.metadata}) == 30
+    assert store.manifest.read()["vectors"] == 30
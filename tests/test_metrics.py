@@ -0,0 +1,49 @@
+import json
+import logging
+import os
+import sys
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.logger import JsonFormatter, JsonQueueHandler, RateLimitFilter
+from app.metrics import Registry
+
+
+def test_prometheus_rendering():
+    registry = Registry()
+    hist = registry.histogram("stage_seconds", "Stage latency.", buckets=(0.1, 1.0))
+    hist.observe(0.05, stage="embed")
+    hist.observe(0.5, stage="embed")
+    registry.counter("lookups_total", "Lookups.").inc(outcome="hit")
+    registry.gauge("index_vectors", "Vectors.").set(42)
+
+    text = registry.render()
+    assert "# TYPE stage_seconds histogram" in text
+    assert 'stage_seconds_bucket{stage="embed",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="embed",le="1"} 2' in text
+    assert 'stage_seconds_bucket{stage="embed",le="+Inf"} 2' in text
+    assert 'stage_seconds_count{stage="embed"} 2' in text
+    assert 'lookups_total{outcome="hit"} 1' in text
+    assert "index_vectors 42" in text
+
+
+def test_rate_limit_filter_drops_repeats_but_not_warnings():
+    flt = RateLimitFilter(burst=2, interval=60)
+    info = [logging.makeLogRecord({"name": "rag.x", "msg": "hot path", "levelno": logging.INFO}) for _ in range(5)]
+    assert [flt.filter(r) for r in info] == [True, True, False, False, False]
+    warning = logging.makeLogRecord({"name": "rag.x", "msg": "hot path", "levelno": logging.WARNING})
+    assert flt.filter(warning)
+
+
+def test_queued_records_keep_traceback_out_of_message():
+    logger = logging.getLogger("test.queued")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logger.makeRecord(logger.name, logging.ERROR, __file__, 1, "failed %s", ("x",),
+                                   sys.exc_info(), extra={"url": "u"})
+    entry = json.loads(JsonFormatter().format(JsonQueueHandler(None).prepare(record)))
+    assert entry["msg"] == "failed x" and entry["url"] == "u"
+    assert "Traceback" in entry["exc"] and "ValueError: boom" in entry["exc"]
+
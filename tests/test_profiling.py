@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Model-free, deterministic embeddings so the app imports without sentence-transformers
+from benchmarks.fake_embedder import install as install_fake_embedder
+install_fake_embedder()
+
+from app import config
+from app.profiling import ProfilingMiddleware, collect_profiles
+from app.main import app
+
+ADMIN = {"X-Admin-Token": "admin"}
+
+
+@pytest.fixture
+def asgi_app():
+    # The app is built with PROFILING_ENABLED off, so wrap it the way main.py would
+    return ProfilingMiddleware(app)
+
+
+@pytest.fixture
+def client(app_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "admin")
+    monkeypatch.setattr(config, "PROFILE_SAMPLE_RATE", 0)
+    monkeypatch.setattr(config, "PROFILE_DIR", str(tmp_path / "profiles"))
+    return app_client
+
+
+def test_middleware_not_installed_by_default():
+    assert not config.PROFILING_ENABLED
+    assert all(m.cls is not ProfilingMiddleware for m in app.user_middleware)
+
+
+def test_profile_header_saves_and_lists_profile(client):
+    assert "x-profile-id" not in client.get("/").headers
+    assert client.get("/", headers={"X-Profile": "wrong"}).headers.get("x-profile-id") is None
+
+    response = client.get("/", headers={"X-Profile": "admin"})
+    collapsed = response.headers["x-profile-id"]
+    assert collapsed.endswith(".collapsed")
+    response = client.get("/", headers={"X-Profile": "admin", "X-Profile-Format": "speedscope"})
+    speedscope = response.headers["x-profile-id"]
+    assert speedscope.endswith(".speedscope.json")
+    assert sorted(os.listdir(config.PROFILE_DIR)) == sorted([collapsed, speedscope])
+
+    listed = client.get("/admin/profiles", headers=ADMIN).json()["profiles"]
+    assert {p["name"] for p in listed} == {collapsed, speedscope}
+    body = client.get(f"/admin/profiles/{speedscope}", headers=ADMIN).json()
+    assert body["$schema"].startswith("https://www.speedscope.app/")
+
+
+def test_saving_a_profile_prunes_old_ones(client, monkeypatch):
+    monkeypatch.setattr(config, "PROFILE_MAX_FILES", 2)
+    names = [client.get("/", headers={"X-Profile": "admin"}).headers["x-profile-id"] for _ in range(3)]
+    assert set(os.listdir(config.PROFILE_DIR)) <= set(names) and len(os.listdir(config.PROFILE_DIR)) == 2
+    assert names[-1] in os.listdir(config.PROFILE_DIR)
+
+
+def test_collect_profiles_ttl_and_count(tmp_path):
+    now = time.time()
+    for i, name in enumerate(["a.collapsed", "b.speedscope.json", "c.collapsed", "notes.txt"]):
+        path = tmp_path / name
+        path.write_text(json.dumps({}))
+        os.utime(path, (now - i * 100, now - i * 100))
+
+    # Other files in the directory are never touched
+    assert collect_profiles(str(tmp_path), ttl=150, max_files=0) == 1
+    assert sorted(os.listdir(tmp_path)) == ["a.collapsed", "b.speedscope.json", "notes.txt"]
+    assert collect_profiles(str(tmp_path), ttl=0, max_files=1, keep=str(tmp_path / "b.speedscope.json")) == 1
+    assert sorted(os.listdir(tmp_path)) == ["b.speedscope.json", "notes.txt"]
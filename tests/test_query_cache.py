@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import config
+from app.query_cache import InMemoryBackend, QueryCache, SQLiteBackend
+
+
+def test_key_normalizes_query_and_tracks_version():
+    a = QueryCache.make_key("/api/query", "  What is  ColBERT? ", 3, top_k=5, min_score=None)
+    b = QueryCache.make_key("/api/query", "what is colbert?", 3, min_score=None, top_k=5)
+    c = QueryCache.make_key("/api/query", "what is colbert?", 4, top_k=5, min_score=None)
+    assert a == b
+    assert a != c
+
+
+def test_lru_eviction_and_hit_rate():
+    cache = QueryCache(InMemoryBackend(max_entries=2, ttl=0))
+    cache.set("a", {"answer": 1})
+    cache.set("b", {"answer": 2})
+    assert cache.get("a") == {"answer": 1}
+    cache.set("c", {"answer": 3})  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["evictions"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_ttl_expiry():
+    cache = QueryCache(InMemoryBackend(max_entries=10, ttl=0.01))
+    cache.set("a", {"answer": 1})
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_sqlite_backend_is_shared(tmp_path):
+    # The default file is anchored at the project root, so every worker opens the same one
+    assert config.QUERY_CACHE_PATH.startswith(config.PROJECT_ROOT)
+    path = str(tmp_path / "cache.sqlite3")
+    writer = QueryCache(SQLiteBackend(path, max_entries=1, ttl=60))
+    reader = QueryCache(SQLiteBackend(path, max_entries=1, ttl=60))
+    writer.set("a", {"answer": "x"})
+    assert reader.get("a") == {"answer": "x"}
+    writer.set("b", {"answer": "y"})
+    assert reader.get("a") is None
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import numpy as np
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+
+def make_store(tmp_store, dim=8):
+    vectors = np.random.default_rng(1).standard_normal((200, dim)).astype("float32")
+    return tmp_store(dim, vectors), vectors
+
+
+def test_range_search_matches_filtered_top_k(tmp_store):
+    store, vectors = make_store(tmp_store)
+    query = vectors[3]
+    expected = store.search(query, top_k=store.index.ntotal, min_score=0.5)
+
+    hits = store.range_search(query, 0.5)
+    assert [h["text"] for h in hits] == [h["text"] for h in expected]
+    assert all(h["score"] >= 0.5 for h in hits)
+
+    capped = store.range_search(query, 0.5, max_results=3)
+    assert [h["text"] for h in capped] == [h["text"] for h in expected[:3]]
+
+
+def test_range_search_empty_above_threshold(tmp_store):
+    store, vectors = make_store(tmp_store)
+    assert store.range_search(vectors[0], 1.01) == []
@@ -0,0 +1,54 @@
+import os
+import sys
+
+import numpy as np
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.semantic_cache import SemanticCache
+
+
+def unit(rng, dim=16):
+    v = rng.standard_normal(dim).astype("float32")
+    return v / np.linalg.norm(v)
+
+
+def test_paraphrase_hits_above_threshold_only():
+    rng = np.random.default_rng(0)
+    cache = SemanticCache(16, threshold=0.9)
+    scope = SemanticCache.scope("/api/query", top_k=5)
+    original = unit(rng)
+    cache.set(original, 1, scope, "what is colbert", {"answer": "late interaction"}, compute_ms=40.0)
+
+    paraphrase = original + 0.05 * unit(rng)
+    hit = cache.get(paraphrase, 1, scope)
+    assert hit["answer"] == "late interaction"
+    assert hit["semantic_cache"]["query"] == "what is colbert"
+
+    assert cache.get(unit(rng), 1, scope) is None
+    assert cache.get(original, 1, SemanticCache.scope("/api/query", top_k=3)) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["saved_ms"] == 40.0
+
+
+def test_index_version_change_invalidates():
+    rng = np.random.default_rng(1)
+    cache = SemanticCache(16)
+    query = unit(rng)
+    cache.set(query, 1, "s", "q", {"answer": "old"}, compute_ms=1.0)
+    assert cache.get(query, 2, "s") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_eviction_keeps_index_aligned():
+    rng = np.random.default_rng(2)
+    cache = SemanticCache(16, max_entries=10)
+    vectors = [unit(rng) for _ in range(15)]
+    for i, v in enumerate(vectors):
+        cache.set(v, 1, "s", f"q{i}", {"answer": i}, compute_ms=1.0)
+    assert cache.index.ntotal == len(cache.entries) <= 10
+    assert cache.get(vectors[-1], 1, "s")["answer"] == 14
+    assert cache.get(vectors[0], 1, "s") is None
@@ -0,0 +1,200 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.sharded_store import ShardedVectorStore
+from app.two_stage import TwoStageRetriever
+
+DIM = 32
+
+
+def make_sharded(tmp_path, **kwargs):
+    kwargs.setdefault("num_shards", 4)
+    return ShardedVectorStore(DIM, directory=str(tmp_path / "shards"), **kwargs)
+
+
+def corpus(n=400):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, DIM)).astype("float32")
+    meta = [{"text": f"doc {i} topic{i % 7}", "url": f"page-{i // 5}"} for i in range(n)]
+    return vectors, meta
+
+
+def test_results_match_flat_store(tmp_path, tmp_store):
+    vectors, meta = corpus()
+    flat, sharded = tmp_store(DIM), make_sharded(tmp_path)
+    flat.add(vectors, [dict(m) for m in meta])
+    sharded.add(vectors, [dict(m) for m in meta])
+
+    assert sharded.index.ntotal == len(vectors)
+    assert all(s["vectors"] for s in sharded.shard_stats())
+    for query in vectors[:20] + 0.05:
+        expected, found = flat.search(query, top_k=8), sharded.search(query, top_k=8)
+        assert [r["id"] for r in found] == [r["id"] for r in expected]
+        assert np.allclose([r["score"] for r in found], [r["score"] for r in expected], atol=1e-5)
+
+
+def test_top_k_beyond_total_is_padded(tmp_path):
+    vectors, meta = corpus(6)
+    store = make_sharded(tmp_path)
+    store.add(vectors, meta)
+
+    scores, ids = store.index.search(store.prepare_query(vectors[0]), 10)
+    assert sorted(ids[0][:6]) == list(range(6))
+    assert list(ids[0][6:]) == [-1] * 4
+    assert len(store.search(vectors[0], top_k=10)) == 6
+
+
+def test_url_routing_keeps_pages_together(tmp_path):
+    vectors, meta = corpus()
+    store = make_sharded(tmp_path, shard_by="url")
+    store.add(vectors, meta)
+
+    by_url = {}
+    for chunk_id, item in enumerate(store.metadata):
+        by_url.setdefault(item["url"], set()).add(store.owner[chunk_id])
+    assert all(len(shards) == 1 for shards in by_url.values())
+
+
+def test_save_load_round_trip_and_dirty_shards(tmp_path):
+    vectors, meta = corpus()
+    store = make_sharded(tmp_path)
+    store.add(vectors[:200], meta[:200])
+
+    reloaded = make_sharded(tmp_path)
+    assert reloaded.metadata == store.metadata
+    assert reloaded.owner == store.owner
+    assert reloaded.lexical_search("topic3", top_k=3) == store.lexical_search("topic3", top_k=3)
+    query = vectors[3]
+    assert [r["id"] for r in reloaded.search(query)] == [r["id"] for r in store.search(query)]
+
+    # A single new chunk lands in one shard, and only that shard's files are rewritten
+    for shard in store.shards:
+        os.utime(shard.index_path, (0, 0))
+    store.add(vectors[200:201], meta[200:201])
+    touched = [n for n, shard in enumerate(store.shards) if os.path.getmtime(shard.index_path) != 0]
+    assert touched == [store.owner[200]]
+
+
+def test_add_shard_without_rebuild(tmp_path, tmp_store):
+    vectors, meta = corpus()
+    store = make_sharded(tmp_path, num_shards=2)
+    store.add(vectors[:200], meta[:200])
+    before = [s.index.ntotal for s in store.shards]
+
+    assert store.add_shard() == 2
+    assert [s.index.ntotal for s in store.shards[:2]] == before
+    store.add(vectors[200:], meta[200:])
+    assert store.shards[2].index.ntotal > 0
+
+    reloaded = make_sharded(tmp_path, num_shards=2)
+    assert len(reloaded.shards) == 3
+    flat = tmp_store(DIM)
+    flat.add(vectors, [dict(m) for m in meta])
+    for query in vectors[190:210]:
+        assert [r["id"] for r in reloaded.search(query)] == [r["id"] for r in flat.search(query)]
+
+
+def test_range_search_and_reconstruct(tmp_path, tmp_store):
+    vectors, meta = corpus()
+    flat, sharded = tmp_store(DIM), make_sharded(tmp_path)
+    flat.add(vectors, [dict(m) for m in meta])
+    sharded.add(vectors, [dict(m) for m in meta])
+
+    for query in vectors[:5]:
+        expected = flat.range_search(query, min_score=0.3)
+        found = sharded.range_search(query, min_score=0.3)
+        assert [r["id"] for r in found] == [r["id"] for r in expected]
+    assert np.allclose(sharded.index.reconstruct_n(0, len(vectors)), flat.index.reconstruct_n(0, len(vectors)))
+    assert np.allclose(sharded.index.reconstruct_batch([5, 2, 300]), flat.index.reconstruct_batch([5, 2, 300]))
+
+
+def test_two_stage_over_shards(tmp_path):
+    vectors, meta = corpus()
+    store = make_sharded(tmp_path)
+    store.add(vectors, meta)
+    retriever = TwoStageRetriever(store, index_spec="SQ8")
+    query = vectors[7] + 0.01
+
+    results, _ = retriever.search(query, top_k=5, candidates=50)
+    assert [r["id"] for r in results] == [r["id"] for r in store.search(query, top_k=5)]
+
+
+def test_import_flat_store_once(tmp_path, tmp_store):
+    vectors, meta = corpus(50)
+    flat = tmp_store(DIM)
+    flat.add(vectors, meta)
+
+    store = make_sharded(tmp_path, import_index_path=flat.index_path, import_meta_path=flat.meta_path)
+    assert store.index.ntotal == 50
+    assert [r["id"] for r in store.search(vectors[9])] == [r["id"] for r in flat.search(vectors[9])]
+    assert make_sharded(tmp_path, import_index_path=flat.index_path,
+                        import_meta_path=flat.meta_path).index.ntotal == 50
+
+
+def test_concurrent_workers_import_flat_store_once(tmp_path, tmp_store):
+    vectors, meta = corpus(2000)
+    flat = tmp_store(DIM)
+    flat.add(vectors, meta)
+
+    start = threading.Barrier(3)
+    stores = []
+
+    def open_store():
+        start.wait()
+        stores.append(make_sharded(tmp_path, import_index_path=flat.index_path, import_meta_path=flat.meta_path))
+
+    workers = [threading.Thread(target=open_store) for _ in range(3)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+    assert [store.index.ntotal for store in stores] == [2000] * 3
+    assert make_sharded(tmp_path).index.ntotal == 2000
+
+
+def test_search_while_shards_are_added(tmp_path):
+    vectors, meta = corpus(200)
+    store = make_sharded(tmp_path, num_shards=2)
+    store.add(vectors, meta)
+    errors = []
+    done = threading.Event()
+
+    def search():
+        while not done.is_set():
+            try:
+                assert store.search(vectors[3], top_k=1)[0]["id"] == 3
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=search) for _ in range(3)]
+    for t in readers:
+        t.start()
+    try:
+        for _ in range(20):
+            store.add_shard()
+    finally:
+        done.set()
+        for t in readers:
+            t.join()
+
+    assert errors == [] and len(store.shards) == 22
+
+
+def test_reset_and_invalid_routing(tmp_path):
+    vectors, meta = corpus(20)
+    store = make_sharded(tmp_path)
+    store.add(vectors, meta)
+    store.reset()
+
+    assert store.index.ntotal == 0 and store.search(vectors[0]) == []
+    assert make_sharded(tmp_path).index.ntotal == 0
+    with pytest.raises(ValueError):
+        make_sharded(tmp_path, shard_by="domain")
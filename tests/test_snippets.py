@@ -0,0 +1,50 @@
+import os
+import sys
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.snippets import (
+    doc_sentences, highlight_snippets, score_sentences, sentence_offsets, split_sentences
+)
+
+
+def test_best_sentence_per_document():
+    docs = [
+        "FAISS is a library from Meta. It supports product quantization for compressed vectors. It runs on GPUs.",
+        "Streamlit builds data apps quickly. Product quantization splits vectors into subspaces and encodes each one.",
+        "",
+    ]
+    snippets = highlight_snippets(docs, "what is product quantization?")
+    assert snippets[0].startswith("It supports product quantization")
+    assert snippets[1].startswith("Product quantization splits")
+    assert snippets[2] == ""
+
+
+def test_short_snippet_gets_next_sentence():
+    doc = "Intro text about many unrelated things here. ColBERT rocks. It uses late interaction over token vectors."
+    assert highlight_snippets([doc], "colbert")[0] == "ColBERT rocks. It uses late interaction over token vectors."
+
+
+def test_no_overlap_keeps_first_sentence():
+    doc = "First sentence here. Second sentence there."
+    assert highlight_snippets([doc], "zebra")[0].startswith("First sentence here.")
+    assert not score_sentences(["First sentence here."], "zebra").any()
+
+
+def test_sentence_offsets_match_regex_split():
+    text = "One. Two!  Three? Four"
+    offsets = sentence_offsets(text)
+    assert [text[s:e] for s, e in offsets] == split_sentences(text)
+    assert doc_sentences({"text": text, "sentences": offsets}) == split_sentences(text)
+
+
+def test_stored_sentence_embeddings_drive_scoring():
+    text = "Alpha sentence is long enough to stand alone here. Beta sentence is also long enough to stand alone."
+    doc = {"text": text, "sentences": sentence_offsets(text), "sentence_row": 0}
+    sentence_embeddings = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float16)
+    snippet = highlight_snippets([doc], "alpha", query_embedding=np.array([0.1, 0.9]),
+                                 sentence_embeddings=sentence_embeddings)[0]
+    assert snippet.startswith("Beta")
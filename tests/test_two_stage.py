@@ -0,0 +1,62 @@
+import os
+import sys
+
+import numpy as np
+
+# Append project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Model-free, deterministic embeddings so the query routes import without sentence-transformers
+from benchmarks.fake_embedder import install as install_fake_embedder
+install_fake_embedder()
+
+from api.routes_query import rank_results
+from app.two_stage import TwoStageRetriever
+
+
+def make_store(tmp_store, n=500, dim=32):
+    vectors = np.random.default_rng(0).standard_normal((n, dim)).astype("float32")
+    return tmp_store(dim, vectors), vectors
+
+
+def test_rescored_results_match_exact_search(tmp_store):
+    store, vectors = make_store(tmp_store)
+    retriever = TwoStageRetriever(store, index_spec="SQ8")
+    query = vectors[7] + 0.01
+
+    results, stats = retriever.search(query, top_k=5, candidates=50, report_recall=True)
+    exact = store.search(query, top_k=5)
+
+    assert [r["text"] for r in results] == [r["text"] for r in exact]
+    assert np.allclose([r["score"] for r in results], [r["score"] for r in exact], atol=1e-5)
+    assert stats["stages"]["candidates"]["count"] == 50
+    assert stats["recall_at_k"]["final"] == 1.0
+
+
+def test_candidate_index_extends_after_add(tmp_store):
+    store, _ = make_store(tmp_store, n=100)
+    retriever = TwoStageRetriever(store, index_spec="SQ8")
+    retriever.search(np.ones(32, dtype="float32"), top_k=3)
+    before = retriever._candidate_index
+
+    new = np.full((1, 32), 5.0, dtype="float32")
+    new[0, 0] = 50.0
+    store.add(new, [{"text": "new doc"}])
+    results, _ = retriever.search(new[0], top_k=1)
+
+    # Extended as a copy: a search still holding the old index is unaffected
+    assert retriever._candidate_index.ntotal == 101 and before.ntotal == 100
+    assert results[0]["text"] == "new doc"
+
+
+def test_partial_rerank_keeps_retriever_order():
+    # The deadline stopped the cross-encoder after two hits: logits and cosines must not be mixed
+    partial = [{"id": 3, "score": 0.41, "rerank_score": -2.0}, {"id": 1, "score": 0.52, "rerank_score": -4.5},
+               {"id": 7, "score": 0.60}, {"id": 2, "score": 0.30}]
+    assert [d["id"] for d in rank_results(partial)] == [3, 1, 7, 2]
+
+    full = [dict(d, rerank_score=d.get("rerank_score", -9.0)) for d in partial]
+    full[3]["rerank_score"] = 1.0
+    assert [d["id"] for d in rank_results(full)] == [2, 3, 1, 7]
+    assert [d["id"] for d in rank_results(partial[2:])] == [7, 2]
+
@@ -1,6 +1,6 @@
 import streamlit as st
 import requests
-from chat_fallback import get_fallback_response, SAMPLE_CONVERSATIONS, normalize_text
+from chat_fallback import get_fallback_response, get_sample_response
 from rag_engine import fetch_rag_response
 
 def show_chat():
@@ -17,12 +17,8 @@ def show_chat():
             user_text = user_input.strip()
             st.session_state.messages.append({"role": "user", "content": user_text})
 
-            # Check sample responses first
-            normalized_input = normalize_text(user_text)
-            sample_response = next(
-                (conv["bot"] for conv in SAMPLE_CONVERSATIONS if normalize_text(conv["user"]) == normalized_input),
-                None
-            )
+            # Check sample responses first (the API also routes small talk before retrieval)
+            sample_response = get_sample_response(user_text)
 
             if sample_response:
                 response = sample_response
@@ -38,10 +38,11 @@ def normalize_text(text):
     text = text.lower()
     return text.translate(str.maketrans('', '', string.punctuation)).strip()
 
+# Normalized once at import instead of on every message
+SAMPLE_RESPONSES = {normalize_text(conv["user"]): conv["bot"] for conv in SAMPLE_CONVERSATIONS}
+
+def get_sample_response(user_message):
+    return SAMPLE_RESPONSES.get(normalize_text(user_message))
+
 def get_fallback_response(user_message):
-    normalized_input = normalize_text(user_message)
-    for conv in SAMPLE_CONVERSATIONS:
-        normalized_question = normalize_text(conv["user"])
-        if normalized_question == normalized_input:
-            return conv["bot"]
-    return GENERIC_FALLBACK
+    return get_sample_response(user_message) or GENERIC_FALLBACK
@@ -1,6 +1,6 @@
 import streamlit as st
 import re
-from rag_engine import fetch_rag_response
+from rag_engine import stream_rag_response
 
 
 def initialize_session_state():
@@ -18,14 +18,45 @@ def initialize_session_state():
             st.session_state[key] = value
 
 
+def render_citations(citations):
+    st.markdown("### 🔗 Citations:")
+    for i, citation in enumerate(citations, start=1):
+        text = citation.get("text", "")[:200].strip()
+        url = citation.get("url", None)
+        if url:
+            st.markdown(f"{i}. [{text}]({url})")
+        else:
+            st.markdown(f"{i}. {text}")
+
+
 def handle_query_submission(query_input):
+    # Render citations and the answer as soon as each streamed stage arrives;
+    # the placeholder is cleared once the full result is in session state.
+    live = st.empty()
+    citations, answer = [], None
+    response_json = {}
     try:
-        response_json = fetch_rag_response(
+        for event, data in stream_rag_response(
             query=query_input,
             top_k=st.session_state.top_k,
             min_score=st.session_state.min_score,
             save_to_csv=st.session_state.save_csv
-        )
+        ):
+            if event == "citations":
+                citations = data
+            elif event == "answer":
+                answer = data
+            elif event == "result":
+                response_json = data
+            with live.container():
+                if answer is not None:
+                    st.markdown("### 📝 Result:")
+                    st.markdown(answer)
+                else:
+                    st.info("⏳ Summarizing retrieved documents...")
+                if citations:
+                    render_citations(citations)
+
         raw_result = response_json.get("answer", "No answer found.")
         cleaned_result = re.sub(r'[,\s]{2,}', ' ', raw_result).strip()
 
@@ -36,6 +67,8 @@ def handle_query_submission(query_input):
 
     except (ValueError, ConnectionError) as e:
         st.error(f"❌ {e}")
+    finally:
+        live.empty()
 
 
 def display_results():
@@ -44,14 +77,7 @@ def display_results():
 
     citations = st.session_state.last_citations
     if citations:
-        st.markdown("### 🔗 Citations:")
-        for i, citation in enumerate(citations, start=1):
-            text = citation.get("text", "")[:200].strip()
-            url = citation.get("url", None)
-            if url:
-                st.markdown(f"{i}. [{text}]({url})")
-            else:
-                st.markdown(f"{i}. {text}")
+        render_citations(citations)
 
     csv_path = st.session_state.last_csv_path
     if csv_path:
@@ -3,6 +3,14 @@
 import requests
 import json
 
+API_BASE_URL = "http://localhost:8000"
+
+def _headers():
+    return {
+        "Content-Type": "application/json",
+        "x-api-key": "my-super-secret-key"  # Update if needed
+    }
+
 def fetch_rag_response(query: str, top_k: int = 5, min_score: float = 0.0, save_to_csv: bool = False):
     """
     Sends a POST request to the RAG API and returns the parsed response.
@@ -17,14 +25,11 @@ def fetch_rag_response(query: str, top_k: int = 5, min_score: float = 0.0, save_
         "save_to_csv": save_to_csv
     }
 
-    headers = {
-        "Content-Type": "application/json",
-        "x-api-key": "my-super-secret-key"  # Update if needed
-    }
+    headers = _headers()
 
     try:
         response = requests.post(
-            "http://localhost:8000/api/query",
+            f"{API_BASE_URL}/api/query",
             data=json.dumps(payload),
             headers=headers
         )
@@ -35,3 +40,38 @@ def fetch_rag_response(query: str, top_k: int = 5, min_score: float = 0.0, save_
             raise ValueError(f"API Error {response.status_code}: {response.text}")
     except requests.exceptions.RequestException as e:
         raise ConnectionError(f"Connection error: {e}")
+
+def stream_rag_response(query: str, top_k: int = 5, min_score: float = 0.0, save_to_csv: bool = False):
+    """
+    Streams the RAG API response as server-sent events.
+
+    Yields:
+        tuple: (event, data) where event is "citations", "answer" or "result".
+        The final "result" carries the same body as `fetch_rag_response`.
+    """
+    payload = {
+        "query": query,
+        "top_k": top_k,
+        "min_score": min_score,
+        "save_to_csv": save_to_csv
+    }
+
+    try:
+        with requests.post(
+            f"{API_BASE_URL}/api/query/stream",
+            data=json.dumps(payload),
+            headers=_headers(),
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                raise ValueError(f"API Error {response.status_code}: {response.text}")
+
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:") and event:
+                    yield event, json.loads(line[len("data:"):].strip())
+                    event = None
+    except requests.exceptions.RequestException as e:
+        raise ConnectionError(f"Connection error: {e}")